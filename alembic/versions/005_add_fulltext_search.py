@@ -0,0 +1,60 @@
+"""add full-text search vectors
+
+Revision ID: 005
+Revises: ba02a00820b2
+Create Date: 2025-11-24 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = 'ba02a00820b2'
+branch_labels = None
+depends_on = None
+
+
+# Generated tsvector expressions; keep in sync with app/models.py
+SEARCH_VECTORS = {
+    'programs': (
+        "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(description, '')), 'B')"
+    ),
+    'events': (
+        "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(description, '')), 'B')"
+    ),
+    'organizations': (
+        "setweight(to_tsvector('english', coalesce(organization_name, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(services_offered, '')), 'B') || "
+        "setweight(to_tsvector('english', coalesce(city, '') || ' ' || coalesce(address, '')), 'C')"
+    ),
+}
+
+
+def upgrade():
+    for table, expression in SEARCH_VECTORS.items():
+        op.add_column(
+            table,
+            sa.Column(
+                'search_vector',
+                postgresql.TSVECTOR(),
+                sa.Computed(expression, persisted=True),
+                nullable=True
+            )
+        )
+        op.create_index(
+            f'ix_{table}_search_vector',
+            table,
+            ['search_vector'],
+            unique=False,
+            postgresql_using='gin'
+        )
+
+
+def downgrade():
+    for table in SEARCH_VECTORS:
+        op.drop_index(f'ix_{table}_search_vector', table_name=table)
+        op.drop_column(table, 'search_vector')
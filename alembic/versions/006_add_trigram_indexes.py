@@ -0,0 +1,41 @@
+"""add trigram indexes for fuzzy filters
+
+Revision ID: 006
+Revises: 005
+Create Date: 2025-11-25 10:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+
+# Columns filtered with substring ilike / fuzzy matching; keep in sync with app/models.py
+TRIGRAM_COLUMNS = {
+    'organizations': ['organization_name', 'address', 'city', 'services_offered', 'sector_type'],
+    'programs': ['program_type', 'stage', 'sector'],
+}
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for table, columns in TRIGRAM_COLUMNS.items():
+        for column in columns:
+            op.create_index(
+                f'ix_{table}_{column}_trgm',
+                table,
+                [column],
+                unique=False,
+                postgresql_using='gin',
+                postgresql_ops={column: 'gin_trgm_ops'}
+            )
+
+
+def downgrade():
+    for table, columns in TRIGRAM_COLUMNS.items():
+        for column in columns:
+            op.drop_index(f'ix_{table}_{column}_trgm', table_name=table)
@@ -0,0 +1,33 @@
+"""add catalog_versions table
+
+Revision ID: 007
+Revises: 006
+Create Date: 2025-11-26 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'catalog_versions',
+        sa.Column('table_name', sa.String(length=64), nullable=False),
+        sa.Column('version', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('table_name')
+    )
+    op.execute(
+        "INSERT INTO catalog_versions (table_name, version) VALUES "
+        "('organizations', 0), ('programs', 0), ('events', 0), ('pathways', 0)"
+    )
+
+
+def downgrade():
+    op.drop_table('catalog_versions')
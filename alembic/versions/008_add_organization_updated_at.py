@@ -0,0 +1,23 @@
+"""add organizations.updated_at
+
+Revision ID: 008
+Revises: 007
+Create Date: 2025-11-27 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('organizations', sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade():
+    op.drop_column('organizations', 'updated_at')
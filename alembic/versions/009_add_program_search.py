@@ -0,0 +1,117 @@
+"""add program_search read model
+
+Revision ID: 009
+Revises: 008
+Create Date: 2025-11-28 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+
+# Keep in sync with app/models.py
+TRIGRAM_COLUMNS = ['program_type', 'stage', 'stage_normalized', 'sector']
+
+
+def upgrade():
+    op.create_table(
+        'program_search',
+        sa.Column('program_id', sa.Integer(), nullable=False),
+        sa.Column('organization_id', sa.Integer(), nullable=False),
+        sa.Column('organization_name', sa.String(), nullable=True),
+        sa.Column('title', sa.String(), nullable=False),
+        sa.Column('program_type', sa.String(), nullable=False),
+        sa.Column('stage', sa.String(), nullable=True),
+        sa.Column('stage_normalized', sa.String(), nullable=True),
+        sa.Column('sector', sa.String(), nullable=True),
+        sa.Column('cost', sa.String(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=False),
+        sa.Column('snippet', sa.Text(), nullable=True),
+        sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True),
+        sa.Column('refreshed_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['program_id'], ['programs.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('program_id')
+    )
+    op.create_index(
+        'ix_program_search_listing',
+        'program_search',
+        ['is_active', sa.text("coalesce(title, '')"), 'program_id'],
+        unique=False
+    )
+    op.create_index(
+        'ix_program_search_org_listing',
+        'program_search',
+        ['organization_id', 'is_active', sa.text("coalesce(title, '')"), 'program_id'],
+        unique=False
+    )
+    op.create_index(
+        'ix_program_search_search_vector',
+        'program_search',
+        ['search_vector'],
+        unique=False,
+        postgresql_using='gin'
+    )
+    for column in TRIGRAM_COLUMNS:
+        op.create_index(
+            f'ix_program_search_{column}_trgm',
+            'program_search',
+            [column],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_ops={column: 'gin_trgm_ops'}
+        )
+
+    # Backfill. The same rows app/services/program_search.py writes, frozen as
+    # of this revision (stage aliases from app/utils/program_categorizer.py)
+    op.execute("""
+        INSERT INTO program_search (
+            program_id, organization_id, organization_name, title, program_type,
+            stage, stage_normalized, sector, cost, is_active, snippet, search_vector
+        )
+        SELECT
+            programs.id,
+            programs.organization_id,
+            organizations.organization_name,
+            programs.title,
+            programs.program_type,
+            programs.stage,
+            CASE
+                WHEN coalesce(programs.stage, '') = '' THEN NULL
+                WHEN programs.stage IN ('Idea / Inspiration', 'Validation', 'Concept Development',
+                                        'MVP / Testing', 'Business Setup', 'Launch', 'Growth')
+                    THEN programs.stage
+                WHEN position('idea' IN lower(programs.stage)) > 0 THEN 'Idea / Inspiration'
+                WHEN position('inspiration' IN lower(programs.stage)) > 0 THEN 'Idea / Inspiration'
+                WHEN position('validation' IN lower(programs.stage)) > 0 THEN 'Validation'
+                WHEN position('concept' IN lower(programs.stage)) > 0 THEN 'Concept Development'
+                WHEN position('mvp' IN lower(programs.stage)) > 0 THEN 'MVP / Testing'
+                WHEN position('testing' IN lower(programs.stage)) > 0 THEN 'MVP / Testing'
+                WHEN position('setup' IN lower(programs.stage)) > 0 THEN 'Business Setup'
+                WHEN position('launch' IN lower(programs.stage)) > 0 THEN 'Launch'
+                WHEN position('growth' IN lower(programs.stage)) > 0 THEN 'Growth'
+                WHEN position('scale' IN lower(programs.stage)) > 0 THEN 'Growth'
+                ELSE programs.stage
+            END,
+            programs.sector,
+            programs.cost,
+            programs.is_active,
+            left(btrim(regexp_replace(
+                regexp_replace(coalesce(programs.description, ''), '<[^>]*>', ' ', 'g'),
+                '\\s+', ' ', 'g'
+            )), 280),
+            programs.search_vector
+                || setweight(to_tsvector('english', coalesce(organizations.organization_name, '')), 'C')
+        FROM programs
+        LEFT OUTER JOIN organizations ON programs.organization_id = organizations.id
+    """)
+
+
+def downgrade():
+    op.drop_table('program_search')
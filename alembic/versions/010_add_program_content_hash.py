@@ -0,0 +1,38 @@
+"""add programs.content_hash
+
+Revision ID: 010
+Revises: 009
+Create Date: 2025-12-01 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '010'
+down_revision = '009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('programs', sa.Column('content_hash', sa.String(length=64), nullable=True))
+
+    # Existing stages count as categorized from the current text, so only
+    # later text changes recategorize; rows without a stage keep a NULL hash
+    # and are categorized on their next write or batch run. Same digest as
+    # app.utils.program_categorizer.content_hash: sha256 of title NUL description
+    # (concatenated as bytea, since text can't hold a NUL)
+    op.execute("""
+        UPDATE programs
+        SET content_hash = encode(sha256(
+            convert_to(coalesce(title, ''), 'UTF8')
+            || decode('00', 'hex')
+            || convert_to(coalesce(description, ''), 'UTF8')
+        ), 'hex')
+        WHERE stage IS NOT NULL
+    """)
+
+
+def downgrade():
+    op.drop_column('programs', 'content_hash')
@@ -1,8 +1,14 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 import os
+import time
 from dotenv import load_dotenv
+from app.services.metrics import db_metrics
 
 load_dotenv()
 
@@ -12,16 +18,118 @@ database_url = os.getenv("DATABASE_URL")
 if not database_url:
     raise ValueError("DATABASE_URL environment variable is not set. Please check your .env file.")
 
+# Connection pool sizing (per engine, per worker process)
+POOL_SETTINGS = {
+    "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+    "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+    "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+    "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+}
+
+class _TimedCheckoutMixin:
+    """Record how long each checkout waited for a pooled connection"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            db_metrics.increment("pool_timeouts")
+            raise
+        finally:
+            db_metrics.observe("pool_checkout_wait", (time.perf_counter() - started) * 1000)
+
+class TimedQueuePool(_TimedCheckoutMixin, QueuePool):
+    pass
+
+class TimedAsyncAdaptedQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    pass
+
+def _instrument_statements(sync_engine):
+    """Record the duration of every statement executed through the engine"""
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _start_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("statement_started_at", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _stop_timer(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["statement_started_at"].pop()
+        db_metrics.observe("statement", (time.perf_counter() - started) * 1000)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _discard_timer(context):
+        # A failed statement never reaches after_cursor_execute
+        if context.connection is not None:
+            pending = context.connection.info.get("statement_started_at")
+            if pending:
+                pending.pop()
+        db_metrics.increment("statement_errors")
+
+def pool_status(pool) -> dict:
+    """Current occupancy of a queue pool"""
+    if not isinstance(pool, QueuePool):
+        return {"status": pool.status()}
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": pool.overflow(),
+        "timeout_seconds": pool.timeout(),
+    }
+
 engine = create_engine(
     database_url,
+    poolclass=TimedQueuePool,
     pool_pre_ping=True,
-    echo=False  # Set to True for SQL query logging
+    echo=False,  # Set to True for SQL query logging
+    **POOL_SETTINGS
 )
+_instrument_statements(engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+def _async_database_url(url: str):
+    """
+    Derive the asyncpg URL and connect args from a libpq-style DATABASE_URL.
+
+    asyncpg does not understand libpq query options such as sslmode or
+    channel_binding, so sslmode is passed through as the `ssl` connect arg.
+    """
+    parsed = make_url(url)
+    connect_args = {}
+    if parsed.get_backend_name() == "postgresql":
+        sslmode = parsed.query.get("sslmode")
+        if sslmode:
+            connect_args["ssl"] = sslmode
+        parsed = parsed.difference_update_query(["sslmode", "channel_binding"]).set(
+            drivername="postgresql+asyncpg"
+        )
+    return parsed, connect_args
+
+# ASYNC_DATABASE_URL overrides the derived URL (e.g. to use a different driver)
+async_database_url, async_connect_args = _async_database_url(
+    os.getenv("ASYNC_DATABASE_URL") or database_url
+)
+
+# Used by the API; scripts and importers keep the sync engine above
+async_engine = create_async_engine(
+    async_database_url,
+    connect_args=async_connect_args,
+    poolclass=TimedAsyncAdaptedQueuePool,
+    pool_pre_ping=True,
+    echo=False,
+    **POOL_SETTINGS
+)
+_instrument_statements(async_engine.sync_engine)
+
+# expire_on_commit=False: attributes stay loaded after commit instead of
+# triggering lazy (blocking) refreshes outside the awaited calls
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, autoflush=False, expire_on_commit=False
+)
+
 def get_db():
     """Dependency for getting database session"""
     db = SessionLocal()
@@ -30,3 +138,7 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    """Dependency for getting an async database session"""
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,6 +1,12 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from app.database import POOL_SETTINGS, async_engine, engine, pool_status
 from app.routers import auth, events, organizations, pathways, programs, search
+from app.services.cache import catalog_cache, recommendation_cache, recommendation_flights
+from app.services.gemini_service import MODEL_CLIENT, prompt_cache
+from app.services.metrics import RouteTagMiddleware, ai_metrics, db_metrics
+from app.services.model_calls import gemini_guard
+from app.services.recommender import answer_traffic, precomputed_stats, recommender_cache
 
 app = FastAPI(
     title="Innovation POC API",
@@ -17,6 +23,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Tag database metrics with the route that issued them
+app.add_middleware(RouteTagMiddleware)
+
 # Include routers
 app.include_router(auth.router, prefix="/api")  # Mount auth at /api/auth
 app.include_router(events.router, prefix="/api/events", tags=["events"])
@@ -29,7 +38,33 @@ app.include_router(search.router, prefix="/api/search", tags=["search"])
 async def root():
     return {"message": "Innovation POC API is running"}
 
+def _database_pools():
+    return {
+        "settings": POOL_SETTINGS,
+        "async": pool_status(async_engine.pool),
+        "sync": pool_status(engine.pool),
+    }
+
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
+    """Liveness plus connection pool occupancy"""
+    return {"status": "healthy", "database_pools": _database_pools()}
+
+@app.get("/metrics")
+async def metrics():
+    """Runtime counters for the in-process caches, model calls and the database layer"""
+    return {
+        "catalog_cache": catalog_cache.stats(),
+        "pathway_prompt": prompt_cache.stats(),
+        "pathway_recommender": {
+            **recommender_cache.stats(),
+            **answer_traffic.stats(),
+            "precomputed": precomputed_stats(),
+        },
+        "recommendation_cache": {**recommendation_cache.stats(), **recommendation_flights.stats()},
+        "gemini": {"client": MODEL_CLIENT, **gemini_guard.stats()},
+        "ai_calls": ai_metrics.snapshot(),
+        "database_pools": _database_pools(),
+        "database": db_metrics.snapshot(),
+    }
 
@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, Text, Date, DateTime, JSON, Numeric, Boolean, ForeignKey, Float
-from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy import Column, Integer, String, Text, Date, DateTime, JSON, Numeric, Boolean, ForeignKey, Float, Computed, Index, BigInteger
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import relationship, deferred
+from sqlalchemy.sql import func, text
 from app.database import Base
 
 class Event(Base):
@@ -17,6 +18,16 @@ class Event(Base):
     link = Column(String)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Generated full-text search document (see migration 005)
+    search_vector = deferred(Column(TSVECTOR, Computed(
+        "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(description, '')), 'B')",
+        persisted=True
+    )))
+    
+    __table_args__ = (
+        Index("ix_events_search_vector", "search_vector", postgresql_using="gin"),
+    )
 
 class Organization(Base):
     __tablename__ = "organizations"
@@ -36,6 +47,23 @@ class Organization(Base):
     contact_name = Column(Text)
     notes = Column(Text)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Generated full-text search document (see migration 005)
+    search_vector = deferred(Column(TSVECTOR, Computed(
+        "setweight(to_tsvector('english', coalesce(organization_name, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(services_offered, '')), 'B') || "
+        "setweight(to_tsvector('english', coalesce(city, '') || ' ' || coalesce(address, '')), 'C')",
+        persisted=True
+    )))
+    
+    __table_args__ = (
+        Index("ix_organizations_search_vector", "search_vector", postgresql_using="gin"),
+        # Trigram indexes for substring and fuzzy filters (see migration 006)
+        *[
+            Index(f"ix_organizations_{name}_trgm", name, postgresql_using="gin", postgresql_ops={name: "gin_trgm_ops"})
+            for name in ("organization_name", "address", "city", "services_offered", "sector_type")
+        ],
+    )
 
 class Pathway(Base):
     __tablename__ = "pathways"
@@ -47,6 +75,14 @@ class Pathway(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+class CatalogVersion(Base):
+    """Generation counter per catalog table, bumped on every write (used by the read cache)"""
+    __tablename__ = "catalog_versions"
+    
+    table_name = Column(String(64), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
 class SearchLog(Base):
     __tablename__ = "search_logs"
     
@@ -88,6 +124,8 @@ class Program(Base):
     organization_id = Column(Integer, ForeignKey("organizations.id"), nullable=False)
     program_type = Column(String, nullable=False)  # accelerator, incubator, workshop, mentorship, etc.
     stage = Column(String, nullable=True)  # idea, startup, growth, scale
+    # content_hash(title, description) when the stage was last categorized (see program_categorizer)
+    content_hash = Column(String(64), nullable=True)
     sector = Column(String, nullable=True)  # tech, healthcare, social enterprise, etc.
     eligibility_criteria = Column(JSON, nullable=True)  # pre-revenue, student, women-led, etc.
     cost = Column(String, nullable=True)  # free, paid, sliding scale
@@ -100,8 +138,55 @@ class Program(Base):
     is_active = Column(Boolean, default=True, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Generated full-text search document (see migration 005)
+    search_vector = deferred(Column(TSVECTOR, Computed(
+        "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(description, '')), 'B')",
+        persisted=True
+    )))
     
     organization = relationship("Organization", backref="programs")
+    
+    __table_args__ = (
+        Index("ix_programs_search_vector", "search_vector", postgresql_using="gin"),
+        # Trigram indexes for substring and fuzzy filters (see migration 006)
+        *[
+            Index(f"ix_programs_{name}_trgm", name, postgresql_using="gin", postgresql_ops={name: "gin_trgm_ops"})
+            for name in ("program_type", "stage", "sector")
+        ],
+    )
+
+class ProgramSearch(Base):
+    """Denormalized read model of programs for listing and search (see app/services/program_search.py)"""
+    __tablename__ = "program_search"
+    
+    program_id = Column(Integer, ForeignKey("programs.id", ondelete="CASCADE"), primary_key=True)
+    organization_id = Column(Integer, nullable=False)
+    organization_name = Column(String, nullable=True)
+    title = Column(String, nullable=False)
+    program_type = Column(String, nullable=False)
+    stage = Column(String, nullable=True)
+    stage_normalized = Column(String, nullable=True)  # get_stage_display_name(stage)
+    sector = Column(String, nullable=True)
+    cost = Column(String, nullable=True)
+    is_active = Column(Boolean, nullable=False)
+    snippet = Column(Text, nullable=True)  # Plain-text start of the description
+    # Program search_vector plus the organization name (weight C)
+    search_vector = deferred(Column(TSVECTOR))
+    refreshed_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    program = relationship("Program")
+    
+    __table_args__ = (
+        # Default listing order and the per-organization listing (see migration 009)
+        Index("ix_program_search_listing", "is_active", text("coalesce(title, '')"), "program_id"),
+        Index("ix_program_search_org_listing", "organization_id", "is_active", text("coalesce(title, '')"), "program_id"),
+        Index("ix_program_search_search_vector", "search_vector", postgresql_using="gin"),
+        *[
+            Index(f"ix_program_search_{name}_trgm", name, postgresql_using="gin", postgresql_ops={name: "gin_trgm_ops"})
+            for name in ("program_type", "stage", "stage_normalized", "sector")
+        ],
+    )
 
 class Mentor(Base):
     __tablename__ = "mentors"
@@ -1,71 +1,122 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import or_, select
 from typing import List, Optional
 from datetime import date
 import httpx
 import requests
 import cloudscraper
 import asyncio
-from app.database import get_db
+from app.database import get_async_db
 from app.models import Event
 from app.schemas import EventCreate, EventUpdate, EventResponse
+from app.services.cache import bump_catalog_version, cached_json_response
+from app.utils.http_cache import (
+    collection_etag,
+    is_not_modified,
+    last_modified_headers,
+    not_modified,
+)
+from app.utils.search import SearchMode, fulltext_match
+from app.utils.pagination import (
+    MAX_PAGE_SIZE,
+    NEXT_CURSOR_HEADER,
+    SortKey,
+    paginate,
+    stream_ndjson,
+)
 
 router = APIRouter()
 
+# Listing order: newest start date first, then id as the keyset tie-breaker
+EVENT_SORT_KEYS = [SortKey(Event.start_date, True), SortKey(Event.id, True)]
+
 @router.get("/", response_model=List[EventResponse])
 async def get_events(
+    request: Request,
     category: Optional[str] = None,
     audience: Optional[str] = None,
     search: Optional[str] = None,
-    db: Session = Depends(get_db)
+    search_mode: SearchMode = "fulltext",
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    stream: bool = False,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get all events with optional filtering"""
-    query = db.query(Event)
+    """
+    Get all events with optional filtering.
+    
+    `search` is a ranked full-text query by default; `search_mode=ilike` falls
+    back to substring matching. Supports keyset pagination (`limit`/`cursor`,
+    next cursor in X-Next-Cursor) and NDJSON streaming with `stream=true`.
+    """
+    # Answer revalidations from the table's fingerprint before running the query
+    etag = await db.run_sync(collection_etag, request, Event)
+    if is_not_modified(request, {"ETag": etag}):
+        return not_modified({"ETag": etag})
+    
+    query = select(Event)
+    sort_keys = EVENT_SORT_KEYS
     
     if category:
-        query = query.filter(Event.category == category)
+        query = query.where(Event.category == category)
     if audience:
-        query = query.filter(Event.audience == audience)
-    if search:
-        query = query.filter(
+        query = query.where(Event.audience == audience)
+    if search and search_mode == "fulltext":
+        condition, rank = fulltext_match(Event.search_vector, search)
+        query = query.where(condition)
+        # Most relevant first, ties broken by the usual listing order
+        sort_keys = [SortKey(rank, True)] + EVENT_SORT_KEYS
+    elif search:
+        query = query.where(
             or_(
                 Event.title.ilike(f"%{search}%"),
                 Event.description.ilike(f"%{search}%")
             )
         )
     
-    events = query.order_by(Event.start_date.desc()).all()
-    return events
+    if stream:
+        return stream_ndjson(db, query, sort_keys, EventResponse.model_validate, cursor, limit)
+    
+    async def build():
+        events, next_cursor = await paginate(db, query, sort_keys, cursor, limit)
+        headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
+        return [EventResponse.model_validate(event) for event in events], headers
+    
+    return await cached_json_response(db, request, ("events",), build, headers={"ETag": etag})
 
 @router.get("/{event_id}", response_model=EventResponse)
-async def get_event(event_id: int, db: Session = Depends(get_db)):
-    """Get a single event by ID"""
-    event = db.query(Event).filter(Event.id == event_id).first()
-    if not event:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Event not found"
-        )
-    return event
+async def get_event(event_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    """Get a single event by ID (with ETag and Last-Modified validators)"""
+    async def build():
+        event = await db.get(Event, event_id)
+        if not event:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Event not found"
+            )
+        return EventResponse.model_validate(event), last_modified_headers(event)
+    
+    return await cached_json_response(db, request, ("events",), build)
 
 @router.post("/", response_model=EventResponse, status_code=status.HTTP_201_CREATED)
-async def create_event(event: EventCreate, db: Session = Depends(get_db)):
+async def create_event(event: EventCreate, db: AsyncSession = Depends(get_async_db)):
     """Create a new event"""
     db_event = Event(**event.model_dump())
     db.add(db_event)
-    db.commit()
-    db.refresh(db_event)
+    await db.commit()
+    await db.run_sync(bump_catalog_version, "events")
+    await db.refresh(db_event)
     return db_event
 
 @router.put("/{event_id}", response_model=EventResponse)
 async def update_event(
     event_id: int,
     event_update: EventUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update an existing event"""
-    db_event = db.query(Event).filter(Event.id == event_id).first()
+    db_event = await db.get(Event, event_id)
     if not db_event:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -76,21 +127,23 @@ async def update_event(
     for key, value in update_data.items():
         setattr(db_event, key, value)
     
-    db.commit()
-    db.refresh(db_event)
+    await db.commit()
+    await db.run_sync(bump_catalog_version, "events")
+    await db.refresh(db_event)
     return db_event
 
 @router.delete("/{event_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_event(event_id: int, db: Session = Depends(get_db)):
+async def delete_event(event_id: int, db: AsyncSession = Depends(get_async_db)):
     """Delete an event"""
-    db_event = db.query(Event).filter(Event.id == event_id).first()
+    db_event = await db.get(Event, event_id)
     if not db_event:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Event not found"
         )
-    db.delete(db_event)
-    db.commit()
+    await db.delete(db_event)
+    await db.commit()
+    await db.run_sync(bump_catalog_version, "events")
     return None
 
 @router.get("/external/fetch")
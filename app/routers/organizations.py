@@ -1,34 +1,128 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_, func
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import or_, and_, func, select
 from typing import List, Optional
 import httpx
-from app.database import get_db
+from app.database import get_async_db
 from app.models import Organization
 from app.schemas import (
     OrganizationCreate,
     OrganizationUpdate,
     OrganizationResponse
 )
+from app.services.cache import bump_catalog_version, cached_json_response
+from app.services.program_search import refresh_program_search
+from app.utils.http_cache import (
+    collection_etag,
+    is_not_modified,
+    last_modified_headers,
+    not_modified,
+)
+from app.utils.search import SearchMode, fulltext_match, trigram_match
+from app.utils.pagination import (
+    MAX_PAGE_SIZE,
+    NEXT_CURSOR_HEADER,
+    SortKey,
+    paginate,
+    stream_ndjson,
+)
 
 router = APIRouter()
 
+# Listing order: name (NULL names sort as ''), then id as the keyset tie-breaker
+ORGANIZATION_SORT_KEYS = [
+    SortKey(func.coalesce(Organization.organization_name, '')),
+    SortKey(Organization.id),
+]
+
+def _to_float(value) -> Optional[float]:
+    """Safely convert a Numeric latitude/longitude to float"""
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return None
+
+def _organization_to_response(db_org: Organization) -> OrganizationResponse:
+    """Map an Organization row to the API response"""
+    return OrganizationResponse(
+        id=str(db_org.id),  # Convert to string
+        organization_name=db_org.organization_name,
+        city=db_org.city,
+        address=db_org.address,
+        latitude=_to_float(db_org.latitude),
+        longitude=_to_float(db_org.longitude),
+        province_state=db_org.province_state,
+        sector_type=db_org.sector_type,
+        services_offered=db_org.services_offered,
+        website=db_org.website,
+        email_address=db_org.email_address,
+        phone_number=db_org.phone_number,
+        contact_name=db_org.contact_name,
+        notes=db_org.notes,
+        created_at=db_org.created_at,
+        external=False,  # Database organizations are not external
+        external_id=None,
+        external_url=None,
+    )
+
 @router.get("/", response_model=List[OrganizationResponse])
 async def get_organizations(
+    request: Request,
     search: Optional[str] = None,
+    search_mode: SearchMode = "fulltext",
     city: Optional[str] = None,
     sector_type: Optional[str] = None,
-    db: Session = Depends(get_db)
+    fuzzy: bool = False,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    stream: bool = False,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get all organizations from database - matches new Organization model"""
+    """
+    Get all organizations from database - matches new Organization model.
+    
+    `search` is a ranked full-text query by default; `search_mode=ilike` falls
+    back to substring matching. `fuzzy=true` switches search, city and
+    sector_type to typo-tolerant trigram matching ranked by similarity.
+    Supports keyset pagination (`limit`/`cursor`, next cursor in X-Next-Cursor)
+    and NDJSON streaming with `stream=true`.
+    """
     try:
+        # Answer revalidations from the table's fingerprint before running the query
+        etag = await db.run_sync(collection_etag, request, Organization)
+        if is_not_modified(request, {"ETag": etag}):
+            return not_modified({"ETag": etag})
+        
         # Query organizations from database
-        query = db.query(Organization)
+        query = select(Organization)
+        
+        sort_keys = ORGANIZATION_SORT_KEYS
+        # Similarity scores of the fuzzy filters, summed into the ranking
+        fuzzy_scores = []
         
         # Apply filters
-        if search:
+        if search and fuzzy:
+            condition, score = trigram_match(
+                [
+                    Organization.organization_name,
+                    Organization.address,
+                    Organization.city,
+                    Organization.services_offered,
+                ],
+                search
+            )
+            query = query.where(condition)
+            fuzzy_scores.append(score)
+        elif search and search_mode == "fulltext":
+            condition, rank = fulltext_match(Organization.search_vector, search)
+            query = query.where(condition)
+            # Most relevant first, ties broken by the usual listing order
+            sort_keys = [SortKey(rank, True)] + ORGANIZATION_SORT_KEYS
+        elif search:
             search_lower = f"%{search.lower()}%"
-            query = query.filter(
+            query = query.where(
                 or_(
                     Organization.organization_name.ilike(search_lower),
                     Organization.address.ilike(search_lower),
@@ -43,65 +137,53 @@ async def get_organizations(
             # Handle "Windsor, ON" or "Windsor" - extract just the city name
             if city_lower == "windsor, on" or city_lower == "windsor":
                 # Filter by city name "Windsor" (case-insensitive)
-                query = query.filter(Organization.city.ilike("%windsor%"))
+                query = query.where(Organization.city.ilike("%windsor%"))
+            elif fuzzy:
+                condition, score = trigram_match([Organization.city], city_lower)
+                query = query.where(condition)
+                fuzzy_scores.append(score)
             else:
                 # For other cities, do a simple match on city name
-                query = query.filter(Organization.city.ilike(f"%{city_lower}%"))
+                query = query.where(Organization.city.ilike(f"%{city_lower}%"))
         
-        if sector_type:
-            query = query.filter(Organization.sector_type.ilike(f"%{sector_type}%"))
+        if sector_type and fuzzy:
+            condition, score = trigram_match([Organization.sector_type], sector_type)
+            query = query.where(condition)
+            fuzzy_scores.append(score)
+        elif sector_type:
+            query = query.where(Organization.sector_type.ilike(f"%{sector_type}%"))
         
-        # Get all organizations - order by organization_name
-        # Use coalesce to handle NULL values
-        db_organizations = query.order_by(
-            func.coalesce(Organization.organization_name, '').asc()
-        ).all()
+        if fuzzy_scores:
+            # Closest matches first, ties broken by the usual listing order
+            sort_keys = [SortKey(sum(fuzzy_scores[1:], fuzzy_scores[0]), True)] + ORGANIZATION_SORT_KEYS
         
-        # Convert to response format
-        organizations = []
-        for db_org in db_organizations:
-            try:
-                # Safely convert latitude/longitude
-                lat = None
-                lon = None
-                if db_org.latitude is not None:
-                    try:
-                        lat = float(db_org.latitude)
-                    except (ValueError, TypeError):
-                        lat = None
-                if db_org.longitude is not None:
-                    try:
-                        lon = float(db_org.longitude)
-                    except (ValueError, TypeError):
-                        lon = None
-                
-                org = OrganizationResponse(
-                    id=str(db_org.id),  # Convert to string
-                    organization_name=db_org.organization_name,
-                    city=db_org.city,
-                    address=db_org.address,
-                    latitude=lat,
-                    longitude=lon,
-                    province_state=db_org.province_state,
-                    sector_type=db_org.sector_type,
-                    services_offered=db_org.services_offered,
-                    website=db_org.website,
-                    email_address=db_org.email_address,
-                    phone_number=db_org.phone_number,
-                    contact_name=db_org.contact_name,
-                    notes=db_org.notes,
-                    created_at=db_org.created_at,
-                    external=False,  # Database organizations are not external
-                    external_id=None,
-                    external_url=None,
-                )
-                organizations.append(org)
-            except Exception as org_error:
-                print(f"Error processing organization {db_org.id}: {str(org_error)}")
-                continue
+        if stream:
+            return stream_ndjson(
+                db, query, sort_keys, _organization_to_response, cursor, limit
+            )
+        
+        async def build():
+            # Get organizations - order by relevance (when searching), then organization_name
+            # Use coalesce to handle NULL values
+            db_organizations, next_cursor = await paginate(db, query, sort_keys, cursor, limit)
+            headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
+            
+            # Convert to response format
+            organizations = []
+            for db_org in db_organizations:
+                try:
+                    organizations.append(_organization_to_response(db_org))
+                except Exception as org_error:
+                    print(f"Error processing organization {db_org.id}: {str(org_error)}")
+                    continue
+            return organizations, headers
         
-        return organizations
+        return await cached_json_response(
+            db, request, ("organizations",), build, headers={"ETag": etag}
+        )
         
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         error_trace = traceback.format_exc()
@@ -113,39 +195,20 @@ async def get_organizations(
         )
 
 @router.get("/{org_id}", response_model=OrganizationResponse)
-async def get_organization(org_id: str, db: Session = Depends(get_db)):
-    """Get a single organization by ID from database"""
+async def get_organization(org_id: str, request: Request, db: AsyncSession = Depends(get_async_db)):
+    """Get a single organization by ID from database (with ETag and Last-Modified validators)"""
     try:
-        # Get organization from database
-        db_org = db.query(Organization).filter(Organization.id == int(org_id)).first()
-        if not db_org:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Organization not found"
-            )
+        async def build():
+            # Get organization from database
+            db_org = await db.get(Organization, int(org_id))
+            if not db_org:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Organization not found"
+                )
+            return _organization_to_response(db_org), last_modified_headers(db_org)
         
-        # Convert database org to response format
-        org = OrganizationResponse(
-            id=str(db_org.id),  # Convert to string
-            organization_name=db_org.organization_name,
-            city=db_org.city,
-            address=db_org.address,
-            latitude=float(db_org.latitude) if db_org.latitude else None,
-            longitude=float(db_org.longitude) if db_org.longitude else None,
-            province_state=db_org.province_state,
-            sector_type=db_org.sector_type,
-            services_offered=db_org.services_offered,
-            website=db_org.website,
-            email_address=db_org.email_address,
-            phone_number=db_org.phone_number,
-            contact_name=db_org.contact_name,
-            notes=db_org.notes,
-            created_at=db_org.created_at,
-            external=False,  # Database organizations are not external
-            external_id=None,
-            external_url=None,
-        )
-        return org
+        return await cached_json_response(db, request, ("organizations",), build)
     except ValueError:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -162,46 +225,26 @@ async def get_organization(org_id: str, db: Session = Depends(get_db)):
 @router.post("/", response_model=OrganizationResponse, status_code=status.HTTP_201_CREATED)
 async def create_organization(
     organization: OrganizationCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new organization in database"""
     db_org = Organization(**organization.model_dump())
     db.add(db_org)
-    db.commit()
-    db.refresh(db_org)
+    await db.commit()
+    await db.run_sync(bump_catalog_version, "organizations")
+    await db.refresh(db_org)
     
-    # Convert to response format with string ID
-    org = OrganizationResponse(
-        id=str(db_org.id),
-        organization_name=db_org.organization_name,
-        city=db_org.city,
-        address=db_org.address,
-        latitude=float(db_org.latitude) if db_org.latitude else None,
-        longitude=float(db_org.longitude) if db_org.longitude else None,
-        province_state=db_org.province_state,
-        sector_type=db_org.sector_type,
-        services_offered=db_org.services_offered,
-        website=db_org.website,
-        email_address=db_org.email_address,
-        phone_number=db_org.phone_number,
-        contact_name=db_org.contact_name,
-        notes=db_org.notes,
-        created_at=db_org.created_at,
-        external=False,
-        external_id=None,
-        external_url=None,
-    )
-    return org
+    return _organization_to_response(db_org)
 
 @router.put("/{org_id}", response_model=OrganizationResponse)
 async def update_organization(
     org_id: str,
     org_update: OrganizationUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update an existing organization in database"""
     try:
-        db_org = db.query(Organization).filter(Organization.id == int(org_id)).first()
+        db_org = await db.get(Organization, int(org_id))
         if not db_org:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -212,31 +255,13 @@ async def update_organization(
         for key, value in update_data.items():
             setattr(db_org, key, value)
         
-        db.commit()
-        db.refresh(db_org)
+        # Programs carry the organization name in their read model
+        await db.run_sync(refresh_program_search, organization_ids=[db_org.id])
+        await db.commit()
+        await db.run_sync(bump_catalog_version, "organizations")
+        await db.refresh(db_org)
         
-        # Convert to response format with string ID
-        org = OrganizationResponse(
-            id=str(db_org.id),
-            organization_name=db_org.organization_name,
-            city=db_org.city,
-            address=db_org.address,
-            latitude=float(db_org.latitude) if db_org.latitude else None,
-            longitude=float(db_org.longitude) if db_org.longitude else None,
-            province_state=db_org.province_state,
-            sector_type=db_org.sector_type,
-            services_offered=db_org.services_offered,
-            website=db_org.website,
-            email_address=db_org.email_address,
-            phone_number=db_org.phone_number,
-            contact_name=db_org.contact_name,
-            notes=db_org.notes,
-            created_at=db_org.created_at,
-            external=False,
-            external_id=None,
-            external_url=None,
-        )
-        return org
+        return _organization_to_response(db_org)
     except ValueError:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -244,17 +269,18 @@ async def update_organization(
         )
 
 @router.delete("/{org_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_organization(org_id: str, db: Session = Depends(get_db)):
+async def delete_organization(org_id: str, db: AsyncSession = Depends(get_async_db)):
     """Delete an organization from database"""
     try:
-        db_org = db.query(Organization).filter(Organization.id == int(org_id)).first()
+        db_org = await db.get(Organization, int(org_id))
         if not db_org:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Organization not found"
             )
-        db.delete(db_org)
-        db.commit()
+        await db.delete(db_org)
+        await db.commit()
+        await db.run_sync(bump_catalog_version, "organizations")
         return None
     except ValueError:
         raise HTTPException(
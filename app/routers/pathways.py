@@ -1,7 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
-from app.database import get_db
+import asyncio
+import json
+from contextlib import aclosing
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from app.database import AsyncSessionLocal, get_async_db
 from app.models import Pathway, Organization, Event, Program
 from app.schemas import (
     PathwayCreate,
@@ -10,57 +16,240 @@ from app.schemas import (
     PathwayQuery,
     PathwayQueryResponse
 )
-from app.services.gemini_service import get_gemini_response
+from app.services.cache import (
+    CACHE_STATUS_HEADER,
+    bump_catalog_version,
+    cached_json_response,
+    catalog_versions,
+    on_catalog_bump,
+    recommendation_cache,
+    recommendation_flights,
+    recommendation_key,
+)
+from app.services.gemini_service import (
+    PATHWAY_TOP_K,
+    PROMPT_TABLES,
+    compile_prompt,
+    get_gemini_response,
+    prompt_cache,
+    require_model_client,
+    stream_gemini_response,
+)
+from app.services.metrics import ai_metrics
+from app.services.model_calls import ModelUnavailableError, gemini_guard
+from app.services.recommender import (
+    RECOMMENDER_TABLES,
+    RECOMMENDER_TOP_K,
+    ProgramRecommender,
+    answer_traffic,
+    precompute_recommendations,
+    recommender_cache,
+)
 
 router = APIRouter()
 
+# Keep proxies from buffering or caching the event stream
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+# Precomputed rankings are deep enough for both the local matches and the AI candidates
+PRECOMPUTE_TOP_K = max(RECOMMENDER_TOP_K, PATHWAY_TOP_K)
+
+# Running background jobs (the event loop only keeps weak references to tasks)
+_background_tasks = set()
+
 @router.get("/", response_model=List[PathwayResponse])
-async def get_pathways(db: Session = Depends(get_db)):
+async def get_pathways(request: Request, db: AsyncSession = Depends(get_async_db)):
     """Get all pathway questions"""
-    pathways = db.query(Pathway).order_by(Pathway.id).all()
-    return pathways
+    async def build():
+        pathways = (await db.execute(select(Pathway).order_by(Pathway.id))).scalars().all()
+        return [PathwayResponse.model_validate(pathway) for pathway in pathways], {}
+    
+    return await cached_json_response(db, request, ("pathways",), build)
 
 @router.get("/{pathway_id}", response_model=PathwayResponse)
-async def get_pathway(pathway_id: int, db: Session = Depends(get_db)):
+async def get_pathway(pathway_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
     """Get a single pathway by ID"""
-    pathway = db.query(Pathway).filter(Pathway.id == pathway_id).first()
-    if not pathway:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Pathway not found"
-        )
-    return pathway
+    async def build():
+        pathway = await db.get(Pathway, pathway_id)
+        if not pathway:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Pathway not found"
+            )
+        return PathwayResponse.model_validate(pathway), {}
+    
+    return await cached_json_response(db, request, ("pathways",), build)
 
 @router.post("/", response_model=PathwayResponse, status_code=status.HTTP_201_CREATED)
-async def create_pathway(pathway: PathwayCreate, db: Session = Depends(get_db)):
+async def create_pathway(pathway: PathwayCreate, db: AsyncSession = Depends(get_async_db)):
     """Create a new pathway"""
     db_pathway = Pathway(**pathway.model_dump())
     db.add(db_pathway)
-    db.commit()
-    db.refresh(db_pathway)
+    await db.commit()
+    await db.run_sync(bump_catalog_version, "pathways")
+    await db.refresh(db_pathway)
     return db_pathway
 
+async def _compiled_prompt(db: AsyncSession, fingerprint):
+    """The prompt compiled for this data version, compiling it if the data changed"""
+    compiled = prompt_cache.get(fingerprint)
+    if compiled is None:
+        pathways = (await db.execute(select(Pathway))).scalars().all()
+        organizations = (await db.execute(select(Organization))).scalars().all()
+        events = (await db.execute(select(Event))).scalars().all()
+        programs = (
+            await db.execute(select(Program).where(Program.is_active == True))
+        ).scalars().all()
+        compiled = await run_in_threadpool(
+            compile_prompt, pathways, organizations, events, programs
+        )
+        prompt_cache.set(fingerprint, compiled)
+    return compiled
+
+def _in_background(coroutine) -> None:
+    """Run `coroutine` as a tracked background task, logging its failure"""
+    def done(task: asyncio.Task) -> None:
+        _background_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Error in pathway recommender background job: {task.exception()}")
+
+    task = asyncio.create_task(coroutine)
+    _background_tasks.add(task)
+    task.add_done_callback(done)
+
+async def _recommender(db: AsyncSession, fingerprint) -> ProgramRecommender:
+    """
+    The local recommender for this data version, rebuilding it if pathways or
+    programs changed. A rebuild starts precomputing its rankings in the
+    background; queries are scored directly until that finishes.
+    
+    Writes through this API rebuild it right away (see _rebuild_after_write);
+    writes from other processes (importers, scripts) are picked up here, by
+    the first query after the catalog version poll sees them.
+    """
+    fingerprint = tuple(
+        version for table, version in zip(PROMPT_TABLES, fingerprint) if table in RECOMMENDER_TABLES
+    )
+    recommender = recommender_cache.get(fingerprint)
+    if recommender is None:
+        pathways = (await db.execute(select(Pathway))).scalars().all()
+        programs = (
+            await db.execute(select(Program).where(Program.is_active == True).order_by(Program.id))
+        ).scalars().all()
+        recommender = await run_in_threadpool(ProgramRecommender, pathways, programs)
+        recommender_cache.set(fingerprint, recommender)
+        _in_background(run_in_threadpool(precompute_recommendations, recommender, PRECOMPUTE_TOP_K))
+    return recommender
+
+async def _rebuild_recommender() -> None:
+    async with AsyncSessionLocal() as db:
+        fingerprint = await db.run_sync(catalog_versions.current, PROMPT_TABLES)
+        await _recommender(db, fingerprint)
+
+@on_catalog_bump
+def _rebuild_after_write(tables) -> None:
+    """
+    Rebuild the recommender and precompute its rankings as soon as pathways
+    or programs are written here, so queries after a write hit the table
+    """
+    if not set(tables) & set(RECOMMENDER_TABLES):
+        return
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return  # A script or importer bumping from outside the API
+    _in_background(_rebuild_recommender())
+
+def _candidate_ids(recommender: ProgramRecommender, answered) -> Optional[List[int]]:
+    """Programs to send to Gemini: the recommender's top PATHWAY_TOP_K, or None for all"""
+    if 0 < PATHWAY_TOP_K < len(recommender):
+        return [program_id for program_id, _ in recommender.rank(answered, PATHWAY_TOP_K)]
+    return None
+
+async def _generate_recommendation(fingerprint, key, recommender, answered) -> str:
+    """
+    Call the model with the compiled prompt and the recommender's candidates,
+    and cache the answer. Runs as a call shared by identical queries (see
+    SingleFlight), so it opens its own session instead of using a request's.
+    """
+    require_model_client()
+    async with AsyncSessionLocal() as db:
+        compiled = await _compiled_prompt(db, fingerprint)
+    program_ids = _candidate_ids(recommender, answered)
+    
+    # Blocking HTTP call: run it on the bounded model pool, within the deadline
+    ai_response = await gemini_guard.call(get_gemini_response, answered, compiled, program_ids)
+    recommendation_cache.set(key, ai_response)
+    return ai_response
+
+def _fallback_reason(error: ValueError) -> str:
+    """Metrics label for why a query got no model answer"""
+    return "model_unavailable" if isinstance(error, ModelUnavailableError) else "not_configured"
+
+async def _fallback_recommendations(db: AsyncSession, responses) -> List[dict]:
+    """Simple rule matching used when Gemini isn't configured or unavailable"""
+    pathways = (await db.execute(select(Pathway))).scalars().all()
+    recommendations = []
+    
+    for pathway in pathways:
+        if pathway.recommended_resources:
+            matches = False
+            if pathway.answer_options:
+                for key, value in responses.items():
+                    if key in pathway.answer_options:
+                        if str(value) == str(pathway.answer_options[key]):
+                            matches = True
+                            break
+            
+            if matches or not pathway.answer_options:
+                recommendations.append({
+                    "pathway_id": pathway.id,
+                    "question": pathway.question,
+                    "resources": pathway.recommended_resources
+                })
+    
+    return recommendations
+
 @router.post("/query", response_model=PathwayQueryResponse)
 async def query_pathway(
     query: PathwayQuery,
-    db: Session = Depends(get_db)
+    response: Response,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Submit pathway responses and get AI-powered recommendations from Gemini"""
+    """
+    Submit pathway responses and get program recommendations.
+    
+    `mode` picks the engine: `local` ranks programs with the deterministic
+    recommender only, `ai` (default) asks Gemini about the recommender's top
+    candidates, and `hybrid` returns both.
+    
+    AI answers are cached per answer set and catalog version, and identical
+    concurrent queries share one Gemini call (X-Cache: HIT, MISS or COALESCED).
+    When Gemini is not configured, at its concurrency limit, times out or its
+    circuit is open, `hybrid` returns just the local matches and `ai` the
+    rule-based fallback.
+    """
+    local = []
     try:
-        # Get all database data
-        pathways = db.query(Pathway).all()
-        organizations = db.query(Organization).all()
-        events = db.query(Event).all()
-        programs = db.query(Program).filter(Program.is_active == True).all()
+        fingerprint = await db.run_sync(catalog_versions.current, PROMPT_TABLES)
+        recommender = await _recommender(db, fingerprint)
+        answered = recommender.answers(query.responses)
+        answer_traffic.record(answered)
+        if query.mode != "ai":
+            local = recommender.recommendations(answered, RECOMMENDER_TOP_K)
+        if query.mode == "local":
+            return PathwayQueryResponse(recommendations=local)
         
-        # Get Gemini AI response
-        ai_response = get_gemini_response(
-            user_responses=query.responses,
-            pathways=pathways,
-            organizations=organizations,
-            events=events,
-            programs=programs
-        )
+        key = recommendation_key(fingerprint, query.responses)
+        ai_response = recommendation_cache.get(key)
+        cache_status = "HIT"
+        if ai_response is None:
+            ai_response, shared = await recommendation_flights.do(
+                key, lambda: _generate_recommendation(fingerprint, key, recommender, answered)
+            )
+            cache_status = "COALESCED" if shared else "MISS"
+        response.headers[CACHE_STATUS_HEADER] = cache_status
+        ai_metrics.increment("cache", cache_status)
         
         # Format response
         recommendations = [{
@@ -69,29 +258,13 @@ async def query_pathway(
             "source": "gemini_ai"
         }]
         
-        return PathwayQueryResponse(recommendations=recommendations)
+        return PathwayQueryResponse(recommendations=local + recommendations)
     except ValueError as e:
+        ai_metrics.increment("fallbacks", _fallback_reason(e))
+        if local:
+            return PathwayQueryResponse(recommendations=local)
         # If Gemini API key is not set, fall back to simple matching
-        pathways = db.query(Pathway).all()
-        recommendations = []
-        
-        for pathway in pathways:
-            if pathway.recommended_resources:
-                matches = False
-                if pathway.answer_options:
-                    for key, value in query.responses.items():
-                        if key in pathway.answer_options:
-                            if str(value) == str(pathway.answer_options[key]):
-                                matches = True
-                                break
-                
-                if matches or not pathway.answer_options:
-                    recommendations.append({
-                        "pathway_id": pathway.id,
-                        "question": pathway.question,
-                        "resources": pathway.recommended_resources
-                    })
-        
+        recommendations = await _fallback_recommendations(db, query.responses)
         return PathwayQueryResponse(recommendations=recommendations)
     except Exception as e:
         raise HTTPException(
@@ -99,14 +272,117 @@ async def query_pathway(
             detail=f"Error generating recommendations: {str(e)}"
         )
 
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@router.post("/query/stream")
+async def query_pathway_stream(
+    query: PathwayQuery,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Stream recommendations as server-sent events.
+    
+    Sends `start` right away. In `local` and `hybrid` mode a `recommendations`
+    event carries the recommender's matches next. In `ai` and `hybrid` mode,
+    `chunk` events ({"text": ...}) follow as Gemini produces them; a cached
+    answer is sent as a single chunk. The stream ends with `done`, or `error`
+    if generation fails. When Gemini is not configured, busy or its circuit
+    is open, `ai` mode sends one `fallback` event with the rule-matched
+    recommendations instead and `hybrid` mode ends after its local matches.
+    Generation stops when the client disconnects.
+    """
+    local = None
+    try:
+        fingerprint = await db.run_sync(catalog_versions.current, PROMPT_TABLES)
+        recommender = await _recommender(db, fingerprint)
+        answered = recommender.answers(query.responses)
+        answer_traffic.record(answered)
+        if query.mode != "ai":
+            local = recommender.recommendations(answered, RECOMMENDER_TOP_K)
+        key = recommendation_key(fingerprint, query.responses)
+        cached = recommendation_cache.get(key) if query.mode != "local" else None
+        compiled = None
+        if query.mode != "local" and cached is None:
+            require_model_client()
+            compiled = await _compiled_prompt(db, fingerprint)
+    except ValueError as e:
+        ai_metrics.increment("fallbacks", _fallback_reason(e))
+        if local is not None:
+            events = [_sse("recommendations", {"recommendations": local}), _sse("done", {})]
+        else:
+            recommendations = await _fallback_recommendations(db, query.responses)
+            events = [_sse("fallback", {"recommendations": recommendations}), _sse("done", {})]
+        return StreamingResponse(iter(events), media_type="text/event-stream", headers=SSE_HEADERS)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error generating recommendations: {str(e)}"
+        )
+    
+    async def events():
+        yield _sse("start", {"cache": "MISS" if cached is None else "HIT"})
+        if local is not None:
+            yield _sse("recommendations", {"recommendations": local})
+        if query.mode == "local":
+            yield _sse("done", {})
+            return
+        ai_metrics.increment("cache", "MISS" if cached is None else "HIT")
+        if cached is not None:
+            yield _sse("chunk", {"text": cached})
+            yield _sse("done", {})
+            return
+        
+        try:
+            gemini_guard.acquire()
+        except ModelUnavailableError as e:
+            ai_metrics.increment("fallbacks", _fallback_reason(e))
+            if local is None:
+                # The request's session may be gone by now, so use a fresh one
+                async with AsyncSessionLocal() as session:
+                    recommendations = await _fallback_recommendations(session, query.responses)
+                yield _sse("fallback", {"recommendations": recommendations})
+            yield _sse("done", {})
+            return
+        
+        # The model client is blocking; the guard pulls each piece on its
+        # thread pool. A disconnect cancels or closes this generator, and
+        # aclosing closes the guard's stream right away (not when it's
+        # garbage-collected), which releases the slot and drops the upstream
+        # stream. Until the guard's stream starts, the slot is ours to release.
+        parts = []
+        owns_slot = True
+        try:
+            chunks = stream_gemini_response(answered, compiled, _candidate_ids(recommender, answered))
+            async with aclosing(gemini_guard.stream(chunks)) as stream:
+                owns_slot = False
+                async for text in stream:
+                    parts.append(text)
+                    yield _sse("chunk", {"text": text})
+        except Exception as e:
+            yield _sse("error", {"detail": f"Error generating recommendations: {str(e)}"})
+            return
+        finally:
+            if owns_slot:
+                gemini_guard.release()
+        
+        recommendation_cache.set(key, "".join(parts))
+        yield _sse("done", {})
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={**SSE_HEADERS, CACHE_STATUS_HEADER: "MISS" if cached is None else "HIT"},
+    )
+
 @router.put("/{pathway_id}", response_model=PathwayResponse)
 async def update_pathway(
     pathway_id: int,
     pathway_update: PathwayUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update an existing pathway"""
-    db_pathway = db.query(Pathway).filter(Pathway.id == pathway_id).first()
+    db_pathway = await db.get(Pathway, pathway_id)
     if not db_pathway:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -117,20 +393,22 @@ async def update_pathway(
     for key, value in update_data.items():
         setattr(db_pathway, key, value)
     
-    db.commit()
-    db.refresh(db_pathway)
+    await db.commit()
+    await db.run_sync(bump_catalog_version, "pathways")
+    await db.refresh(db_pathway)
     return db_pathway
 
 @router.delete("/{pathway_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_pathway(pathway_id: int, db: Session = Depends(get_db)):
+async def delete_pathway(pathway_id: int, db: AsyncSession = Depends(get_async_db)):
     """Delete a pathway"""
-    db_pathway = db.query(Pathway).filter(Pathway.id == pathway_id).first()
+    db_pathway = await db.get(Pathway, pathway_id)
     if not db_pathway:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Pathway not found"
         )
-    db.delete(db_pathway)
-    db.commit()
+    await db.delete(db_pathway)
+    await db.commit()
+    await db.run_sync(bump_catalog_version, "pathways")
     return None
 
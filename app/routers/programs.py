@@ -1,149 +1,340 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import or_, func
-from typing import List, Optional
-from app.database import get_db
-from app.models import Program, Organization
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import contains_eager, joinedload
+from sqlalchemy import or_, func, select, tuple_
+from typing import List, Optional, Tuple
+from app.database import get_async_db
+from app.models import Program, Organization, ProgramSearch
 from app.schemas import (
+    FacetCount,
     ProgramCreate,
+    ProgramFacetsResponse,
     ProgramUpdate,
     ProgramResponse
 )
+from app.services.cache import bump_catalog_version, cached_json_response
+from app.services.program_search import refresh_program_search
+from app.utils.http_cache import (
+    collection_etag,
+    is_not_modified,
+    last_modified_headers,
+    not_modified,
+)
+from app.services.program_classifier import get_program_classifier
+from app.utils.program_categorizer import categorize_program, content_hash
+from app.utils.search import SearchMode, fulltext_match, trigram_match
+from app.utils.pagination import (
+    MAX_PAGE_SIZE,
+    NEXT_CURSOR_HEADER,
+    SortKey,
+    paginate,
+    stream_ndjson,
+)
 
 router = APIRouter()
 
-@router.get("/", response_model=List[ProgramResponse])
-async def get_programs(
+# Tables a cached program response is built from
+PROGRAM_CACHE_TABLES = ("programs", "organizations")
+
+# Listing order: title, then id as the keyset tie-breaker (matches ix_program_search_listing)
+PROGRAM_SORT_KEYS = [
+    SortKey(func.coalesce(ProgramSearch.title, '')),
+    SortKey(ProgramSearch.program_id),
+]
+
+# Facet dimensions counted by GET /facets (organization is added with its name)
+PROGRAM_FACET_COLUMNS = [
+    ("program_type", ProgramSearch.program_type),
+    ("stage", ProgramSearch.stage_normalized),
+    ("sector", ProgramSearch.sector),
+    ("cost", ProgramSearch.cost),
+]
+
+def _program_select():
+    """Program select that loads the owning organization in the same statement"""
+    return select(Program).options(joinedload(Program.organization))
+
+def _program_list_select():
+    """
+    List/search select over the program_search read model, joined to programs
+    by primary key for the remaining response fields
+    """
+    return (
+        select(ProgramSearch)
+        .join(Program, ProgramSearch.program_id == Program.id)
+        .options(contains_eager(ProgramSearch.program))
+    )
+
+async def _get_program_or_404(db: AsyncSession, program_id: int, refresh: bool = False) -> Program:
+    """Load a program with its organization; `refresh` overwrites an already-loaded instance"""
+    stmt = _program_select().where(Program.id == program_id)
+    if refresh:
+        stmt = stmt.execution_options(populate_existing=True)
+    program = (await db.execute(stmt)).scalars().first()
+    if not program:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Program with id {program_id} not found"
+        )
+    return program
+
+async def _categorize(program: Program) -> None:
+    """categorize_program() off the event loop: loading and running the classifier block"""
+    classifier = await run_in_threadpool(get_program_classifier)
+    await run_in_threadpool(categorize_program, program, classifier=classifier)
+
+def _program_to_response(program: Program, organization_name: Optional[str]) -> ProgramResponse:
+    """Map a Program row to the API response"""
+    return ProgramResponse(
+        id=program.id,
+        title=program.title,
+        description=program.description,
+        organization_id=program.organization_id,
+        organization_name=organization_name,
+        program_type=program.program_type,
+        stage=program.stage,
+        sector=program.sector,
+        eligibility_criteria=program.eligibility_criteria,
+        cost=program.cost,
+        duration=program.duration,
+        application_deadline=program.application_deadline,
+        start_date=program.start_date,
+        website=program.website,
+        application_link=program.application_link,
+        is_verified=program.is_verified,
+        is_active=program.is_active,
+        created_at=program.created_at,
+        updated_at=program.updated_at,
+    )
+
+def _detail_response(program: Program) -> ProgramResponse:
+    """Response for a program loaded with its organization (see _get_program_or_404)"""
+    org = program.organization
+    return _program_to_response(program, org.organization_name if org else None)
+
+def _search_row_to_response(row: ProgramSearch) -> ProgramResponse:
+    """Response for a read-model row with its program loaded (see _program_list_select)"""
+    return _program_to_response(row.program, row.organization_name)
+
+def _program_filters(
     search: Optional[str] = None,
+    search_mode: SearchMode = "fulltext",
     organization_id: Optional[int] = None,
     organization_name: Optional[str] = None,
     program_type: Optional[str] = None,
     stage: Optional[str] = None,
     sector: Optional[str] = None,
+    fuzzy: bool = False,
     is_active: Optional[bool] = True,
-    db: Session = Depends(get_db)
+) -> Tuple[list, List[SortKey]]:
+    """Filter query parameters shared by the list and facet endpoints: (conditions, rank keys)"""
+    conditions = []
+    
+    # Filter by active status
+    if is_active is not None:
+        conditions.append(ProgramSearch.is_active == is_active)
+    
+    # Relevance keys (search rank, fuzzy similarity) ordered ahead of the listing order
+    rank_keys = []
+    
+    # Apply search filter
+    if search and search_mode == "fulltext":
+        condition, rank = fulltext_match(ProgramSearch.search_vector, search)
+        conditions.append(condition)
+        rank_keys.append(SortKey(rank, True))
+    elif search:
+        search_lower = f"%{search.lower()}%"
+        conditions.append(
+            or_(
+                ProgramSearch.title.ilike(search_lower),
+                Program.description.ilike(search_lower)
+            )
+        )
+    
+    # Filter by organization
+    if organization_id:
+        conditions.append(ProgramSearch.organization_id == organization_id)
+    elif organization_name:
+        # Resolve the first matching organization inside the same statement
+        org_id = (
+            select(Organization.id)
+            .where(Organization.organization_name.ilike(f"%{organization_name}%"))
+            .limit(1)
+            .scalar_subquery()
+        )
+        conditions.append(
+            or_(ProgramSearch.organization_id == org_id, org_id.is_(None))
+        )
+    
+    # Filter by program type, stage (raw or normalized) and sector
+    fuzzy_scores = []
+    for columns, value in (
+        ([ProgramSearch.program_type], program_type),
+        ([ProgramSearch.stage, ProgramSearch.stage_normalized], stage),
+        ([ProgramSearch.sector], sector),
+    ):
+        if not value:
+            continue
+        if fuzzy:
+            condition, score = trigram_match(columns, value)
+            conditions.append(condition)
+            fuzzy_scores.append(score)
+        else:
+            conditions.append(or_(*[column.ilike(f"%{value}%") for column in columns]))
+    if fuzzy_scores:
+        rank_keys.append(SortKey(sum(fuzzy_scores[1:], fuzzy_scores[0]), True))
+    
+    return conditions, rank_keys
+
+@router.get("/", response_model=List[ProgramResponse])
+async def get_programs(
+    request: Request,
+    filters: Tuple[list, List[SortKey]] = Depends(_program_filters),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    stream: bool = False,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get all programs with optional filtering"""
+    """
+    Get all programs with optional filtering.
+    
+    `search` is a ranked full-text query by default; `search_mode=ilike` falls
+    back to substring matching. `fuzzy=true` makes program_type, stage and
+    sector typo-tolerant trigram matches ranked by similarity. Pass `limit` to
+    page through results; the next page's cursor is returned in the
+    X-Next-Cursor header. `stream=true` returns NDJSON instead of an array.
+    Filtering and ordering run against the program_search read model.
+    """
     try:
-        query = db.query(Program)
-        
-        # Filter by active status
-        if is_active is not None:
-            query = query.filter(Program.is_active == is_active)
+        # Answer revalidations from the tables' fingerprint before running the query
+        etag = await db.run_sync(collection_etag, request, Program, Organization)
+        if is_not_modified(request, {"ETag": etag}):
+            return not_modified({"ETag": etag})
         
-        # Apply search filter
-        if search:
-            search_lower = f"%{search.lower()}%"
-            query = query.filter(
-                or_(
-                    Program.title.ilike(search_lower),
-                    Program.description.ilike(search_lower)
-                )
-            )
+        conditions, rank_keys = filters
+        query = _program_list_select().where(*conditions)
+        sort_keys = rank_keys + PROGRAM_SORT_KEYS
         
-        # Filter by organization
-        if organization_id:
-            query = query.filter(Program.organization_id == organization_id)
-        elif organization_name:
-            org = (
-                db.query(Organization)
-                .filter(Organization.organization_name.ilike(f"%{organization_name}%"))
-                .first()
-            )
-            if org:
-                query = query.filter(Program.organization_id == org.id)
+        if stream:
+            return stream_ndjson(db, query, sort_keys, _search_row_to_response, cursor, limit)
         
-        # Filter by program type
-        if program_type:
-            query = query.filter(Program.program_type.ilike(f"%{program_type}%"))
+        async def build():
+            # Order by relevance (when searching), then title
+            rows, next_cursor = await paginate(db, query, sort_keys, cursor, limit)
+            headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
+            return [_search_row_to_response(row) for row in rows], headers
         
-        # Filter by stage
-        if stage:
-            query = query.filter(Program.stage.ilike(f"%{stage}%"))
-        
-        # Filter by sector
-        if sector:
-            query = query.filter(Program.sector.ilike(f"%{sector}%"))
+        return await cached_json_response(
+            db, request, PROGRAM_CACHE_TABLES, build, headers={"ETag": etag}
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error fetching programs: {str(e)}"
+        )
+
+def _facets_from_rows(rows) -> ProgramFacetsResponse:
+    """
+    Split GROUPING SETS rows into per-dimension counts.
+    
+    Each row is (facet values..., organization_id, organization_name,
+    grouping flags..., count); a flag of 0 marks the dimension the row counts.
+    """
+    n = len(PROGRAM_FACET_COLUMNS)
+    facets = {name: [] for name, _ in PROGRAM_FACET_COLUMNS}
+    facets["organization"] = []
+    total = 0
+    for row in rows:
+        values, (org_id, org_name) = row[:n], row[n:n + 2]
+        grouped_out, count = row[n + 2:-1], row[-1]
+        if not grouped_out[n]:
+            facets["organization"].append(FacetCount(value=org_name, id=org_id, count=count))
+            continue
+        for i, (name, _) in enumerate(PROGRAM_FACET_COLUMNS):
+            if not grouped_out[i]:
+                facets[name].append(FacetCount(value=values[i], count=count))
+                break
+        else:
+            total = count
+    # Largest buckets first, the NULL bucket last among equals
+    for counts in facets.values():
+        counts.sort(key=lambda c: (-c.count, c.value is None, c.value or ""))
+    return ProgramFacetsResponse(total=total, facets=facets)
+
+@router.get("/facets", response_model=ProgramFacetsResponse)
+async def get_program_facets(
+    request: Request,
+    filters: Tuple[list, List[SortKey]] = Depends(_program_filters),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Counts per program_type, stage, sector, cost and organization for the
+    programs matching the same filters as GET /api/programs/.
+    
+    All dimensions come from one GROUPING SETS query; `grouping()` tells which
+    set a row belongs to, so NULL values are counted as their own bucket.
+    """
+    try:
+        etag = await db.run_sync(collection_etag, request, Program, Organization)
+        if is_not_modified(request, {"ETag": etag}):
+            return not_modified({"ETag": etag})
         
-        # Order by title
-        programs = query.order_by(func.coalesce(Program.title, '').asc()).all()
+        conditions, _ = filters
         
-        # Convert to response format with organization name
-        result = []
-        for program in programs:
-            org = db.query(Organization).filter(Organization.id == program.organization_id).first()
-            program_dict = {
-                "id": program.id,
-                "title": program.title,
-                "description": program.description,
-                "organization_id": program.organization_id,
-                "organization_name": org.organization_name if org else None,
-                "program_type": program.program_type,
-                "stage": program.stage,
-                "sector": program.sector,
-                "eligibility_criteria": program.eligibility_criteria,
-                "cost": program.cost,
-                "duration": program.duration,
-                "application_deadline": program.application_deadline,
-                "start_date": program.start_date,
-                "website": program.website,
-                "application_link": program.application_link,
-                "is_verified": program.is_verified,
-                "is_active": program.is_active,
-                "created_at": program.created_at,
-                "updated_at": program.updated_at,
-            }
-            result.append(ProgramResponse(**program_dict))
+        async def build():
+            columns = [column for _, column in PROGRAM_FACET_COLUMNS]
+            grouping_sets = columns + [
+                tuple_(ProgramSearch.organization_id, ProgramSearch.organization_name),
+                tuple_(),  # grand total
+            ]
+            stmt = (
+                select(
+                    *columns,
+                    ProgramSearch.organization_id,
+                    ProgramSearch.organization_name,
+                    *[func.grouping(column) for column in columns],
+                    func.grouping(ProgramSearch.organization_id),
+                    func.count(),
+                )
+                .select_from(ProgramSearch)
+                .join(Program, ProgramSearch.program_id == Program.id)
+                .where(*conditions)
+                .group_by(func.grouping_sets(*grouping_sets))
+            )
+            rows = (await db.execute(stmt)).all()
+            return _facets_from_rows(rows), {}
         
-        return result
+        return await cached_json_response(
+            db, request, PROGRAM_CACHE_TABLES, build, headers={"ETag": etag}
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error fetching programs: {str(e)}"
+            detail=f"Error fetching program facets: {str(e)}"
         )
 
 @router.get("/{program_id}", response_model=ProgramResponse)
-async def get_program(program_id: int, db: Session = Depends(get_db)):
-    """Get a single program by ID"""
-    program = db.query(Program).filter(Program.id == program_id).first()
-    if not program:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Program with id {program_id} not found"
-        )
+async def get_program(program_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    """Get a single program by ID (with ETag and Last-Modified validators)"""
+    async def build():
+        program = await _get_program_or_404(db, program_id)
+        return _detail_response(program), last_modified_headers(program)
     
-    org = db.query(Organization).filter(Organization.id == program.organization_id).first()
-    program_dict = {
-        "id": program.id,
-        "title": program.title,
-        "description": program.description,
-        "organization_id": program.organization_id,
-        "organization_name": org.organization_name if org else None,
-        "program_type": program.program_type,
-        "stage": program.stage,
-        "sector": program.sector,
-        "eligibility_criteria": program.eligibility_criteria,
-        "cost": program.cost,
-        "duration": program.duration,
-        "application_deadline": program.application_deadline,
-        "start_date": program.start_date,
-        "website": program.website,
-        "application_link": program.application_link,
-        "is_verified": program.is_verified,
-        "is_active": program.is_active,
-        "created_at": program.created_at,
-        "updated_at": program.updated_at,
-    }
-    return ProgramResponse(**program_dict)
+    return await cached_json_response(db, request, PROGRAM_CACHE_TABLES, build)
 
 @router.post("/", response_model=ProgramResponse, status_code=status.HTTP_201_CREATED)
 async def create_program(
     program: ProgramCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new program"""
     # Verify organization exists
-    org = db.query(Organization).filter(Organization.id == program.organization_id).first()
+    org = await db.get(Organization, program.organization_id)
     if not org:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -151,90 +342,60 @@ async def create_program(
         )
     
     db_program = Program(**program.model_dump())
+    # A stage given by the client is kept; otherwise it's derived from the text
+    if db_program.stage:
+        db_program.content_hash = content_hash(db_program.title, db_program.description)
+    else:
+        await _categorize(db_program)
     db.add(db_program)
-    db.commit()
-    db.refresh(db_program)
-    
-    program_dict = {
-        "id": db_program.id,
-        "title": db_program.title,
-        "description": db_program.description,
-        "organization_id": db_program.organization_id,
-        "organization_name": org.organization_name,
-        "program_type": db_program.program_type,
-        "stage": db_program.stage,
-        "sector": db_program.sector,
-        "eligibility_criteria": db_program.eligibility_criteria,
-        "cost": db_program.cost,
-        "duration": db_program.duration,
-        "application_deadline": db_program.application_deadline,
-        "start_date": db_program.start_date,
-        "website": db_program.website,
-        "application_link": db_program.application_link,
-        "is_verified": db_program.is_verified,
-        "is_active": db_program.is_active,
-        "created_at": db_program.created_at,
-        "updated_at": db_program.updated_at,
-    }
-    return ProgramResponse(**program_dict)
+    await db.flush()
+    program_id = db_program.id
+    await db.run_sync(refresh_program_search, [program_id])
+    await db.commit()
+    await db.run_sync(bump_catalog_version, "programs")
+    
+    # Reload the committed row together with its organization
+    return _detail_response(await _get_program_or_404(db, program_id, refresh=True))
 
 @router.put("/{program_id}", response_model=ProgramResponse)
 async def update_program(
     program_id: int,
     program_update: ProgramUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update an existing program"""
-    db_program = db.query(Program).filter(Program.id == program_id).first()
-    if not db_program:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Program with id {program_id} not found"
-        )
+    db_program = await _get_program_or_404(db, program_id)
     
     # Update fields
     update_data = program_update.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_program, field, value)
     
-    db.commit()
-    db.refresh(db_program)
-    
-    org = db.query(Organization).filter(Organization.id == db_program.organization_id).first()
-    program_dict = {
-        "id": db_program.id,
-        "title": db_program.title,
-        "description": db_program.description,
-        "organization_id": db_program.organization_id,
-        "organization_name": org.organization_name if org else None,
-        "program_type": db_program.program_type,
-        "stage": db_program.stage,
-        "sector": db_program.sector,
-        "eligibility_criteria": db_program.eligibility_criteria,
-        "cost": db_program.cost,
-        "duration": db_program.duration,
-        "application_deadline": db_program.application_deadline,
-        "start_date": db_program.start_date,
-        "website": db_program.website,
-        "application_link": db_program.application_link,
-        "is_verified": db_program.is_verified,
-        "is_active": db_program.is_active,
-        "created_at": db_program.created_at,
-        "updated_at": db_program.updated_at,
-    }
-    return ProgramResponse(**program_dict)
+    # Recategorize only when the update touches the title or description, and
+    # doesn't set the stage itself; other edits keep the curated categories
+    if "stage" in update_data:
+        db_program.content_hash = content_hash(db_program.title, db_program.description)
+    elif "title" in update_data or "description" in update_data:
+        await _categorize(db_program)
+    
+    await db.run_sync(refresh_program_search, [program_id])
+    await db.commit()
+    await db.run_sync(bump_catalog_version, "programs")
+    
+    # Reload the committed row together with its (possibly new) organization
+    return _detail_response(await _get_program_or_404(db, program_id, refresh=True))
 
 @router.delete("/{program_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_program(program_id: int, db: Session = Depends(get_db)):
+async def delete_program(program_id: int, db: AsyncSession = Depends(get_async_db)):
     """Delete a program"""
-    db_program = db.query(Program).filter(Program.id == program_id).first()
+    db_program = await db.get(Program, program_id)
     if not db_program:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Program with id {program_id} not found"
         )
     
-    db.delete(db_program)
-    db.commit()
+    await db.delete(db_program)
+    await db.commit()
+    await db.run_sync(bump_catalog_version, "programs")
     return None
-
@@ -1,25 +1,55 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
-from app.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from app.database import get_async_db
 from app.models import SearchLog
 from app.schemas import SearchLogCreate, SearchLogResponse
+from app.utils.pagination import (
+    MAX_PAGE_SIZE,
+    NEXT_CURSOR_HEADER,
+    SortKey,
+    paginate,
+    stream_ndjson,
+)
 
 router = APIRouter()
 
+# Listing order: most recent first, then id as the keyset tie-breaker
+SEARCH_LOG_SORT_KEYS = [SortKey(SearchLog.created_at, True), SortKey(SearchLog.id, True)]
+
 @router.post("/log", response_model=SearchLogResponse, status_code=status.HTTP_201_CREATED)
-async def log_search(search_log: SearchLogCreate, db: Session = Depends(get_db)):
+async def log_search(search_log: SearchLogCreate, db: AsyncSession = Depends(get_async_db)):
     """Log a failed or successful search query"""
     db_log = SearchLog(**search_log.model_dump())
     db.add(db_log)
-    db.commit()
-    db.refresh(db_log)
+    await db.commit()
+    await db.refresh(db_log)
     return db_log
 
 @router.get("/logs", response_model=List[SearchLogResponse])
-async def get_search_logs(db: Session = Depends(get_db)):
-    """Get all search logs (admin view)"""
-    logs = db.query(SearchLog).order_by(SearchLog.created_at.desc()).all()
+async def get_search_logs(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    stream: bool = False,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get search logs (admin view).
+    
+    Supports keyset pagination (`limit`/`cursor`, next cursor in X-Next-Cursor)
+    and NDJSON streaming with `stream=true`.
+    """
+    query = select(SearchLog)
+    if stream:
+        return stream_ndjson(
+            db, query, SEARCH_LOG_SORT_KEYS, SearchLogResponse.model_validate, cursor, limit
+        )
+    
+    logs, next_cursor = await paginate(db, query, SEARCH_LOG_SORT_KEYS, cursor, limit)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     return logs
 
 
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, HttpUrl, field_validator, EmailStr
 from datetime import date, datetime
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Literal
 
 # Event Schemas
 class EventBase(BaseModel):
@@ -123,6 +123,7 @@ class PathwayResponse(PathwayBase):
 
 class PathwayQuery(BaseModel):
     responses: Dict[str, Any]
+    mode: Literal["local", "ai", "hybrid"] = "ai"  # local recommender, Gemini, or both
 
 class PathwayQueryResponse(BaseModel):
     recommendations: List[Dict[str, Any]]
@@ -219,3 +220,12 @@ class ProgramResponse(ProgramBase):
     class Config:
         from_attributes = True
 
+class FacetCount(BaseModel):
+    value: Optional[str] = None  # None counts programs with no value
+    id: Optional[int] = None  # Organization id (organization facet only)
+    count: int
+
+class ProgramFacetsResponse(BaseModel):
+    total: int
+    facets: Dict[str, List[FacetCount]]  # program_type, stage, sector, cost, organization
+
@@ -0,0 +1,292 @@
+"""
+In-process read-through cache for the catalog endpoints.
+
+Entries are keyed on the request path, the normalized query parameters and the
+generation counters of the tables the response was built from. Writes bump the
+counters (stored in the catalog_versions table so the scraper importers can
+invalidate a running server), which makes every dependent entry unreachable;
+stale entries then age out through the LRU and TTL bounds.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models import CatalogVersion
+from app.utils.http_cache import (
+    body_etag,
+    is_not_modified,
+    normalized_query_params,
+    not_modified,
+)
+
+CATALOG_CACHE_MAX_ENTRIES = int(os.getenv("CATALOG_CACHE_MAX_ENTRIES", "1024"))
+CATALOG_CACHE_TTL_SECONDS = float(os.getenv("CATALOG_CACHE_TTL_SECONDS", "300"))
+# Generated pathway recommendations, keyed on the normalized answers and data version
+RECOMMENDATION_CACHE_MAX_ENTRIES = int(os.getenv("RECOMMENDATION_CACHE_MAX_ENTRIES", "512"))
+RECOMMENDATION_CACHE_TTL_SECONDS = float(os.getenv("RECOMMENDATION_CACHE_TTL_SECONDS", "3600"))
+# How often to re-read catalog_versions so bumps from other processes are seen
+CATALOG_VERSION_POLL_SECONDS = float(os.getenv("CATALOG_VERSION_POLL_SECONDS", "2"))
+
+CACHE_STATUS_HEADER = "X-Cache"
+
+
+class LRUTTLCache:
+    """Thread-safe mapping bounded by entry count (LRU eviction) and age (TTL)"""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class CatalogVersions:
+    """Per-table generation counters backed by the catalog_versions table"""
+
+    def __init__(self, poll_seconds: float):
+        self.poll_seconds = poll_seconds
+        self._versions: Dict[str, int] = {}
+        self._polled_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def _merge(self, versions: Dict[str, int]) -> None:
+        with self._lock:
+            for table, version in versions.items():
+                # Never move backwards if a local bump raced with a poll
+                if version > self._versions.get(table, 0):
+                    self._versions[table] = version
+
+    def current(self, db: Session, tables: Sequence[str]) -> Tuple[int, ...]:
+        """Current generation of each table, re-reading the shared counters when due"""
+        if time.monotonic() - self._polled_at >= self.poll_seconds:
+            rows = db.query(CatalogVersion.table_name, CatalogVersion.version).all()
+            self._merge({name: version for name, version in rows})
+            self._polled_at = time.monotonic()
+        with self._lock:
+            return tuple(self._versions.get(table, 0) for table in tables)
+
+    def bump(self, db: Session, *tables: str) -> None:
+        """Increment the generation of each table and commit"""
+        bumped = {}
+        for table in tables:
+            stmt = (
+                insert(CatalogVersion)
+                .values(table_name=table, version=1)
+                .on_conflict_do_update(
+                    index_elements=[CatalogVersion.table_name],
+                    set_={"version": CatalogVersion.version + 1},
+                )
+                .returning(CatalogVersion.version)
+            )
+            bumped[table] = db.execute(stmt).scalar_one()
+        db.commit()
+        self._merge(bumped)
+
+
+class VersionedCache:
+    """Holds one value built for the latest data-version fingerprint"""
+
+    def __init__(self):
+        self._fingerprint: Optional[Hashable] = None
+        self._value: Optional[Any] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, fingerprint: Hashable) -> Optional[Any]:
+        with self._lock:
+            if self._value is not None and self._fingerprint == fingerprint:
+                self.hits += 1
+                return self._value
+            self.misses += 1
+            return None
+
+    def set(self, fingerprint: Hashable, value: Any) -> None:
+        with self._lock:
+            self._fingerprint = fingerprint
+            self._value = value
+
+    def latest(self) -> Optional[Any]:
+        """The value for the last fingerprint set, whether or not it's still current"""
+        with self._lock:
+            return self._value
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "fingerprint": list(self._fingerprint) if self._fingerprint is not None else None,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+class SingleFlight:
+    """Coalesces concurrent async calls that share a key into one in-flight call"""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Run `fn()` in its own task unless a call for `key` is already running,
+        in which case wait for that call's result (or exception) instead.
+
+        Every caller, including the one that started it, awaits the task
+        through asyncio.shield, so a caller that is cancelled (e.g. its client
+        disconnected) leaves the call running for the others. `fn` therefore
+        must not use state owned by one request, such as its database session.
+        Returns (result, shared) where shared is True for a coalesced caller.
+        """
+        call = self._calls.get(key)
+        shared = call is not None
+        if shared:
+            self.coalesced += 1
+        else:
+            call = self._calls[key] = asyncio.ensure_future(fn())
+            call.add_done_callback(lambda task: self._finished(key, task))
+        return await asyncio.shield(call), shared
+
+    def _finished(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark it retrieved so an exception nobody waited for isn't logged
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"in_flight": len(self._calls), "coalesced": self.coalesced}
+
+
+catalog_cache = LRUTTLCache(CATALOG_CACHE_MAX_ENTRIES, CATALOG_CACHE_TTL_SECONDS)
+catalog_versions = CatalogVersions(CATALOG_VERSION_POLL_SECONDS)
+recommendation_cache = LRUTTLCache(RECOMMENDATION_CACHE_MAX_ENTRIES, RECOMMENDATION_CACHE_TTL_SECONDS)
+recommendation_flights = SingleFlight()
+
+
+def recommendation_key(versions: Tuple[int, ...], responses: Dict[Any, Any]) -> Tuple[Tuple[int, ...], str]:
+    """
+    Cache key for a pathway query: the catalog versions plus a hash of the
+    answers, normalized so key order and int/str spelling don't matter.
+    """
+    normalized = json.dumps(
+        sorted((str(pathway_id), str(answer)) for pathway_id, answer in responses.items())
+    )
+    return versions, hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+# Called with the bumped tables after each bump in this process
+_bump_listeners: List[Callable[[Tuple[str, ...]], None]] = []
+
+
+def on_catalog_bump(listener: Callable[[Tuple[str, ...]], None]) -> Callable[[Tuple[str, ...]], None]:
+    """Register `listener` to run after every bump_catalog_version() in this process"""
+    _bump_listeners.append(listener)
+    return listener
+
+
+def bump_catalog_version(db: Session, *tables: str) -> None:
+    """
+    Invalidate cached reads of `tables`; call after the write has been committed.
+
+    From an AsyncSession: `await db.run_sync(bump_catalog_version, *tables)`.
+    """
+    catalog_versions.bump(db, *tables)
+    for listener in _bump_listeners:
+        listener(tables)
+
+
+async def cached_json_response(
+    db: AsyncSession,
+    request: Request,
+    tables: Sequence[str],
+    build: Callable[[], Awaitable[Tuple[Any, Dict[str, str]]]],
+    headers: Optional[Dict[str, str]] = None,
+) -> Response:
+    """
+    Serve a JSON GET response from the catalog cache.
+
+    `build` is awaited on a miss and returns (payload, headers); the payload is
+    serialized once and the rendered bytes are cached together with the headers
+    and a strong ETag of the body. Extra `headers` (e.g. a precomputed ETag)
+    override the cached ones. Conditional requests that match get a 304.
+    Exceptions raised by `build` (e.g. a 404) propagate and are not cached.
+    """
+    versions = await db.run_sync(catalog_versions.current, tables)
+    key = (request.url.path, normalized_query_params(request), tuple(tables), versions)
+    cached = catalog_cache.get(key)
+    status = "HIT"
+    if cached is None:
+        payload, built_headers = await build()
+        body = JSONResponse(content=jsonable_encoder(payload)).body
+        cached = (body, {"ETag": body_etag(body), **built_headers})
+        catalog_cache.set(key, cached)
+        status = "MISS"
+    body, cached_headers = cached
+    response_headers = {**cached_headers, **(headers or {})}
+    if is_not_modified(request, response_headers):
+        return not_modified(response_headers)
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={**response_headers, CACHE_STATUS_HEADER: status},
+    )
@@ -1,12 +1,18 @@
 """
 Gemini AI service for pathway recommendations
 """
+import json
 import os
+import time
+from abc import ABC, abstractmethod
 from dotenv import load_dotenv
 import google.generativeai as genai
-from typing import Dict, List, Any
+import httpx
+from typing import Dict, Iterator, List, Any, Optional, Tuple
 from app.models import Pathway, Organization, Event, Program
-from sqlalchemy.orm import Session
+from app.services.cache import VersionedCache
+from app.services.metrics import ai_metrics, estimate_tokens
+from app.services.prompt_budget import PROMPT_FORMAT, PROMPT_TOKEN_BUDGET, CompactCatalog
 
 # Load environment variables
 load_dotenv()
@@ -16,11 +22,19 @@ GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 if GEMINI_API_KEY:
     genai.configure(api_key=GEMINI_API_KEY)
 
+# Model client behind pathway queries: "gemini", or "http" for a server speaking
+# HTTPModelClient's protocol (e.g. the local stand-in in scripts/fake_model_server.py)
+MODEL_CLIENT = os.getenv("MODEL_CLIENT", "gemini")
+MODEL_SERVER_URL = os.getenv("MODEL_SERVER_URL", "http://127.0.0.1:8090")
 
-def build_system_prompt(pathways: List[Pathway], organizations: List[Organization], events: List[Event], programs: List[Program]) -> str:
-    """Build a comprehensive system prompt with all database information"""
-    
-    prompt = """You are an AI assistant for the Windsor-Essex Innovation Zone Ecosystem Platform. 
+# Programs sent to the model per query, picked by the local recommender; 0 sends the whole catalog
+PATHWAY_TOP_K = int(os.getenv("PATHWAY_TOP_K", "25"))
+
+
+# Tables the compiled prompt is built from; their catalog versions fingerprint it
+PROMPT_TABLES = ("pathways", "organizations", "events", "programs")
+
+PROMPT_HEADER = """You are an AI assistant for the Windsor-Essex Innovation Zone Ecosystem Platform. 
 Your role is to provide personalized recommendations to users based on their responses to pathway questions.
 
 You MUST only use information from the database provided below. Do not make up or suggest resources that are not in the database.
@@ -29,105 +43,95 @@ DATABASE INFORMATION:
 
 === PATHWAYS ===
 """
-    
-    # Add all pathways
-    for pathway in pathways:
-        prompt += f"\nPathway ID: {pathway.id}\n"
-        prompt += f"Question: {pathway.question}\n"
-        if pathway.answer_options:
-            prompt += "Answer Options:\n"
-            for key, value in pathway.answer_options.items():
-                prompt += f"  - {key}: {value}\n"
-        if pathway.recommended_resources:
-            prompt += "Recommended Resources:\n"
-            prompt += f"{pathway.recommended_resources}\n"
-        prompt += "\n"
-    
-    prompt += "\n=== ORGANIZATIONS ===\n"
-    # Add all organizations
-    for org in organizations:
-        prompt += f"\nOrganization ID: {org.id}\n"
-        if org.organization_name:
-            prompt += f"Organization Name: {org.organization_name}\n"
-        if org.sector_type:
-            prompt += f"Sector Type: {org.sector_type}\n"
-        if org.services_offered:
-            prompt += f"Services Offered: {org.services_offered}\n"
-        if org.city:
-            prompt += f"City: {org.city}\n"
-        if org.province_state:
-            prompt += f"Province/State: {org.province_state}\n"
-        if org.address:
-            prompt += f"Address: {org.address}\n"
-        if org.website:
-            prompt += f"Website: {org.website}\n"
-        if org.email_address:
-            prompt += f"Email: {org.email_address}\n"
-        if org.phone_number:
-            prompt += f"Phone: {org.phone_number}\n"
-        if org.contact_name:
-            prompt += f"Contact Name: {org.contact_name}\n"
-        if org.notes:
-            prompt += f"Notes: {org.notes}\n"
-        prompt += "\n"
-    
-    prompt += f"\n=== PROGRAMS ===\n"
-    prompt += f"Total Programs Available: {len(programs)}\n\n"
-    # Add all programs
-    for program in programs:
-        prompt += f"\nProgram ID: {program.id}\n"
-        prompt += f"Title: {program.title}\n"
-        if program.description:
-            prompt += f"Description: {program.description}\n"
-        if program.organization_id:
-            # Find organization name
-            org = next((o for o in organizations if o.id == program.organization_id), None)
-            if org and org.organization_name:
-                prompt += f"Organization: {org.organization_name}\n"
-        if program.program_type:
-            prompt += f"Program Type: {program.program_type}\n"
-        if program.stage:
-            prompt += f"Business Stage: {program.stage}\n"
-        if program.sector:
-            prompt += f"Sector: {program.sector}\n"
-        if program.eligibility_criteria:
-            prompt += f"Eligibility: {program.eligibility_criteria}\n"
-        if program.cost:
-            prompt += f"Cost: {program.cost}\n"
-        if program.duration:
-            prompt += f"Duration: {program.duration}\n"
-        if program.application_deadline:
-            prompt += f"Application Deadline: {program.application_deadline}\n"
-        if program.start_date:
-            prompt += f"Start Date: {program.start_date}\n"
-        if program.website:
-            prompt += f"Website: {program.website}\n"
-        if program.application_link:
-            prompt += f"Application Link: {program.application_link}\n"
-        if program.is_verified:
-            prompt += f"Verified: Yes (Innovation Zone Verified)\n"
-        prompt += "\n"
-    
-    prompt += "\n=== EVENTS ===\n"
-    # Add all events
-    for event in events:
-        prompt += f"\nEvent ID: {event.id}\n"
-        prompt += f"Title: {event.title}\n"
-        prompt += f"Description: {event.description}\n"
-        prompt += f"Category: {event.category}\n"
-        prompt += f"Audience: {event.audience}\n"
-        prompt += f"Location: {event.location}\n"
-        prompt += f"Start Date: {event.start_date}\n"
-        if event.end_date:
-            prompt += f"End Date: {event.end_date}\n"
-        if event.link:
-            prompt += f"Link: {event.link}\n"
-        prompt += "\n"
-    
-    # Count programs for the prompt
-    program_count = len(programs)
-    
-    prompt += f"""
+
+ORGANIZATION_FIELDS = [
+    ("organization_name", "Organization Name"),
+    ("sector_type", "Sector Type"),
+    ("services_offered", "Services Offered"),
+    ("city", "City"),
+    ("province_state", "Province/State"),
+    ("address", "Address"),
+    ("website", "Website"),
+    ("email_address", "Email"),
+    ("phone_number", "Phone"),
+    ("contact_name", "Contact Name"),
+    ("notes", "Notes"),
+]
+
+PROGRAM_FIELDS = [
+    ("program_type", "Program Type"),
+    ("stage", "Business Stage"),
+    ("sector", "Sector"),
+    ("eligibility_criteria", "Eligibility"),
+    ("cost", "Cost"),
+    ("duration", "Duration"),
+    ("application_deadline", "Application Deadline"),
+    ("start_date", "Start Date"),
+    ("website", "Website"),
+    ("application_link", "Application Link"),
+]
+
+
+def _pathway_block(pathway: Pathway) -> str:
+    parts = [f"\nPathway ID: {pathway.id}\n", f"Question: {pathway.question}\n"]
+    if pathway.answer_options:
+        parts.append("Answer Options:\n")
+        for key, value in pathway.answer_options.items():
+            parts.append(f"  - {key}: {value}\n")
+    if pathway.recommended_resources:
+        parts.append("Recommended Resources:\n")
+        parts.append(f"{pathway.recommended_resources}\n")
+    parts.append("\n")
+    return "".join(parts)
+
+
+def _organization_block(org: Organization) -> str:
+    parts = [f"\nOrganization ID: {org.id}\n"]
+    for attr, label in ORGANIZATION_FIELDS:
+        value = getattr(org, attr)
+        if value:
+            parts.append(f"{label}: {value}\n")
+    parts.append("\n")
+    return "".join(parts)
+
+
+def _program_block(program: Program, organization_names: Dict[int, str]) -> str:
+    parts = [f"\nProgram ID: {program.id}\n", f"Title: {program.title}\n"]
+    if program.description:
+        parts.append(f"Description: {program.description}\n")
+    organization_name = organization_names.get(program.organization_id)
+    if organization_name:
+        parts.append(f"Organization: {organization_name}\n")
+    for attr, label in PROGRAM_FIELDS:
+        value = getattr(program, attr)
+        if value:
+            parts.append(f"{label}: {value}\n")
+    if program.is_verified:
+        parts.append("Verified: Yes (Innovation Zone Verified)\n")
+    parts.append("\n")
+    return "".join(parts)
+
+
+def _event_block(event: Event) -> str:
+    parts = [
+        f"\nEvent ID: {event.id}\n",
+        f"Title: {event.title}\n",
+        f"Description: {event.description}\n",
+        f"Category: {event.category}\n",
+        f"Audience: {event.audience}\n",
+        f"Location: {event.location}\n",
+        f"Start Date: {event.start_date}\n",
+    ]
+    if event.end_date:
+        parts.append(f"End Date: {event.end_date}\n")
+    if event.link:
+        parts.append(f"Link: {event.link}\n")
+    parts.append("\n")
+    return "".join(parts)
+
+
+def _instructions(program_count: int) -> str:
+    return f"""
 === INSTRUCTIONS ===
 CRITICAL: There are {program_count} programs available in the database above. You MUST recommend at least 2-3 programs from the PROGRAMS section based on the user's responses.
 
@@ -151,68 +155,326 @@ IMPORTANT: The database contains {program_count} programs. You MUST recommend pr
 
 Your response should be helpful, personalized, and MUST include specific program recommendations from the database above.
 """
+
+
+class CompiledPrompt:
+    """
+    The database-derived part of a pathway query, rendered once per data version.
+    
+    Each pathway, organization, program and event is pre-rendered into its
+    prompt block, so a query only joins the blocks it needs. The compact
+    table rows are rendered too when the compact format or a token budget
+    is configured.
+    """
+
+    def __init__(self, pathways: List[Pathway], organizations: List[Organization], events: List[Event], programs: List[Program], compact: Optional[bool] = None):
+        organization_names = {org.id: org.organization_name for org in organizations}
+        self.pathways_prompt = PROMPT_HEADER + "".join(_pathway_block(p) for p in pathways)
+        self.organization_blocks = {org.id: _organization_block(org) for org in organizations}
+        self.program_blocks = {p.id: _program_block(p, organization_names) for p in programs}
+        self.program_organizations = {p.id: p.organization_id for p in programs}
+        self.events_prompt = "".join(_event_block(event) for event in events)
+        self.program_count = len(programs)
+        if compact is None:
+            compact = PROMPT_FORMAT == "compact" or PROMPT_TOKEN_BUDGET > 0
+        self.compact = CompactCatalog(pathways, organizations, events, programs) if compact else None
+
+    def system_sections(self, program_ids: Optional[List[int]] = None) -> Dict[str, str]:
+        """
+        The system prompt split into its sections (pathways, organizations,
+        programs, events, instructions), in order. Without `program_ids` it
+        covers the full catalog; with them only those programs (in the given
+        order) and the organizations offering them, and no events.
+        """
+        if program_ids is None:
+            return {
+                "pathways": self.pathways_prompt,
+                "organizations": "".join(["\n=== ORGANIZATIONS ===\n", *self.organization_blocks.values()]),
+                "programs": "".join([
+                    "\n=== PROGRAMS ===\n",
+                    f"Total Programs Available: {self.program_count}\n\n",
+                    *self.program_blocks.values(),
+                ]),
+                "events": "\n=== EVENTS ===\n" + self.events_prompt,
+                "instructions": _instructions(self.program_count),
+            }
+        
+        # Ids the compiled catalog doesn't know (written since it was built) are skipped
+        program_ids = [pid for pid in program_ids if pid in self.program_blocks]
+        organization_ids = {self.program_organizations[pid] for pid in program_ids}
+        return {
+            "pathways": self.pathways_prompt,
+            "organizations": "".join([
+                "\n=== ORGANIZATIONS ===\n",
+                *[block for org_id, block in self.organization_blocks.items() if org_id in organization_ids],
+            ]),
+            "programs": "".join([
+                "\n=== PROGRAMS ===\n",
+                f"Total Programs Available: {len(program_ids)}\n\n",
+                *[self.program_blocks[pid] for pid in program_ids],
+            ]),
+            "events": "",
+            "instructions": _instructions(len(program_ids)),
+        }
+
+    def system_prompt(self, program_ids: Optional[List[int]] = None) -> str:
+        """
+        The full catalog prompt, or with `program_ids` one restricted to those
+        programs (in the given order) and the organizations offering them.
+        """
+        return "".join(self.system_sections(program_ids).values())
+
+
+# Compiled prompt for the latest catalog versions of PROMPT_TABLES
+prompt_cache = VersionedCache()
+
+
+def compile_prompt(pathways: List[Pathway], organizations: List[Organization], events: List[Event], programs: List[Program], compact: Optional[bool] = None) -> CompiledPrompt:
+    """Build everything a pathway query needs from the database, once per data version"""
+    return CompiledPrompt(pathways, organizations, events, programs, compact)
+
+
+def build_system_prompt(pathways: List[Pathway], organizations: List[Organization], events: List[Event], programs: List[Program]) -> str:
+    """Build a comprehensive system prompt with all database information"""
+    return compile_prompt(pathways, organizations, events, programs).system_prompt()
+
+
+def build_user_query(answered: List[Tuple[str, Any]], program_count: int) -> str:
+    """Render the user's answers; the only part of the prompt built per request"""
+    parts = ["Based on my responses below, please provide personalized recommendations:\n\n"]
+    parts.extend(f"Q: {question}\nA: {answer_text}\n\n" for question, answer_text in answered)
+    parts.append(f"\n\nIMPORTANT: There are {program_count} programs available in the database. You MUST recommend at least 2-3 specific programs from the PROGRAMS section that match my responses above. Include program names, descriptions, eligibility requirements, application links, and explain why each program is relevant to my needs. Do NOT say there are no matching programs - you must find and recommend programs from the database.")
+    return "".join(parts)
+
+
+def _user_query_section(answered: List[Tuple[str, Any]], program_count: int) -> str:
+    return f"\n\n=== USER QUERY ===\n\n{build_user_query(answered, program_count)}"
+
+
+def prompt_sections(answered: List[Tuple[str, Any]], compiled: CompiledPrompt, program_ids: Optional[List[int]] = None) -> Dict[str, str]:
+    """
+    The sections of build_prompt's prompt, in order; joined they are the prompt.
+    
+    Verbose unless PROMPT_FORMAT is "compact" or the verbose prompt is over
+    PROMPT_TOKEN_BUDGET; a compact prompt is reduced to fit the budget.
+    """
+    if PROMPT_FORMAT != "compact" or compiled.compact is None:
+        sections = compiled.system_sections(program_ids)
+        program_count = len(program_ids) if program_ids is not None else compiled.program_count
+        sections["user_query"] = _user_query_section(answered, program_count)
+        if (
+            compiled.compact is None
+            or PROMPT_TOKEN_BUDGET <= 0
+            or estimate_tokens(sum(len(text) for text in sections.values())) <= PROMPT_TOKEN_BUDGET
+        ):
+            return sections
     
-    return prompt
+    def tail(program_count: int) -> Dict[str, str]:
+        return {
+            "instructions": _instructions(program_count),
+            "user_query": _user_query_section(answered, program_count),
+        }
+    
+    sections, reductions = compiled.compact.fit(program_ids, tail, PROMPT_TOKEN_BUDGET)
+    for reduction in reductions:
+        ai_metrics.increment("prompt_reductions", reduction)
+    return sections
 
 
-def get_gemini_response(user_responses: Dict[str, Any], pathways: List[Pathway], 
-                        organizations: List[Organization], events: List[Event], programs: List[Program]) -> str:
-    """Get AI response from Gemini based on user responses and database data"""
+def build_prompt(answered: List[Tuple[str, Any]], compiled: CompiledPrompt, program_ids: Optional[List[int]] = None) -> str:
+    """
+    Assemble the full prompt for one query from the (question, answer) pairs.
     
-    if not GEMINI_API_KEY:
-        raise ValueError("GEMINI_API_KEY is not set in environment variables")
+    With `program_ids` (the recommender's candidates) only those programs and
+    their organizations are included; events are left out since the model is
+    told not to recommend them. Without, the whole catalog is sent.
+    """
+    return "".join(prompt_sections(answered, compiled, program_ids).values())
+
+
+NO_PROGRAMS_MESSAGE = "I apologize, but there are currently no active programs available in the database. Please check back later as new programs are regularly added to the Windsor-Essex Innovation Zone Ecosystem Platform."
+
+
+class ModelClient(ABC):
+    """
+    A text generation backend for pathway queries.
+    
+    Calls are blocking (they run on the model call pool), and errors are
+    raised as exceptions. check() raises ValueError when the backend isn't
+    configured, which makes callers use the rule-based fallback.
+    """
+    
+    name = "model"
+    
+    def check(self) -> None:
+        pass
+    
+    @abstractmethod
+    def generate(self, prompt: str) -> str:
+        ...
+    
+    @abstractmethod
+    def stream(self, prompt: str) -> Iterator[str]:
+        ...
+
+
+class GeminiClient(ModelClient):
+    """Google Gemini through the google-generativeai SDK"""
+    
+    name = "gemini"
+    
+    def check(self) -> None:
+        if not GEMINI_API_KEY:
+            raise ValueError("GEMINI_API_KEY is not set in environment variables")
+    
+    def generate(self, prompt: str) -> str:
+        return _response_text(create_model().generate_content(prompt))
+    
+    def stream(self, prompt: str) -> Iterator[str]:
+        for chunk in create_model().generate_content(prompt, stream=True):
+            text = _response_text(chunk)
+            if text:
+                yield text
+
+
+class HTTPModelClient(ModelClient):
+    """
+    A model server speaking a minimal JSON protocol, such as the Gemini
+    stand-in in scripts/fake_model_server.py: POST /generate with
+    {"prompt", "stream"} answers {"text"}, or newline-delimited {"text"}
+    objects when streaming.
+    """
+    
+    name = "http"
+    
+    def __init__(self, base_url: str, timeout: float = 60.0):
+        self.base_url = base_url
+        self._client = httpx.Client(base_url=base_url, timeout=timeout)
+    
+    def generate(self, prompt: str) -> str:
+        response = self._client.post("/generate", json={"prompt": prompt, "stream": False})
+        response.raise_for_status()
+        return response.json()["text"]
+    
+    def stream(self, prompt: str) -> Iterator[str]:
+        # Closing the generator leaves the block and drops the connection
+        with self._client.stream("POST", "/generate", json={"prompt": prompt, "stream": True}) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if line:
+                    text = json.loads(line).get("text")
+                    if text:
+                        yield text
+
+
+MODEL_CLIENTS = {
+    "gemini": GeminiClient,
+    "http": lambda: HTTPModelClient(MODEL_SERVER_URL),
+}
+
+_model_client: Optional[ModelClient] = None
+
+
+def get_model_client() -> ModelClient:
+    """The configured model client (MODEL_CLIENT), created on first use"""
+    global _model_client
+    if _model_client is None:
+        if MODEL_CLIENT not in MODEL_CLIENTS:
+            raise RuntimeError(f"Unknown MODEL_CLIENT {MODEL_CLIENT!r}; expected one of {', '.join(MODEL_CLIENTS)}")
+        _model_client = MODEL_CLIENTS[MODEL_CLIENT]()
+    return _model_client
+
+
+def set_model_client(client: Optional[ModelClient]) -> None:
+    """Replace the model client (None goes back to the configured one)"""
+    global _model_client
+    _model_client = client
+
+
+def require_model_client() -> None:
+    """Raise ValueError when the model client isn't configured (callers fall back to rule matching)"""
+    get_model_client().check()
+
+
+def create_model():
+    """The Gemini model used for recommendations"""
+    # Initialize the model - use gemini-2.5-flash strictly
+    return genai.GenerativeModel('gemini-2.5-flash')
+
+
+def _response_text(response) -> Optional[str]:
+    # Handle response - check if text attribute exists
+    if hasattr(response, 'text'):
+        return response.text
+    elif hasattr(response, 'candidates') and len(response.candidates) > 0:
+        if hasattr(response.candidates[0], 'content'):
+            if hasattr(response.candidates[0].content, 'parts'):
+                return ''.join([part.text for part in response.candidates[0].content.parts if hasattr(part, 'text')])
+    else:
+        return str(response)
+
+
+def _section_sizes(sections: Dict[str, str]) -> Dict[str, int]:
+    return {name: len(text) for name, text in sections.items()}
+
+
+def get_gemini_response(answered: List[Tuple[str, Any]], compiled: CompiledPrompt, program_ids: Optional[List[int]] = None) -> str:
+    """Get the model's recommendation based on the user's answers and the compiled database prompt"""
+    
+    client = get_model_client()
+    client.check()
     
     # Check if we have programs
-    if not programs or len(programs) == 0:
-        return "I apologize, but there are currently no active programs available in the database. Please check back later as new programs are regularly added to the Windsor-Essex Innovation Zone Ecosystem Platform."
-    
-    # Build system prompt with database information
-    system_prompt = build_system_prompt(pathways, organizations, events, programs)
-    
-    # Build user query from responses
-    user_query = "Based on my responses below, please provide personalized recommendations:\n\n"
-    
-    # Get pathway questions and answers
-    pathway_map = {p.id: p for p in pathways}
-    for pathway_id, answer_key in user_responses.items():
-        try:
-            # Try to convert pathway_id to int, but handle string IDs too
-            pathway_id_int = int(pathway_id) if isinstance(pathway_id, str) and pathway_id.isdigit() else pathway_id
-            pathway = pathway_map.get(pathway_id_int)
-        except (ValueError, TypeError):
-            # If conversion fails, try direct lookup
-            pathway = pathway_map.get(pathway_id)
-        
-        if pathway:
-            if pathway.answer_options and isinstance(pathway.answer_options, dict):
-                answer_text = pathway.answer_options.get(str(answer_key), answer_key)
-            else:
-                answer_text = str(answer_key)
-            user_query += f"Q: {pathway.question}\nA: {answer_text}\n\n"
+    if compiled.program_count == 0:
+        return NO_PROGRAMS_MESSAGE
     
-    user_query += f"\n\nIMPORTANT: There are {len(programs)} programs available in the database. You MUST recommend at least 2-3 specific programs from the PROGRAMS section that match my responses above. Include program names, descriptions, eligibility requirements, application links, and explain why each program is relevant to my needs. Do NOT say there are no matching programs - you must find and recommend programs from the database."
+    sections = prompt_sections(answered, compiled, program_ids)
+    full_prompt = "".join(sections.values())
     
+    started = time.perf_counter()
     try:
-        # Initialize the model - use gemini-2.5-flash strictly
-        model = genai.GenerativeModel('gemini-2.5-flash')
-        
-        # Combine system prompt and user query
-        full_prompt = f"{system_prompt}\n\n=== USER QUERY ===\n\n{user_query}"
-        
-        # Generate response
-        response = model.generate_content(full_prompt)
-        
-        # Handle response - check if text attribute exists
-        if hasattr(response, 'text'):
-            return response.text
-        elif hasattr(response, 'candidates') and len(response.candidates) > 0:
-            if hasattr(response.candidates[0], 'content'):
-                if hasattr(response.candidates[0].content, 'parts'):
-                    return ''.join([part.text for part in response.candidates[0].content.parts if hasattr(part, 'text')])
-        else:
-            return str(response)
+        text = client.generate(full_prompt)
     except Exception as e:
+        ai_metrics.record_call(
+            client.name, _section_sizes(sections), (time.perf_counter() - started) * 1000, "error", error=str(e)
+        )
         import traceback
         error_details = traceback.format_exc()
         raise Exception(f"Error generating Gemini response: {str(e)}\n\nDetails: {error_details}")
+    ai_metrics.record_call(client.name, _section_sizes(sections), (time.perf_counter() - started) * 1000, "success")
+    return text
+
 
+def stream_gemini_response(answered: List[Tuple[str, Any]], compiled: CompiledPrompt, program_ids: Optional[List[int]] = None) -> Iterator[str]:
+    """
+    Like get_gemini_response, but yield the text in pieces as the model
+    produces them. Nothing is requested until the first item is pulled, and
+    closing the generator abandons the rest of the stream.
+    """
+    client = get_model_client()
+    client.check()
+    
+    if compiled.program_count == 0:
+        yield NO_PROGRAMS_MESSAGE
+        return
+    
+    sections = prompt_sections(answered, compiled, program_ids)
+    full_prompt = "".join(sections.values())
+    
+    started = time.perf_counter()
+    first_chunk_ms = None
+    outcome, error = "abandoned", None
+    try:
+        for text in client.stream(full_prompt):
+            if first_chunk_ms is None:
+                first_chunk_ms = (time.perf_counter() - started) * 1000
+            yield text
+        outcome = "success"
+    except Exception as e:
+        outcome, error = "error", str(e)
+        raise Exception(f"Error generating Gemini response: {str(e)}")
+    finally:
+        ai_metrics.record_call(
+            client.name, _section_sizes(sections), (time.perf_counter() - started) * 1000, outcome,
+            stream=True, first_chunk_ms=first_chunk_ms, error=error,
+        )
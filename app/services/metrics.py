@@ -0,0 +1,243 @@
+"""
+In-process histograms for the database layer and the generative model calls.
+
+Connection-pool checkout waits and statement durations are recorded per route
+(the matched path template, e.g. "GET /api/programs/{program_id}"). The route is
+carried in a context variable set by RouteTagMiddleware, so SQLAlchemy event
+hooks can tag their measurements without access to the request.
+
+Model calls record prompt size (characters, estimated tokens and per-section
+characters), upstream latency and outcome; the pathway router adds cache
+status and fallbacks. Calls slower than AI_SLOW_CALL_MS are also written to
+the "app.ai_calls" logger as one JSON object per line (to AI_CALL_LOG_FILE
+when set).
+"""
+import bisect
+import json
+import logging
+import math
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from starlette.routing import Match
+
+# Upper bounds (ms) of the histogram buckets; the last bucket is unbounded
+LATENCY_BUCKETS_MS = (0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Upper bounds of the prompt size histograms, in characters and estimated tokens
+PROMPT_CHAR_BUCKETS = (1000, 2500, 5000, 10000, 25000, 50000, 100000, 250000, 500000, 1000000, 2500000, 5000000)
+PROMPT_TOKEN_BUCKETS = (250, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000, 250000, 500000, 1000000)
+
+# Rough characters per token for English prompts; only used for estimates
+CHARS_PER_TOKEN = 4
+
+# Model calls at least this slow are logged in full
+AI_SLOW_CALL_MS = float(os.getenv("AI_SLOW_CALL_MS", "10000"))
+# JSON-lines file for the slow call log; without it the lines go to stderr
+AI_CALL_LOG_FILE = os.getenv("AI_CALL_LOG_FILE")
+
+# Tag used for work done outside a request (startup, background refreshes, scripts)
+NO_ROUTE = "-"
+
+current_route: ContextVar[str] = ContextVar("current_route", default=NO_ROUTE)
+
+
+class Histogram:
+    """Fixed-bucket histogram with count, sum and max (latencies in ms by default)"""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS_MS, unit: str = "ms"):
+        self.buckets = tuple(buckets)
+        self.unit = unit
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th observation (max for the last bucket)"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return self.buckets[i] if i < len(self.buckets) else self.max
+        return self.max
+
+    def snapshot(self) -> Dict[str, Any]:
+        unit = self.unit
+        return {
+            "count": self.count,
+            f"mean_{unit}": round(self.total / self.count, 3) if self.count else None,
+            f"p50_{unit}": self.quantile(0.50),
+            f"p95_{unit}": self.quantile(0.95),
+            f"p99_{unit}": self.quantile(0.99),
+            f"max_{unit}": round(self.max, 3),
+            "buckets": {
+                (f"le_{bound}" if i < len(self.buckets) else "inf"): n
+                for i, (bound, n) in enumerate(zip(self.buckets + (None,), self.counts))
+                if n
+            },
+        }
+
+
+class LatencyMetrics:
+    """Thread-safe histograms keyed by (metric name, route)"""
+
+    def __init__(self):
+        self._histograms: Dict[Tuple[str, str], Histogram] = {}
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, value_ms: float, route: Optional[str] = None) -> None:
+        key = (name, route or current_route.get())
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value_ms)
+
+    def increment(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            result: Dict[str, Any] = {"counters": dict(self._counters)}
+            for (name, route), histogram in sorted(self._histograms.items()):
+                result.setdefault(name, {})[route] = histogram.snapshot()
+            return result
+
+
+db_metrics = LatencyMetrics()
+
+
+def estimate_tokens(chars: int) -> int:
+    return math.ceil(chars / CHARS_PER_TOKEN)
+
+
+class ModelCallMetrics:
+    """Prompt size, latency and outcome histograms and counters for model calls"""
+
+    def __init__(self, slow_call_ms: float = AI_SLOW_CALL_MS, logger: Optional[logging.Logger] = None):
+        self.slow_call_ms = slow_call_ms
+        self.logger = logger or logging.getLogger("app.ai_calls")
+        self._prompt_chars = Histogram(PROMPT_CHAR_BUCKETS, unit="chars")
+        self._prompt_tokens = Histogram(PROMPT_TOKEN_BUCKETS, unit="tokens")
+        self._section_chars: Dict[str, Histogram] = {}
+        self._latency: Dict[str, Histogram] = {}
+        self._first_chunk = Histogram()
+        self._counters: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def increment(self, group: str, name: str) -> None:
+        """Count one event, e.g. ("cache", "HIT") or ("fallbacks", "not_configured")"""
+        with self._lock:
+            counters = self._counters.setdefault(group, {})
+            counters[name] = counters.get(name, 0) + 1
+
+    def record_call(
+        self,
+        client: str,
+        sections: Dict[str, int],
+        latency_ms: float,
+        outcome: str,
+        stream: bool = False,
+        first_chunk_ms: Optional[float] = None,
+        error: Optional[str] = None,
+    ) -> None:
+        """
+        One upstream call: `sections` maps prompt section to its characters,
+        `outcome` is "success", "error" or (for streams) "abandoned".
+        """
+        prompt_chars = sum(sections.values())
+        with self._lock:
+            self._prompt_chars.observe(prompt_chars)
+            self._prompt_tokens.observe(estimate_tokens(prompt_chars))
+            for section, chars in sections.items():
+                histogram = self._section_chars.get(section)
+                if histogram is None:
+                    histogram = self._section_chars[section] = Histogram(PROMPT_CHAR_BUCKETS, unit="chars")
+                histogram.observe(chars)
+            histogram = self._latency.get(outcome)
+            if histogram is None:
+                histogram = self._latency[outcome] = Histogram()
+            histogram.observe(latency_ms)
+            if first_chunk_ms is not None:
+                self._first_chunk.observe(first_chunk_ms)
+            outcomes = self._counters.setdefault("outcomes", {})
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+        if latency_ms >= self.slow_call_ms:
+            self.logger.warning(json.dumps({
+                "event": "slow_model_call",
+                "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "route": current_route.get(),
+                "client": client,
+                "stream": stream,
+                "outcome": outcome,
+                "latency_ms": round(latency_ms, 1),
+                "first_chunk_ms": round(first_chunk_ms, 1) if first_chunk_ms is not None else None,
+                "prompt_chars": prompt_chars,
+                "prompt_tokens_estimate": estimate_tokens(prompt_chars),
+                "sections": sections,
+                "error": error,
+            }))
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "counters": {group: dict(counters) for group, counters in self._counters.items()},
+                "prompt_chars": self._prompt_chars.snapshot(),
+                "prompt_tokens_estimate": self._prompt_tokens.snapshot(),
+                "section_chars": {
+                    section: histogram.snapshot() for section, histogram in sorted(self._section_chars.items())
+                },
+                "latency": {outcome: histogram.snapshot() for outcome, histogram in sorted(self._latency.items())},
+                "stream_first_chunk": self._first_chunk.snapshot(),
+            }
+
+
+ai_metrics = ModelCallMetrics()
+if AI_CALL_LOG_FILE:
+    ai_metrics.logger.addHandler(logging.FileHandler(AI_CALL_LOG_FILE))
+
+
+class RouteTagMiddleware:
+    """ASGI middleware that tags the request's context with its route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = current_route.set(f"{scope['method']} {self._route_path(scope)}")
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_route.reset(token)
+
+    @staticmethod
+    def _route_path(scope) -> str:
+        partial = None
+        for route in scope["app"].router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route.path
+            if match == Match.PARTIAL and partial is None:
+                partial = route.path
+        # Unmatched paths share one tag so arbitrary URLs can't grow the histograms
+        return partial or "unmatched"
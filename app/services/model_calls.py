@@ -0,0 +1,290 @@
+"""
+Bounded, time-limited calls to the generative model.
+
+The model client is blocking, so calls run on a dedicated thread pool sized to
+the concurrency limit; a request that finds every slot taken is rejected at
+once instead of queueing behind slow upstream calls. Each call has a hard
+deadline. A circuit breaker watches recent outcomes (errors, timeouts and
+slow calls) and, while open, rejects calls without trying so the router can
+serve the rule-based fallback.
+
+Rejections raise ModelUnavailableError, a ValueError like the missing-API-key
+case, so callers fall back the same way.
+"""
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Iterator
+
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+GEMINI_TIMEOUT_SECONDS = float(os.getenv("GEMINI_TIMEOUT_SECONDS", "30"))
+# Calls slower than this count as failures for the breaker even if they succeed
+GEMINI_SLOW_CALL_SECONDS = float(os.getenv("GEMINI_SLOW_CALL_SECONDS", "15"))
+GEMINI_BREAKER_WINDOW = int(os.getenv("GEMINI_BREAKER_WINDOW", "20"))
+GEMINI_BREAKER_MIN_CALLS = int(os.getenv("GEMINI_BREAKER_MIN_CALLS", "5"))
+GEMINI_BREAKER_FAILURE_RATE = float(os.getenv("GEMINI_BREAKER_FAILURE_RATE", "0.5"))
+GEMINI_BREAKER_COOLDOWN_SECONDS = float(os.getenv("GEMINI_BREAKER_COOLDOWN_SECONDS", "30"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+_END_OF_STREAM = object()
+
+
+class ModelUnavailableError(ValueError):
+    """The model call was not made or abandoned (busy, circuit open or deadline)"""
+
+
+class CircuitBreaker:
+    """
+    Failure-rate breaker over the last `window` calls.
+
+    Opens when at least `min_calls` of the window are recorded and the share of
+    failures reaches `failure_rate`. After `cooldown_seconds` one probe call is
+    let through (half-open); its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, window: int, min_calls: int, failure_rate: float, cooldown_seconds: float):
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.cooldown_seconds = cooldown_seconds
+        self._outcomes = deque(maxlen=window)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        self.opened = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.cooldown_seconds:
+            self._state = HALF_OPEN
+            self._probing = False
+        return self._state
+
+    def allow(self) -> bool:
+        """Whether a call may be made now; in half-open, only the first caller probes"""
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record(self, success: bool) -> None:
+        with self._lock:
+            state = self._current_state()
+            if state == HALF_OPEN:
+                if success:
+                    self._state = CLOSED
+                    self._outcomes.clear()
+                else:
+                    self._open()
+                return
+            self._outcomes.append(success)
+            failures = self._outcomes.count(False)
+            if (
+                state == CLOSED
+                and len(self._outcomes) >= self.min_calls
+                and failures / len(self._outcomes) >= self.failure_rate
+            ):
+                self._open()
+
+    def abandon(self) -> None:
+        """The caller let go without an outcome (e.g. client disconnect); free the probe"""
+        with self._lock:
+            self._probing = False
+
+    def _open(self) -> None:
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._probing = False
+        self._outcomes.clear()
+        self.opened += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            outcomes = list(self._outcomes)
+            return {
+                "state": self._current_state(),
+                "window_calls": len(outcomes),
+                "window_failures": outcomes.count(False),
+                "times_opened": self.opened,
+            }
+
+
+class ModelCallGuard:
+    """Concurrency limit, deadline and circuit breaker around blocking model calls"""
+
+    def __init__(self, max_concurrency: int, timeout_seconds: float, slow_call_seconds: float, breaker: CircuitBreaker):
+        self.max_concurrency = max_concurrency
+        self.timeout_seconds = timeout_seconds
+        self.slow_call_seconds = slow_call_seconds
+        self.breaker = breaker
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="model-call")
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._counters = {
+            "calls": 0,
+            "succeeded": 0,
+            "failed": 0,
+            "timed_out": 0,
+            "slow": 0,
+            "rejected_busy": 0,
+            "rejected_open": 0,
+        }
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+    def acquire(self) -> None:
+        """
+        Take a concurrency slot, or raise ModelUnavailableError when all slots
+        are busy or the circuit is open. Pair with release(); call() and
+        stream() release the slot themselves.
+        """
+        if not self._slots.acquire(blocking=False):
+            self._count("rejected_busy")
+            raise ModelUnavailableError("Too many concurrent AI requests")
+        if not self.breaker.allow():
+            self._slots.release()
+            self._count("rejected_open")
+            raise ModelUnavailableError("AI recommendations are temporarily unavailable")
+        with self._lock:
+            self._in_flight += 1
+            self._counters["calls"] += 1
+
+    def release(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def _record(self, success: bool, elapsed: float) -> None:
+        if success and elapsed > self.slow_call_seconds:
+            self._count("slow")
+            success = False
+        elif success:
+            self._count("succeeded")
+        self.breaker.record(success)
+
+    def _failed(self, error: BaseException) -> None:
+        self._count("timed_out" if isinstance(error, asyncio.TimeoutError) else "failed")
+        self.breaker.record(False)
+
+    async def call(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run the blocking `fn(*args)` on the model thread pool within the deadline"""
+        self.acquire()
+        started = time.monotonic()
+        try:
+            # Carry the request's context (e.g. its route tag for metrics) onto the pool
+            future = self._executor.submit(contextvars.copy_context().run, fn, *args)
+        except BaseException:
+            self.release()
+            raise
+        # A thread can't be interrupted, only abandoned: the slot stays taken
+        # until it finishes, even when the caller has given up
+        future.add_done_callback(lambda _: self.release())
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(future), self.timeout_seconds)
+        except asyncio.TimeoutError as e:
+            self._failed(e)
+            raise ModelUnavailableError(f"AI request timed out after {self.timeout_seconds:g}s") from e
+        except asyncio.CancelledError:
+            self.breaker.abandon()
+            raise
+        except Exception as e:
+            self._failed(e)
+            raise
+        self._record(True, time.monotonic() - started)
+        return result
+
+    async def stream(self, iterator: Iterator[Any]) -> AsyncIterator[Any]:
+        """
+        Pull items from a blocking iterator on the model thread pool, with one
+        deadline for the whole stream. The caller must have called acquire();
+        the slot is released (and the iterator closed) once no pull is running.
+        """
+        deadline = time.monotonic() + self.timeout_seconds
+        started = time.monotonic()
+        first_item_seconds = None
+        recorded = False
+        pending = None
+        context = contextvars.copy_context()
+        try:
+            while True:
+                pending = self._executor.submit(context.run, next, iterator, _END_OF_STREAM)
+                try:
+                    item = await asyncio.wait_for(
+                        asyncio.wrap_future(pending), max(deadline - time.monotonic(), 0)
+                    )
+                except asyncio.TimeoutError as e:
+                    recorded = True
+                    self._failed(e)
+                    raise ModelUnavailableError(
+                        f"AI request timed out after {self.timeout_seconds:g}s"
+                    ) from e
+                except Exception as e:
+                    recorded = True
+                    self._failed(e)
+                    raise
+                if item is _END_OF_STREAM:
+                    break
+                if first_item_seconds is None:
+                    first_item_seconds = time.monotonic() - started
+                yield item
+            # A long answer isn't a slow upstream; judge streams by time to first item
+            recorded = True
+            self._record(True, first_item_seconds or time.monotonic() - started)
+        finally:
+            if not recorded:
+                self.breaker.abandon()
+
+            def finish(_=None):
+                try:
+                    close = getattr(iterator, "close", None)
+                    if close is not None:
+                        close()
+                finally:
+                    self.release()
+
+            # A pull still running on the pool owns the iterator until it returns
+            if pending is not None and not pending.done():
+                pending.add_done_callback(finish)
+            else:
+                finish()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_concurrency": self.max_concurrency,
+                "timeout_seconds": self.timeout_seconds,
+                "in_flight": self._in_flight,
+                **self._counters,
+                "breaker": self.breaker.stats(),
+            }
+
+
+gemini_guard = ModelCallGuard(
+    GEMINI_MAX_CONCURRENCY,
+    GEMINI_TIMEOUT_SECONDS,
+    GEMINI_SLOW_CALL_SECONDS,
+    CircuitBreaker(
+        GEMINI_BREAKER_WINDOW,
+        GEMINI_BREAKER_MIN_CALLS,
+        GEMINI_BREAKER_FAILURE_RATE,
+        GEMINI_BREAKER_COOLDOWN_SECONDS,
+    ),
+)
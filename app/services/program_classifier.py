@@ -0,0 +1,302 @@
+"""
+Trainable text classifier for program stage, sector and program type.
+
+Programs are encoded as sparse TF-IDF vectors over the words and word pairs of
+their title and description, with the vocabulary and IDF weights learned from
+the already-labelled programs. Each field has its own multinomial logistic
+regression (softmax) over those vectors, trained by full-batch gradient
+descent. Everything is NumPy: a batch of programs is one sparse row block
+(CSR arrays), and scoring it is one gather of weight rows plus a segmented sum,
+so thousands of programs are classified per second.
+
+Predictions below CLASSIFIER_MIN_CONFIDENCE are None; the keyword rules in
+program_categorizer stay the fallback for the stage. The model is trained and
+saved by scripts/train_program_classifier.py and loaded from
+CLASSIFIER_MODEL_FILE; without that file categorization uses the rules alone.
+"""
+import math
+import os
+import re
+import threading
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.utils.program_categorizer import get_stage_display_name
+
+# Saved model (scripts/train_program_classifier.py); rules only when it doesn't exist
+CLASSIFIER_MODEL_FILE = os.getenv("CLASSIFIER_MODEL_FILE", "models/program_classifier.npz")
+# Lowest predicted probability that is used instead of None
+CLASSIFIER_MIN_CONFIDENCE = float(os.getenv("CLASSIFIER_MIN_CONFIDENCE", "0.5"))
+
+# Program fields predicted, with the normalization applied to their labels
+CLASSIFIER_FIELDS = {
+    "stage": get_stage_display_name,
+    "sector": lambda value: " ".join(value.split()) if value else None,
+    "program_type": lambda value: " ".join(value.lower().split()) if value else None,
+}
+# Terms in fewer training programs than this are left out of the vocabulary
+MIN_DOCUMENT_FREQUENCY = 2
+MAX_FEATURES = 50000
+# Labels with fewer training programs than this aren't predicted
+MIN_LABEL_EXAMPLES = 2
+# Training matrices up to this size are densified, so each epoch is two BLAS matrix products
+DENSE_TRAINING_MAX_BYTES = 256 * 2**20
+
+_TAG = re.compile(r"<[^>]*>")
+_WORD = re.compile(r"[a-z0-9]+(?:['&-][a-z0-9]+)*")
+
+
+def tokenize(title: Optional[str], description: Optional[str]) -> List[str]:
+    """Words and adjacent word pairs of the title and (tag-stripped) description"""
+    words = _WORD.findall(f"{title or ''} {_TAG.sub(' ', description or '')}".lower())
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+class SparseRows:
+    """A batch of sparse row vectors in CSR form (indptr, indices, data)"""
+
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray, data: np.ndarray, width: int):
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.width = width
+
+    def __len__(self) -> int:
+        return len(self.indptr) - 1
+
+    def take(self, rows: Sequence[int]) -> "SparseRows":
+        """The given rows, in that order"""
+        rows = np.asarray(rows, dtype=np.int64)
+        starts, ends = self.indptr[rows], self.indptr[rows + 1]
+        lengths = ends - starts
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        positions = np.repeat(starts - indptr[:-1], lengths) + np.arange(indptr[-1])
+        return SparseRows(indptr, self.indices[positions], self.data[positions], self.width)
+
+    def dot(self, weights: np.ndarray) -> np.ndarray:
+        """rows x weights (width x k), as a dense (rows x k) array"""
+        out = np.zeros((len(self), weights.shape[1]), dtype=np.float32)
+        lengths = np.diff(self.indptr)
+        nonempty = lengths > 0
+        if nonempty.any():
+            contributions = weights[self.indices] * self.data[:, None]
+            # Segments start at each non-empty row and run to the next one
+            out[nonempty] = np.add.reduceat(contributions, self.indptr[:-1][nonempty], axis=0)
+        return out
+
+    def transpose_dot(self, gradients: np.ndarray, plan: Tuple[np.ndarray, np.ndarray, np.ndarray]) -> np.ndarray:
+        """rowsᵀ x gradients (rows x k), as a dense (width x k) array; `plan` is from transpose_plan()"""
+        order, starts, features = plan
+        rows = np.repeat(np.arange(len(self)), np.diff(self.indptr))[order]
+        contributions = gradients[rows] * self.data[order, None]
+        out = np.zeros((self.width, gradients.shape[1]), dtype=np.float32)
+        out[features] = np.add.reduceat(contributions, starts, axis=0)
+        return out
+
+    def toarray(self) -> np.ndarray:
+        out = np.zeros((len(self), self.width), dtype=np.float32)
+        out[np.repeat(np.arange(len(self)), np.diff(self.indptr)), self.indices] = self.data
+        return out
+
+    def transpose_plan(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Entries grouped by column, computed once for repeated transpose_dot() calls"""
+        order = np.argsort(self.indices, kind="stable")
+        features, starts = np.unique(self.indices[order], return_index=True)
+        return order, starts, features
+
+
+class TfidfVectorizer:
+    """Sublinear TF-IDF over tokenize(), L2-normalized per program"""
+
+    def __init__(self, vocabulary: Dict[str, int], idf: np.ndarray):
+        self.vocabulary = vocabulary
+        self.idf = idf
+
+    @classmethod
+    def fit(cls, documents: Sequence[List[str]]) -> "TfidfVectorizer":
+        frequency = Counter(term for tokens in documents for term in set(tokens))
+        min_frequency = MIN_DOCUMENT_FREQUENCY if len(documents) >= 20 else 1
+        terms = sorted(
+            (term for term, count in frequency.items() if count >= min_frequency),
+            key=lambda term: (-frequency[term], term),
+        )[:MAX_FEATURES]
+        idf = np.array(
+            [math.log((1 + len(documents)) / (1 + frequency[term])) + 1 for term in terms], dtype=np.float32
+        )
+        return cls({term: i for i, term in enumerate(terms)}, idf)
+
+    def transform(self, documents: Iterable[List[str]]) -> SparseRows:
+        indptr = [0]
+        indices: List[int] = []
+        data: List[float] = []
+        vocabulary = self.vocabulary
+        for tokens in documents:
+            counts = Counter(vocabulary[term] for term in tokens if term in vocabulary)
+            indices.extend(counts)
+            data.extend(counts.values())
+            indptr.append(len(indices))
+        indptr_array = np.array(indptr, dtype=np.int64)
+        indices_array = np.array(indices, dtype=np.int64)
+        values = (1 + np.log(np.array(data, dtype=np.float32))) * self.idf[indices_array]
+        # L2 norm per row
+        lengths = np.diff(indptr_array)
+        norms = np.zeros(len(lengths), dtype=np.float32)
+        nonempty = lengths > 0
+        if nonempty.any():
+            norms[nonempty] = np.sqrt(np.add.reduceat(values * values, indptr_array[:-1][nonempty]))
+        values /= np.repeat(np.where(norms > 0, norms, 1), lengths)
+        return SparseRows(indptr_array, indices_array, values, len(self.idf))
+
+
+class SoftmaxRegression:
+    """Multinomial logistic regression over sparse rows"""
+
+    def __init__(self, labels: List[str], weights: np.ndarray, bias: np.ndarray):
+        self.labels = labels
+        self.weights = weights
+        self.bias = bias
+
+    @classmethod
+    def fit(
+        cls,
+        rows: SparseRows,
+        targets: Sequence[str],
+        epochs: int = 150,
+        learning_rate: float = 10.0,
+        l2: float = 1e-4,
+    ) -> "SoftmaxRegression":
+        """Full-batch gradient descent with Nesterov momentum on the mean cross-entropy plus an L2 penalty"""
+        labels = sorted(set(targets))
+        label_index = {label: i for i, label in enumerate(labels)}
+        expected = np.zeros((len(rows), len(labels)), dtype=np.float32)
+        expected[np.arange(len(rows)), [label_index[t] for t in targets]] = 1
+        weights = np.zeros((rows.width, len(labels)), dtype=np.float32)
+        bias = np.zeros(len(labels), dtype=np.float32)
+        weights_velocity = np.zeros_like(weights)
+        bias_velocity = np.zeros_like(bias)
+        if len(rows) * rows.width * 4 <= DENSE_TRAINING_MAX_BYTES:
+            dense = rows.toarray()
+            dot, transpose_dot = dense.__matmul__, dense.T.__matmul__
+        else:
+            plan = rows.transpose_plan()
+            dot, transpose_dot = rows.dot, lambda errors: rows.transpose_dot(errors, plan)
+        momentum = 0.9
+        for _ in range(epochs):
+            look_weights = weights + momentum * weights_velocity
+            look_bias = bias + momentum * bias_velocity
+            errors = (_softmax(dot(look_weights) + look_bias) - expected) / len(rows)
+            weights_velocity = momentum * weights_velocity - learning_rate * (
+                transpose_dot(errors) + l2 * look_weights
+            )
+            bias_velocity = momentum * bias_velocity - learning_rate * errors.sum(axis=0)
+            weights += weights_velocity
+            bias += bias_velocity
+        return cls(labels, weights, bias)
+
+    def predict_proba(self, rows: SparseRows) -> np.ndarray:
+        return _softmax(rows.dot(self.weights) + self.bias)
+
+    def predict(self, rows: SparseRows, min_confidence: float = 0.0) -> Tuple[List[Optional[str]], np.ndarray]:
+        """The most probable label per row (None below `min_confidence`) and its probability"""
+        probabilities = self.predict_proba(rows)
+        best = probabilities.argmax(axis=1)
+        confidence = probabilities[np.arange(len(best)), best]
+        return [
+            self.labels[i] if p >= min_confidence else None for i, p in zip(best, confidence)
+        ], confidence
+
+
+def _softmax(scores: np.ndarray) -> np.ndarray:
+    scores = np.exp(scores - scores.max(axis=1, keepdims=True))
+    return scores / scores.sum(axis=1, keepdims=True)
+
+
+class ProgramClassifier:
+    """A shared TF-IDF vectorizer and one SoftmaxRegression per field"""
+
+    def __init__(self, vectorizer: TfidfVectorizer, models: Dict[str, SoftmaxRegression]):
+        self.vectorizer = vectorizer
+        self.models = models
+
+    @classmethod
+    def train(cls, programs: Sequence[Any], fields: Iterable[str] = CLASSIFIER_FIELDS, **fit_options) -> "ProgramClassifier":
+        """
+        Train on programs (anything with title, description and the fields).
+        Each field learns from the programs that have a value for it; fields
+        with fewer than two usable labels are skipped.
+        """
+        documents = [tokenize(p.title, p.description) for p in programs]
+        vectorizer = TfidfVectorizer.fit(documents)
+        rows = vectorizer.transform(documents)
+        models = {}
+        for field in fields:
+            labels = [CLASSIFIER_FIELDS[field](getattr(p, field)) for p in programs]
+            counts = Counter(label for label in labels if label)
+            kept = [i for i, label in enumerate(labels) if label and counts[label] >= MIN_LABEL_EXAMPLES]
+            if len({labels[i] for i in kept}) >= 2:
+                models[field] = SoftmaxRegression.fit(rows.take(kept), [labels[i] for i in kept], **fit_options)
+        return cls(vectorizer, models)
+
+    def vectorize(self, texts: Iterable[Tuple[Optional[str], Optional[str]]]) -> SparseRows:
+        return self.vectorizer.transform(tokenize(title, description) for title, description in texts)
+
+    def predict(
+        self,
+        texts: Sequence[Tuple[Optional[str], Optional[str]]],
+        min_confidence: float = CLASSIFIER_MIN_CONFIDENCE,
+    ) -> Dict[str, List[Optional[str]]]:
+        """Per field, the predicted label of each (title, description), or None when unsure"""
+        rows = self.vectorize(texts)
+        return {field: model.predict(rows, min_confidence)[0] for field, model in self.models.items()}
+
+    def predict_one(self, title: Optional[str], description: Optional[str]) -> Dict[str, Optional[str]]:
+        return {field: labels[0] for field, labels in self.predict([(title, description)]).items()}
+
+    def save(self, path: str) -> None:
+        terms = sorted(self.vectorizer.vocabulary, key=self.vectorizer.vocabulary.get)
+        arrays = {"terms": np.array(terms, dtype=str), "idf": self.vectorizer.idf}
+        for field, model in self.models.items():
+            arrays[f"{field}.labels"] = np.array(model.labels, dtype=str)
+            arrays[f"{field}.weights"] = model.weights
+            arrays[f"{field}.bias"] = model.bias
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "wb") as f:
+            np.savez_compressed(f, **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> "ProgramClassifier":
+        with np.load(path, allow_pickle=False) as arrays:
+            vectorizer = TfidfVectorizer({term: i for i, term in enumerate(arrays["terms"].tolist())}, arrays["idf"])
+            models = {
+                field: SoftmaxRegression(
+                    arrays[f"{field}.labels"].tolist(), arrays[f"{field}.weights"], arrays[f"{field}.bias"]
+                )
+                for field in CLASSIFIER_FIELDS if f"{field}.labels" in arrays
+            }
+        return cls(vectorizer, models)
+
+
+_loaded: Dict[str, Tuple[float, Optional[ProgramClassifier]]] = {}
+_load_lock = threading.Lock()
+
+
+def get_program_classifier(path: str = None) -> Optional[ProgramClassifier]:
+    """The saved classifier (reloaded when the file changes), or None without one"""
+    path = path or CLASSIFIER_MODEL_FILE
+    try:
+        modified = os.path.getmtime(path)
+    except OSError:
+        return None
+    with _load_lock:
+        cached = _loaded.get(path)
+        if cached is None or cached[0] != modified:
+            try:
+                cached = (modified, ProgramClassifier.load(path))
+            except (OSError, ValueError, KeyError) as e:
+                print(f"⚠️  Could not load program classifier {path}: {e}")
+                cached = (modified, None)
+            _loaded[path] = cached
+        return cached[1]
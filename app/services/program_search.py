@@ -0,0 +1,116 @@
+"""
+Denormalized program read model (the program_search table).
+
+One row per program holding what listing, filtering and search need without a
+join to organizations: the organization name, the normalized stage, a plain-text
+description snippet and a search vector that also covers the organization name.
+
+Rows are refreshed incrementally: writers upsert the affected programs inside
+their own transaction (program writes refresh their ids, organization writes
+refresh that organization's programs) and deleted programs cascade through the
+foreign key. A full rebuild is only needed for the initial backfill
+(scripts/rebuild_program_search.py).
+"""
+from typing import Iterable, Optional
+
+from sqlalchemy import case, func, literal, null, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.models import Organization, Program, ProgramSearch
+from app.utils.program_categorizer import STAGE_ALIASES, STAGE_KEYWORDS
+from app.utils.search import SEARCH_CONFIG
+
+# Characters of plain-text description kept in the snippet
+SNIPPET_LENGTH = 280
+
+
+def normalized_stage(stage):
+    """SQL equivalent of get_stage_display_name() for a stage column"""
+    lowered = func.lower(stage)
+    return case(
+        (func.coalesce(stage, "") == "", null()),
+        (stage.in_(list(STAGE_KEYWORDS)), stage),
+        *[
+            (lowered.contains(alias, autoescape=True), literal(display))
+            for alias, display in STAGE_ALIASES.items()
+        ],
+        else_=stage,
+    )
+
+
+def description_snippet(description):
+    """Description with HTML tags stripped and whitespace collapsed, truncated"""
+    text = func.regexp_replace(func.coalesce(description, ""), "<[^>]*>", " ", "g")
+    text = func.regexp_replace(text, r"\s+", " ", "g")
+    return func.left(func.btrim(text), SNIPPET_LENGTH)
+
+
+def _source(program_ids: Optional[Iterable[int]], organization_ids: Optional[Iterable[int]]):
+    organization_name_vector = func.setweight(
+        func.to_tsvector(SEARCH_CONFIG, func.coalesce(Organization.organization_name, "")), "C"
+    )
+    stmt = (
+        select(
+            Program.id,
+            Program.organization_id,
+            Organization.organization_name,
+            Program.title,
+            Program.program_type,
+            Program.stage,
+            normalized_stage(Program.stage),
+            Program.sector,
+            Program.cost,
+            Program.is_active,
+            description_snippet(Program.description),
+            Program.search_vector.op("||")(organization_name_vector),
+        )
+        .select_from(Program)
+        .outerjoin(Organization, Program.organization_id == Organization.id)
+    )
+    if program_ids is not None:
+        stmt = stmt.where(Program.id.in_(program_ids))
+    if organization_ids is not None:
+        stmt = stmt.where(Program.organization_id.in_(organization_ids))
+    return stmt
+
+
+_COLUMNS = [
+    "program_id", "organization_id", "organization_name", "title", "program_type",
+    "stage", "stage_normalized", "sector", "cost", "is_active", "snippet", "search_vector",
+]
+
+
+def refresh_program_search(
+    db: Session,
+    program_ids: Optional[Iterable[int]] = None,
+    organization_ids: Optional[Iterable[int]] = None,
+) -> int:
+    """
+    Upsert the read-model rows of the given programs, or of every program of
+    the given organizations; with neither, of all programs.
+
+    Pending changes are flushed first and the upsert runs in the caller's
+    transaction, so it commits (or rolls back) together with the write.
+    From an AsyncSession: `await db.run_sync(refresh_program_search, ...)`.
+    Returns the number of rows written.
+    """
+    if program_ids is not None:
+        program_ids = list(program_ids)
+        if not program_ids:
+            return 0
+    if organization_ids is not None:
+        organization_ids = list(organization_ids)
+        if not organization_ids:
+            return 0
+    db.flush()
+
+    stmt = insert(ProgramSearch).from_select(_COLUMNS, _source(program_ids, organization_ids))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ProgramSearch.program_id],
+        set_={
+            **{name: stmt.excluded[name] for name in _COLUMNS[1:]},
+            "refreshed_at": func.now(),
+        },
+    )
+    return db.execute(stmt).rowcount
@@ -0,0 +1,204 @@
+"""
+Compact, token-budgeted encoding of the pathway prompt catalog.
+
+The verbose prompt (CompiledPrompt in gemini_service) labels every field of
+every row and repeats the organization name in each program. This encoding
+writes each section as a table, one row per line with " | " between columns,
+refers to organizations by ID, and cuts program descriptions to a short
+summary.
+
+With a token budget, sections are reduced in REDUCTIONS order (lowest
+priority first) until the prompt fits: events go, then the pathway list,
+then organization details (names stay), then program summaries, and last
+the trailing programs, which are the lowest ranked when the recommender
+picked them.
+"""
+import os
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.models import Event, Organization, Pathway, Program
+from app.services.metrics import estimate_tokens
+
+# "verbose" (labelled blocks, the original format) or "compact" (tables)
+PROMPT_FORMAT = os.getenv("PROMPT_FORMAT", "verbose")
+# Estimated tokens the prompt may use (0 = no limit). A verbose prompt over
+# the budget is sent in the compact format, reduced until it fits.
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "0"))
+# Longest program description summary in the compact format, in characters
+PROMPT_SUMMARY_CHARS = int(os.getenv("PROMPT_SUMMARY_CHARS", "200"))
+
+# Sections dropped or shortened to fit the budget, lowest priority first
+REDUCTIONS = ["events", "pathways", "organization_details", "program_summaries", "programs"]
+
+COMPACT_HEADER = """You are an AI assistant for the Windsor-Essex Innovation Zone Ecosystem Platform.
+Your role is to provide personalized recommendations to users based on their responses to pathway questions.
+
+You MUST only use information from the database provided below. Do not make up or suggest resources that are not in the database.
+Each section is a table: a header line naming the columns, then one row per line with columns separated by " | ". "-" means no value.
+
+DATABASE INFORMATION:
+"""
+
+PATHWAY_COLUMNS = "id | question | answer options"
+ORGANIZATION_COLUMNS = "id | name | sector | services | city | website | email | phone"
+ORGANIZATION_NAME_COLUMNS = "id | name"
+PROGRAM_COLUMNS = (
+    "id | title | organization id | type | stage | sector | eligibility | cost | duration | "
+    "deadline | start | link | verified"
+)
+EVENT_COLUMNS = "id | title | category | audience | location | start | end | link"
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+
+def _text(value: Any) -> str:
+    if isinstance(value, dict):
+        return "; ".join(f"{k}: {_text(v)}" for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return ", ".join(_text(v) for v in value)
+    return str(value)
+
+
+def _cell(value: Any, limit: Optional[int] = None) -> str:
+    """One table cell: whitespace collapsed, no column separators, optionally summarized"""
+    if value is None or value == "" or value == [] or value == {}:
+        return "-"
+    text = " ".join(_text(value).split()).replace("|", "/")
+    return summarize(text, limit) if limit else text
+
+
+def summarize(text: str, limit: int) -> str:
+    """The first sentence of `text` if it fits in `limit` characters, else a cut at a word boundary"""
+    text = " ".join(text.split())
+    if len(text) <= limit:
+        return text
+    first_sentence = _SENTENCE_END.split(text, 1)[0]
+    if len(first_sentence) <= limit:
+        return first_sentence
+    cut = text[:limit - 1].rsplit(" ", 1)[0]
+    return cut.rstrip(",;:") + "…"
+
+
+def _row(*cells: Any) -> str:
+    return " | ".join(_cell(cell) for cell in cells) + "\n"
+
+
+class CompactCatalog:
+    """The catalog's table rows, rendered once per data version like CompiledPrompt's blocks"""
+
+    def __init__(self, pathways: List[Pathway], organizations: List[Organization], events: List[Event], programs: List[Program]):
+        self.pathway_rows = "".join(
+            _row(p.id, p.question, "; ".join(f"{k}={v}" for k, v in (p.answer_options or {}).items()))
+            for p in pathways
+        )
+        self.organization_rows = {
+            org.id: _row(org.id, org.organization_name, org.sector_type, org.services_offered, org.city,
+                         org.website, org.email_address, org.phone_number)
+            for org in organizations
+        }
+        self.organization_name_rows = {org.id: _row(org.id, org.organization_name) for org in organizations}
+        self.program_rows = {}
+        self.program_summaries = {}
+        for p in programs:
+            self.program_rows[p.id] = " | ".join([
+                _cell(p.id), _cell(p.title), _cell(p.organization_id), _cell(p.program_type), _cell(p.stage),
+                _cell(p.sector), _cell(p.eligibility_criteria, PROMPT_SUMMARY_CHARS), _cell(p.cost),
+                _cell(p.duration), _cell(p.application_deadline), _cell(p.start_date),
+                _cell(p.application_link or p.website), "yes" if p.is_verified else "no",
+            ])
+            self.program_summaries[p.id] = _cell(p.description, PROMPT_SUMMARY_CHARS)
+        self.program_organizations = {p.id: p.organization_id for p in programs}
+        self.event_rows = "".join(
+            _row(e.id, e.title, e.category, e.audience, e.location, e.start_date, e.end_date, e.link)
+            for e in events
+        )
+
+    def sections(
+        self,
+        program_ids: List[int],
+        tail: Callable[[int], Dict[str, str]],
+        events: bool = True,
+        pathways: bool = True,
+        organization_details: bool = True,
+        program_summaries: bool = True,
+    ) -> Dict[str, str]:
+        """
+        The prompt sections for these programs, in order, with `tail(program
+        count)` supplying the instructions and user query.
+        """
+        organization_ids = {self.program_organizations[pid] for pid in program_ids}
+        organization_rows = self.organization_rows if organization_details else self.organization_name_rows
+        if program_summaries:
+            program_columns = PROGRAM_COLUMNS + " | summary\n"
+            program_rows = [f"{self.program_rows[pid]} | {self.program_summaries[pid]}\n" for pid in program_ids]
+        else:
+            program_columns = PROGRAM_COLUMNS + "\n"
+            program_rows = [self.program_rows[pid] + "\n" for pid in program_ids]
+        sections = {
+            "pathways": COMPACT_HEADER + (
+                f"\n=== PATHWAYS ===\n{PATHWAY_COLUMNS}\n{self.pathway_rows}" if pathways else ""
+            ),
+            "organizations": "".join([
+                "\n=== ORGANIZATIONS ===\n",
+                (ORGANIZATION_COLUMNS if organization_details else ORGANIZATION_NAME_COLUMNS) + "\n",
+                *[row for org_id, row in organization_rows.items() if org_id in organization_ids],
+            ]),
+            "programs": "".join([
+                "\n=== PROGRAMS ===\n",
+                f"Total Programs Available: {len(program_ids)}\n",
+                "(organization id refers to the ORGANIZATIONS table)\n",
+                program_columns,
+                *program_rows,
+            ]),
+            "events": f"\n=== EVENTS ===\n{EVENT_COLUMNS}\n{self.event_rows}" if events else "",
+        }
+        sections.update(tail(len(program_ids)))
+        return sections
+
+    def fit(
+        self,
+        program_ids: Optional[List[int]],
+        tail: Callable[[int], Dict[str, str]],
+        budget_tokens: int,
+    ) -> Tuple[Dict[str, str], List[str]]:
+        """
+        Compact prompt sections within `budget_tokens` (0 = no limit), and the
+        REDUCTIONS applied to get there. Without `program_ids` all programs
+        are included, with events, as in the verbose full prompt.
+        """
+        if program_ids is None:
+            options = {"events": True}
+            program_ids = list(self.program_rows)
+        else:
+            # Ids the catalog doesn't know (written since it was built) are skipped
+            options = {"events": False}
+            program_ids = [pid for pid in program_ids if pid in self.program_rows]
+
+        def fits(sections: Dict[str, str]) -> bool:
+            return estimate_tokens(sum(len(text) for text in sections.values())) <= budget_tokens
+
+        sections = self.sections(program_ids, tail, **options)
+        applied = []
+        if budget_tokens <= 0:
+            return sections, applied
+        for reduction in REDUCTIONS[:-1]:
+            if fits(sections):
+                return sections, applied
+            if options.get(reduction, True):
+                options[reduction] = False
+                applied.append(reduction)
+                sections = self.sections(program_ids, tail, **options)
+        if fits(sections) or len(program_ids) <= 1:
+            return sections, applied
+
+        # Keep the longest prefix of the programs that fits (at least one)
+        low, high = 1, len(program_ids) - 1
+        while low < high:
+            middle = (low + high + 1) // 2
+            if fits(self.sections(program_ids[:middle], tail, **options)):
+                low = middle
+            else:
+                high = middle - 1
+        applied.append("programs")
+        return self.sections(program_ids[:low], tail, **options), applied
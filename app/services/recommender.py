@@ -0,0 +1,495 @@
+"""
+Deterministic local program recommender.
+
+Programs and pathway answers are encoded into the same feature space: business
+stage, sector, kind of support (program type), audience/eligibility tags and
+cost. Programs form one float32 matrix built once per data version, so ranking
+the whole catalog for a set of answers is a single matrix-vector product plus a
+partial sort.
+
+Tags only cover the wordings their patterns know, so a lexical BM25 score of
+the answer text against each program's title, description, stage and sector
+(an inverted index built alongside the matrix) is added to the tag score; an
+answer like "medical devices" still finds programs that mention it.
+
+The same ranking serves the `local` pathway mode directly and picks the
+candidate programs sent to Gemini in the `ai` and `hybrid` modes.
+
+Answer options are a small fixed set per question, so after each rebuild a
+background job ranks every answer combination (or, when there are too many,
+the most requested ones) into a RecommendationTable; common queries are then
+answered with one dictionary lookup.
+"""
+import itertools
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Any, Dict, FrozenSet, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.models import Pathway, Program
+from app.services.cache import VersionedCache
+from app.utils.program_categorizer import STAGE_KEYWORDS, get_stage_display_name
+
+# Programs returned by the local and hybrid pathway modes
+RECOMMENDER_TOP_K = int(os.getenv("RECOMMENDER_TOP_K", "10"))
+# Every answer combination is precomputed when there are at most this many,
+# otherwise only the PRECOMPUTE_POPULAR most requested ones
+PRECOMPUTE_MAX_COMBINATIONS = int(os.getenv("PRECOMPUTE_MAX_COMBINATIONS", "20000"))
+PRECOMPUTE_POPULAR = int(os.getenv("PRECOMPUTE_POPULAR", "2000"))
+# Distinct answer sets whose request counts are kept for PRECOMPUTE_POPULAR
+ANSWER_TRAFFIC_MAX_KEYS = int(os.getenv("ANSWER_TRAFFIC_MAX_KEYS", "10000"))
+
+# Tables the recommender is built from; their catalog versions fingerprint it
+RECOMMENDER_TABLES = ("pathways", "programs")
+
+STAGES = list(STAGE_KEYWORDS)
+
+# Answer wordings (to a question about stage) that imply one or more standard stages
+STAGE_HINTS = {
+    "idea": ["Idea / Inspiration"],
+    "early": ["Validation", "Concept Development", "MVP / Testing"],
+    "growing": ["Launch", "Growth"],
+    "established": ["Growth"],
+    "scale": ["Growth"],
+}
+
+# tag -> regex over lowercased text; each group is one block of the feature vector
+SECTOR_TAGS = {
+    "technology": r"\b(?:tech\w*|software|digital|data|cyber\w*|ai|it|computing)\b",
+    "health": r"\b(?:health\w*|medical|medtech|biotech\w*|life sciences?|wellness)\b",
+    "green": r"\b(?:green\w*|clean ?tech|sustainab\w*|environment\w*|climate|energy)\b",
+    "food": r"\b(?:food|beverage|agri\w*|farm\w*)\b",
+    "manufacturing": r"\b(?:manufactur\w*|automotive|industrial|mobility)\b",
+    "creative": r"\b(?:media|creative|arts?|film|music|gaming)\b",
+}
+SUPPORT_TAGS = {
+    "funding": r"\b(?:fund\w*|grants?|loans?|financ\w*|invest(?:ment)?s?|capital)\b",
+    "mentorship": r"\b(?:mentor\w*|coach\w*|advis\w*)\b",
+    "networking": r"\b(?:network\w*|community|connect\w*|events?|meetups?)\b",
+    "training": r"\b(?:train\w*|workshops?|courses?|educat\w*|learn\w*|seminars?|bootcamps?)\b",
+    "incubation": r"\b(?:incubat\w*|accelerat\w*|co-?working|workspace)\b",
+    "business support": r"\b(?:business support|advisory|consult\w*|export\w*|trade)\b",
+}
+AUDIENCE_TAGS = {
+    "student": r"\b(?:students?|youth|graduates?|universit\w*|college)\b",
+    "founder": r"\b(?:founders?|entrepreneur\w*|start-?ups?)\b",
+    "professional": r"\b(?:professionals?|employees?|workers?|career\w*)\b",
+    "investor": r"\b(?:investors?|angels?)\b",
+    "women": r"\b(?:women|woman|female)\b",
+    "newcomer": r"\b(?:newcomers?|immigrants?)\b",
+    "indigenous": r"\b(?:indigenous|first nations?)\b",
+}
+FREE_COST = re.compile(r"\b(?:free|no cost|no charge)\b|\$0\b")
+
+# How much a match in each block counts towards the score
+GROUP_WEIGHTS = {
+    "stage": 1.0,
+    "sector": 1.0,
+    "support": 1.2,
+    "audience": 0.8,
+    "cost": 0.3,
+}
+# Tags found only in a program's title/description count for less than its fields
+FREE_TEXT_WEIGHT = 0.5
+# Small tie-breaking preference for Innovation Zone verified programs
+VERIFIED_BONUS = 0.05
+# Weight of the lexical score, scaled so the best-matching program gets 1
+LEXICAL_WEIGHT = 1.0
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Per-field term weights; a title match counts more than one buried in a description
+FIELD_WEIGHTS = {
+    "title": 3,
+    "stage": 2,
+    "sector": 2,
+    "description": 1,
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have how i if in into is it its my of on or our so
+that the their them they this to was we what when which who will with you your
+""".split())
+
+_GROUPS = [
+    ("stage", {stage: None for stage in STAGES}),
+    ("sector", {tag: re.compile(pattern) for tag, pattern in SECTOR_TAGS.items()}),
+    ("support", {tag: re.compile(pattern) for tag, pattern in SUPPORT_TAGS.items()}),
+    ("audience", {tag: re.compile(pattern) for tag, pattern in AUDIENCE_TAGS.items()}),
+    ("cost", {"free": FREE_COST}),
+]
+FEATURES: List[Tuple[str, str]] = [(group, tag) for group, tags in _GROUPS for tag in tags]
+_FEATURE_INDEX = {feature: i for i, feature in enumerate(FEATURES)}
+_GROUP_TAGS = dict(_GROUPS)
+_WEIGHTS = np.array([GROUP_WEIGHTS[group] for group, _ in FEATURES], dtype=np.float32)
+
+
+def _flatten(value: Any) -> str:
+    """Text of a string or JSON column value (lists and dicts are joined)"""
+    if not value:
+        return ""
+    if isinstance(value, dict):
+        return " ".join(f"{k} {_flatten(v)}" for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return " ".join(_flatten(v) for v in value)
+    return str(value)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased alphanumeric tokens without stopwords or single characters"""
+    if not text:
+        return []
+    return [t for t in _TOKEN_RE.findall(text.lower()) if len(t) > 1 and t not in STOPWORDS]
+
+
+def _stages(text: str, hints: bool = False) -> List[str]:
+    stage = get_stage_display_name(text)
+    if stage in STAGE_KEYWORDS:
+        return [stage]
+    if not hints:
+        return []
+    lowered = text.lower()
+    return [s for hint, stages in STAGE_HINTS.items() if hint in lowered for s in stages]
+
+
+def _set_tags(row: np.ndarray, group: str, text: str, weight: float) -> None:
+    if not text:
+        return
+    lowered = text.lower()
+    for tag, pattern in _GROUP_TAGS[group].items():
+        if pattern.search(lowered):
+            i = _FEATURE_INDEX[(group, tag)]
+            row[i] = max(row[i], weight)
+
+
+def encode_program(program: Program) -> np.ndarray:
+    """Feature vector of one program"""
+    row = np.zeros(len(FEATURES), dtype=np.float32)
+    for stage in _stages(program.stage or "", hints=True):
+        row[_FEATURE_INDEX[("stage", stage)]] = 1.0
+
+    free_text = f"{program.title or ''} {program.description or ''}"
+    _set_tags(row, "sector", program.sector or "", 1.0)
+    _set_tags(row, "sector", free_text, FREE_TEXT_WEIGHT)
+    _set_tags(row, "support", program.program_type or "", 1.0)
+    _set_tags(row, "support", free_text, FREE_TEXT_WEIGHT)
+    _set_tags(row, "audience", _flatten(program.eligibility_criteria), 1.0)
+    _set_tags(row, "audience", free_text, FREE_TEXT_WEIGHT)
+    _set_tags(row, "cost", program.cost or "", 1.0)
+    return row
+
+
+class LexicalIndex:
+    """
+    Inverted BM25 index over a fixed list of programs. Each term's postings are
+    a pair of arrays (catalog positions, BM25 term weights), so scoring a query
+    is one scatter-add per query term.
+    """
+
+    def __init__(self, programs: Sequence[Program]):
+        frequencies = defaultdict(list)
+        lengths = np.zeros(len(programs), dtype=np.float32)
+        for position, program in enumerate(programs):
+            terms = Counter()
+            for field, weight in FIELD_WEIGHTS.items():
+                for token in tokenize(getattr(program, field)):
+                    terms[token] += weight
+            for term, frequency in terms.items():
+                frequencies[term].append((position, frequency))
+            lengths[position] = sum(terms.values())
+
+        self.size = len(programs)
+        average = float(lengths.mean()) if self.size else 0.0
+        norms = BM25_K1 * (1 - BM25_B + BM25_B * lengths / average) if average else np.full_like(lengths, BM25_K1)
+        self.postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        for term, entries in frequencies.items():
+            positions = np.array([position for position, _ in entries], dtype=np.int32)
+            tf = np.array([frequency for _, frequency in entries], dtype=np.float32)
+            idf = math.log(1 + (self.size - len(entries) + 0.5) / (len(entries) + 0.5))
+            self.postings[term] = positions, (idf * tf * (BM25_K1 + 1) / (tf + norms[positions])).astype(np.float32)
+
+    def scores(self, query: str) -> np.ndarray:
+        """BM25 score of every program (0 where no term matches)"""
+        scores = np.zeros(self.size, dtype=np.float32)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if postings is not None:
+                positions, weights = postings
+                scores[positions] += weights
+        return scores
+
+
+AnswersKey = FrozenSet[Tuple[str, Any]]
+
+
+def answers_key(answered: Sequence[Tuple[str, Any]]) -> Optional[AnswersKey]:
+    """
+    Lookup key of (question, answer text) pairs. Their order and repeats
+    don't change the encoding, so neither changes the key. None when an
+    answer isn't hashable.
+    """
+    try:
+        return frozenset(answered)
+    except TypeError:
+        return None
+
+
+def encode_answers(answered: Sequence[Tuple[str, Any]]) -> np.ndarray:
+    """Weighted query vector for (question, answer text) pairs"""
+    vector = np.zeros(len(FEATURES), dtype=np.float32)
+    for question, answer in answered:
+        text = str(answer)
+        for stage in _stages(text, hints="stage" in (question or "").lower()):
+            vector[_FEATURE_INDEX[("stage", stage)]] = 1.0
+        for group in ("sector", "support", "audience", "cost"):
+            _set_tags(vector, group, text, 1.0)
+    return vector * _WEIGHTS
+
+
+class RecommendationTable:
+    """
+    Precomputed rankings: a row per answer set in two compact (rows x k)
+    arrays of catalog positions and scores, found through a key -> row dict.
+    """
+
+    def __init__(self, rows: Dict[AnswersKey, int], positions: np.ndarray, scores: np.ndarray, build_ms: float):
+        self.rows = rows
+        self.positions = positions
+        self.scores = scores
+        self.k = positions.shape[1]
+        self.build_ms = build_ms
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def lookup(self, key: Optional[AnswersKey], k: int) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Positions and scores of the k best programs, if precomputed for `key`"""
+        row = self.rows.get(key) if key is not None and k <= self.k else None
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self.positions[row, :k], self.scores[row, :k]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "answer_sets": len(self.rows),
+            "k": self.k,
+            "bytes": self.positions.nbytes + self.scores.nbytes,
+            "build_ms": round(self.build_ms, 1),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+class ProgramRecommender:
+    """Feature matrix and lexical index of the active programs plus the pathway questions, per data version"""
+
+    def __init__(self, pathways: List[Pathway], programs: List[Program]):
+        self.program_ids = np.array([p.id for p in programs], dtype=np.int64)
+        self.titles = [p.title for p in programs]
+        self.organization_ids = [p.organization_id for p in programs]
+        self.matrix = (
+            np.vstack([encode_program(p) for p in programs])
+            if programs else np.zeros((0, len(FEATURES)), dtype=np.float32)
+        )
+        self.lexical = LexicalIndex(programs)
+        self.prior = np.array([VERIFIED_BONUS if p.is_verified else 0.0 for p in programs], dtype=np.float32)
+        # pathway id -> (question, answer_options), for resolving the user's answers
+        self.questions = {p.id: (p.question, p.answer_options) for p in pathways}
+        # Set by precompute once the background job has run
+        self.table: Optional[RecommendationTable] = None
+
+    def __len__(self) -> int:
+        return len(self.program_ids)
+
+    def answers(self, user_responses: Dict[str, Any]) -> List[Tuple[str, Any]]:
+        """(question, answer text) for each response to a known pathway"""
+        answered = []
+        for pathway_id, answer_key in user_responses.items():
+            try:
+                # Try to convert pathway_id to int, but handle string IDs too
+                pathway_id_int = int(pathway_id) if isinstance(pathway_id, str) and pathway_id.isdigit() else pathway_id
+                pathway = self.questions.get(pathway_id_int)
+            except (ValueError, TypeError):
+                # If conversion fails, try direct lookup
+                pathway = self.questions.get(pathway_id)
+
+            if pathway:
+                question, answer_options = pathway
+                if answer_options and isinstance(answer_options, dict):
+                    answer_text = answer_options.get(str(answer_key), answer_key)
+                else:
+                    answer_text = str(answer_key)
+                answered.append((question, answer_text))
+        return answered
+
+    def answer_space_size(self) -> int:
+        """Number of answer combinations, counting each question as optional"""
+        return math.prod(
+            len(options) + 1 for _, options in self.questions.values() if isinstance(options, dict)
+        )
+
+    def answer_space(self) -> Iterator[List[Tuple[str, Any]]]:
+        """Every combination of answer options, as answers() would resolve it"""
+        choices = [
+            [None] + [(question, text) for text in options.values()]
+            for question, options in self.questions.values()
+            if isinstance(options, dict)
+        ]
+        for combination in itertools.product(*choices):
+            yield [answer for answer in combination if answer is not None]
+
+    def _select(self, scores: np.ndarray, k: int) -> np.ndarray:
+        """Positions of the k best scores, best first; ties keep catalog order"""
+        if k < len(scores):
+            # Partition on the k-th best score, then keep every program tied with it
+            # so ties are broken by catalog position rather than partition order
+            threshold = np.partition(scores, len(scores) - k)[len(scores) - k]
+            top = np.flatnonzero(scores >= threshold)
+        else:
+            top = np.arange(len(scores))
+        return top[np.lexsort((top, -scores[top]))][:k]
+
+    def _lexical(self, answered: Sequence[Tuple[str, Any]]) -> np.ndarray:
+        """BM25 score of the answer text, scaled to [0, LEXICAL_WEIGHT]"""
+        scores = self.lexical.scores(" ".join(str(answer) for _, answer in answered))
+        best = scores.max() if len(scores) else 0.0
+        if best > 0:
+            scores *= LEXICAL_WEIGHT / best
+        return scores
+
+    def _score(self, answered: Sequence[Tuple[str, Any]]) -> np.ndarray:
+        return self.matrix @ encode_answers(answered) + self._lexical(answered) + self.prior
+
+    def _top(self, answered: List[Tuple[str, Any]], k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Catalog positions and scores of the k best programs, best first"""
+        k = min(k, len(self.program_ids))
+        if k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        if self.table is not None:
+            found = self.table.lookup(answers_key(answered), k)
+            if found is not None:
+                return found
+        scores = self._score(answered)
+        top = self._select(scores, k)
+        return top, scores[top]
+
+    def precompute(self, answer_sets: Sequence[List[Tuple[str, Any]]], k: int) -> RecommendationTable:
+        """
+        Rank each answer set and keep the results as this recommender's table.
+        Scored exactly as a live query is, so lookups and live rankings agree.
+        """
+        started = time.perf_counter()
+        k = min(k, len(self.program_ids))
+        rows: Dict[AnswersKey, int] = {}
+        positions = np.zeros((len(answer_sets), k), dtype=np.int32)
+        scores = np.zeros((len(answer_sets), k), dtype=np.float32)
+        for answered in answer_sets:
+            key = answers_key(answered)
+            if key is None or key in rows:
+                continue
+            row = rows[key] = len(rows)
+            if k:
+                row_scores = self._score(answered)
+                top = self._select(row_scores, k)
+                positions[row] = top
+                scores[row] = row_scores[top]
+        table = RecommendationTable(
+            rows, positions[:len(rows)].copy(), scores[:len(rows)].copy(),
+            (time.perf_counter() - started) * 1000,
+        )
+        self.table = table
+        return table
+
+    def rank(self, answered: List[Tuple[str, Any]], k: int) -> List[Tuple[int, float]]:
+        """
+        The k best programs for the answers as (program id, score), best first.
+        Ties keep catalog order, so the result is deterministic.
+        """
+        top, scores = self._top(answered, k)
+        return [(int(self.program_ids[i]), round(float(score), 4)) for i, score in zip(top, scores)]
+
+    def recommendations(self, answered: List[Tuple[str, Any]], k: int) -> List[Dict[str, Any]]:
+        """Ranked programs in the pathway query response format"""
+        top, scores = self._top(answered, k)
+        return [
+            {
+                "type": "program_match",
+                "program_id": int(self.program_ids[i]),
+                "title": self.titles[i],
+                "organization_id": self.organization_ids[i],
+                "score": round(float(score), 4),
+                "source": "local_recommender",
+            }
+            for i, score in zip(top, scores)
+        ]
+
+
+class AnswerTraffic:
+    """
+    How often each answer set is queried, for precomputing the most common
+    ones when the full answer space is too big. Bounded to `max_keys`: when
+    full, the less common half is dropped.
+    """
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._counts: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, answered: Sequence[Tuple[str, Any]]) -> None:
+        key = answers_key(answered)
+        if key is None:
+            return
+        with self._lock:
+            self._counts[key] += 1
+            if len(self._counts) > self.max_keys:
+                self._counts = Counter(dict(self._counts.most_common(self.max_keys // 2)))
+
+    def most_common(self, n: int) -> List[List[Tuple[str, Any]]]:
+        with self._lock:
+            return [list(key) for key, _ in self._counts.most_common(n)]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"tracked_answer_sets": len(self._counts)}
+
+
+answer_traffic = AnswerTraffic(ANSWER_TRAFFIC_MAX_KEYS)
+
+
+def precompute_recommendations(recommender: ProgramRecommender, k: int) -> RecommendationTable:
+    """
+    The background job run after each rebuild: rank every answer combination,
+    or the PRECOMPUTE_POPULAR most requested ones if there are more than
+    PRECOMPUTE_MAX_COMBINATIONS.
+    """
+    if recommender.answer_space_size() <= PRECOMPUTE_MAX_COMBINATIONS:
+        answer_sets = list(recommender.answer_space())
+    else:
+        answer_sets = answer_traffic.most_common(PRECOMPUTE_POPULAR)
+    return recommender.precompute(answer_sets, k)
+
+
+# Recommender for the latest catalog versions of RECOMMENDER_TABLES
+recommender_cache = VersionedCache()
+
+
+def precomputed_stats() -> Optional[Dict[str, Any]]:
+    """Stats of the latest recommender's precomputed table, if it has been built"""
+    recommender = recommender_cache.latest()
+    table = recommender.table if recommender is not None else None
+    return table.stats() if table is not None else None
@@ -0,0 +1,103 @@
+"""Conditional GET support: ETag / If-None-Match and Last-Modified / If-Modified-Since"""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Mapping, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+# Headers repeated on a 304 so clients can refresh their stored validators
+_VALIDATOR_HEADERS = ("ETag", "Last-Modified", "Cache-Control")
+
+
+def normalized_query_params(request: Request) -> Tuple[Tuple[str, str], ...]:
+    """Query parameters sorted and stripped of empty values, for use in cache keys"""
+    return tuple(sorted(
+        (key, value.strip()) for key, value in request.query_params.multi_items()
+        if value.strip() != ""
+    ))
+
+
+def make_etag(*parts: Any) -> str:
+    """Strong ETag derived from arbitrary (repr-able) parts"""
+    digest = hashlib.sha256(repr(parts).encode("utf-8")).hexdigest()[:32]
+    return f'"{digest}"'
+
+
+def body_etag(body: bytes) -> str:
+    """Strong ETag for an exact response body"""
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def collection_fingerprint(db: Session, *models) -> Tuple:
+    """Row count and latest change time of each model's table, read in one statement"""
+    columns = []
+    for model in models:
+        changed_at = func.coalesce(model.updated_at, model.created_at)
+        columns.append(select(func.count()).select_from(model).scalar_subquery())
+        columns.append(select(func.max(changed_at)).scalar_subquery())
+    return tuple(db.execute(select(*columns)).one())
+
+
+def collection_etag(db: Session, request: Request, *models) -> str:
+    """ETag for a list response: the tables' fingerprints plus the query parameters"""
+    return make_etag(
+        request.url.path,
+        normalized_query_params(request),
+        collection_fingerprint(db, *models),
+    )
+
+
+def http_date(value: Optional[datetime]) -> Optional[str]:
+    """Format a timestamp for the Last-Modified header"""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def is_not_modified(request: Request, headers: Mapping[str, str]) -> bool:
+    """
+    Evaluate the request's conditional headers against the response validators.
+
+    If-None-Match takes precedence over If-Modified-Since (RFC 9110 13.2.2).
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        etag = headers.get("ETag")
+        if etag is None:
+            return False
+        candidates = [c.strip() for c in if_none_match.split(",")]
+        return "*" in candidates or any(_opaque(c) == _opaque(etag) for c in candidates)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    last_modified = headers.get("Last-Modified")
+    if if_modified_since and last_modified:
+        try:
+            return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def not_modified(headers: Mapping[str, str]) -> Response:
+    """Empty 304 response carrying the validators"""
+    return Response(
+        status_code=304,
+        headers={k: v for k, v in headers.items() if k in _VALIDATOR_HEADERS},
+    )
+
+
+def last_modified_headers(row: Any) -> dict:
+    """Last-Modified header for a row with updated_at/created_at columns"""
+    value = http_date(getattr(row, "updated_at", None) or getattr(row, "created_at", None))
+    return {"Last-Modified": value} if value else {}
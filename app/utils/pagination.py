@@ -0,0 +1,137 @@
+"""Keyset (cursor) pagination and NDJSON streaming for list endpoints"""
+import base64
+import json
+from datetime import date, datetime
+from typing import Any, Callable, List, NamedTuple, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, status
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy import Select, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Response header carrying the cursor for the next page (absent on the last page)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Largest page a client may request with ?limit=
+MAX_PAGE_SIZE = 1000
+
+# Rows fetched per round trip from the server-side cursor when streaming
+STREAM_BATCH_SIZE = 500
+
+
+class SortKey(NamedTuple):
+    """One column of a keyset ordering, e.g. SortKey(Program.id) or SortKey(Event.start_date, True)"""
+    expression: Any
+    descending: bool = False
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"d": value.isoformat()}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if "dt" in value:
+            return datetime.fromisoformat(value["dt"])
+        if "d" in value:
+            return date.fromisoformat(value["d"])
+    return value
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Encode the sort-key values of the last row of a page as an opaque cursor"""
+    payload = json.dumps([_encode_value(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """Decode a cursor produced by encode_cursor, rejecting malformed input with a 400"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if not isinstance(values, list) or len(values) != size:
+            raise ValueError("cursor does not match the sort order")
+        return [_decode_value(v) for v in values]
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
+
+
+def keyset_condition(sort_keys: Sequence[SortKey], values: Sequence[Any]):
+    """WHERE clause selecting rows strictly after `values` in the given ordering"""
+    clauses = []
+    for i, key in enumerate(sort_keys):
+        prefix = [sort_keys[j].expression == values[j] for j in range(i)]
+        after = key.expression < values[i] if key.descending else key.expression > values[i]
+        clauses.append(and_(*prefix, after))
+    return or_(*clauses)
+
+
+def _ordered(stmt: Select, sort_keys: Sequence[SortKey], cursor: Optional[str]) -> Select:
+    """Order by the sort keys, select them alongside the entity and skip past the cursor"""
+    stmt = stmt.add_columns(
+        *[key.expression.label(f"_sort_{i}") for i, key in enumerate(sort_keys)]
+    ).order_by(
+        *[key.expression.desc() if key.descending else key.expression.asc() for key in sort_keys]
+    )
+    if cursor:
+        stmt = stmt.where(keyset_condition(sort_keys, decode_cursor(cursor, len(sort_keys))))
+    return stmt
+
+
+async def paginate(
+    db: AsyncSession,
+    stmt: Select,
+    sort_keys: Sequence[SortKey],
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    Fetch one page of `stmt` (a select of one entity) in keyset order.
+
+    Returns the entities of the page and the cursor for the next page, or None
+    when this is the last page. Without a limit every remaining row is returned.
+    """
+    stmt = _ordered(stmt, sort_keys, cursor)
+    if limit is None:
+        return list((await db.execute(stmt)).scalars()), None
+
+    rows = (await db.execute(stmt.limit(limit + 1))).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(list(rows[-1])[1:])
+    return [row[0] for row in rows], next_cursor
+
+
+def stream_ndjson(
+    db: AsyncSession,
+    stmt: Select,
+    sort_keys: Sequence[SortKey],
+    serialize: Callable[[Any], BaseModel],
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+) -> StreamingResponse:
+    """
+    Stream `stmt` as newline-delimited JSON.
+
+    Rows are read from a server-side cursor in batches of STREAM_BATCH_SIZE, so
+    the response never holds the whole result set in memory.
+    """
+    stmt = _ordered(stmt, sort_keys, cursor)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+
+    async def iter_lines():
+        result = await db.stream(stmt.execution_options(yield_per=STREAM_BATCH_SIZE))
+        async for row in result:
+            yield serialize(row[0]).model_dump_json() + "\n"
+
+    return StreamingResponse(iter_lines(), media_type="application/x-ndjson")
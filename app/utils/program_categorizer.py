@@ -1,6 +1,7 @@
 """Utility to categorize programs into business stages based on their descriptions"""
+import hashlib
 import re
-from typing import Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 # Define stage categories and their keywords
 STAGE_KEYWORDS = {
@@ -47,6 +48,100 @@ STAGE_KEYWORDS = {
     ]
 }
 
+# Variations of stage names mapped to the standard names, checked in order as
+# substrings of the lowercased stage (see get_stage_display_name)
+STAGE_ALIASES = {
+    "idea": "Idea / Inspiration",
+    "inspiration": "Idea / Inspiration",
+    "idea / inspiration": "Idea / Inspiration",
+    "validation": "Validation",
+    "concept": "Concept Development",
+    "concept development": "Concept Development",
+    "mvp": "MVP / Testing",
+    "testing": "MVP / Testing",
+    "mvp / testing": "MVP / Testing",
+    "setup": "Business Setup",
+    "business setup": "Business Setup",
+    "launch": "Launch",
+    "growth": "Growth",
+    "scale": "Growth",
+}
+
+
+STAGES = list(STAGE_KEYWORDS)
+
+
+def _trie_pattern(words: List[str]) -> str:
+    """
+    Regex alternation over `words`, factored as a trie so each position is
+    tested against a shared prefix once. Longer continuations are tried
+    first, so it matches the longest word that fits.
+    """
+    trie: Dict[str, dict] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def pattern(node: dict) -> str:
+        branches = [re.escape(char) + pattern(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # A word may end here, so the continuation is optional (greedy)
+        return f"(?:{body})?" if "" in node else body
+
+    return pattern(trie)
+
+
+def _keyword_stage_scores() -> Dict[str, List[int]]:
+    """
+    Score each stage gets from one match of each keyword.
+
+    Every keyword found at a position is a prefix of the longest one found
+    there, ending at a word boundary inside it. So a match of the longest
+    keyword also counts those shorter ones ("validate idea" counts for
+    "validate" too), as searching for each keyword separately would.
+    """
+    keywords = {keyword.lower() for stage_keywords in STAGE_KEYWORDS.values() for keyword in stage_keywords}
+    scores = {}
+    for keyword in keywords:
+        stage_scores = [0] * len(STAGES)
+        for stage_index, stage_keywords in enumerate(STAGE_KEYWORDS.values()):
+            for other in stage_keywords:
+                if re.match(r'\b' + re.escape(other.lower()) + r'\b', keyword):
+                    stage_scores[stage_index] += 1
+        scores[keyword] = stage_scores
+    return scores
+
+
+# All stage keywords in one pattern: a zero-width lookahead at each word start
+# captures the longest keyword there, so overlapping keywords are all seen in
+# a single pass. (None of the keywords can overlap itself, so this counts the
+# same occurrences as a separate findall per keyword.)
+_KEYWORD_SCORES = _keyword_stage_scores()
+_STAGE_MATCHER = re.compile(r'\b(?=(' + _trie_pattern(list(_KEYWORD_SCORES)) + r')\b)')
+
+# Substring checks of the fallback rules, answered from one pass as well:
+# finding a word means every fallback word inside it is present too
+FALLBACK_WORDS = [
+    "accelerator", "incubator", "startup", "early", "idea", "concept", "validate",
+    "validation", "research", "mentorship", "mentor", "starting", "growth", "scale",
+    "expand", "expansion", "workshop", "training", "seminar", "brainstorm", "explore",
+    "market", "launch", "go to market", "fund", "grant", "financing", "loan", "seed",
+]
+_FALLBACK_CONTAINS = {word: {other for other in FALLBACK_WORDS if other in word} for word in FALLBACK_WORDS}
+_FALLBACK_MATCHER = re.compile(r'(?=(' + _trie_pattern(FALLBACK_WORDS) + r'))')
+
+
+def _fallback_words(text: str) -> set:
+    """The FALLBACK_WORDS occurring in `text` (as substrings)"""
+    found = set()
+    for word in set(_FALLBACK_MATCHER.findall(text)):
+        found |= _FALLBACK_CONTAINS[word]
+    return found
+
 
 def categorize_program_stage(title: str, description: str) -> Optional[str]:
     """
@@ -65,62 +160,56 @@ def categorize_program_stage(title: str, description: str) -> Optional[str]:
     # Combine title and description for analysis
     text = f"{title} {description}".lower()
     
-    # Score each stage based on keyword matches
-    stage_scores = {}
-    
-    for stage, keywords in STAGE_KEYWORDS.items():
-        score = 0
-        for keyword in keywords:
-            # Count occurrences (case-insensitive)
-            count = len(re.findall(r'\b' + re.escape(keyword.lower()) + r'\b', text))
-            score += count
-        
-        if score > 0:
-            stage_scores[stage] = score
+    # Score each stage based on keyword matches, in one pass over the text
+    scores = [0] * len(STAGES)
+    for keyword in _STAGE_MATCHER.findall(text):
+        for stage_index, score in enumerate(_KEYWORD_SCORES[keyword]):
+            scores[stage_index] += score
     
-    # Return the stage with the highest score
-    if stage_scores:
-        return max(stage_scores, key=stage_scores.get)
+    # Return the stage with the highest score (the first listed on a tie)
+    best = max(range(len(STAGES)), key=scores.__getitem__)
+    if scores[best] > 0:
+        return STAGES[best]
     
     # Fallback: Check for specific program types that indicate stages
-    text_lower = text.lower()
+    words = _fallback_words(text)
     
     # Accelerators and incubators often target early stages
-    if any(word in text_lower for word in ["accelerator", "incubator", "startup"]):
-        if any(word in text_lower for word in ["early", "idea", "concept"]):
+    if words & {"accelerator", "incubator", "startup"}:
+        if words & {"early", "idea", "concept"}:
             return "Idea / Inspiration"
-        elif any(word in text_lower for word in ["validate", "validation", "research"]):
+        elif words & {"validate", "validation", "research"}:
             return "Validation"
         else:
             return "Concept Development"
     
     # Mentorship programs often span multiple stages
-    if "mentorship" in text_lower or "mentor" in text_lower:
-        if any(word in text_lower for word in ["early", "idea", "starting"]):
+    if words & {"mentorship", "mentor"}:
+        if words & {"early", "idea", "starting"}:
             return "Idea / Inspiration"
-        elif any(word in text_lower for word in ["growth", "scale", "expand"]):
+        elif words & {"growth", "scale", "expand"}:
             return "Growth"
         else:
             return "Concept Development"
     
     # Workshops and training
-    if any(word in text_lower for word in ["workshop", "training", "seminar"]):
-        if any(word in text_lower for word in ["idea", "brainstorm", "explore"]):
+    if words & {"workshop", "training", "seminar"}:
+        if words & {"idea", "brainstorm", "explore"}:
             return "Idea / Inspiration"
-        elif any(word in text_lower for word in ["validate", "research", "market"]):
+        elif words & {"validate", "research", "market"}:
             return "Validation"
-        elif any(word in text_lower for word in ["launch", "go to market"]):
+        elif words & {"launch", "go to market"}:
             return "Launch"
-        elif any(word in text_lower for word in ["growth", "scale"]):
+        elif words & {"growth", "scale"}:
             return "Growth"
         else:
             return "Concept Development"
     
     # Funding and grants
-    if any(word in text_lower for word in ["fund", "grant", "financing", "loan"]):
-        if any(word in text_lower for word in ["early", "startup", "seed"]):
+    if words & {"fund", "grant", "financing", "loan"}:
+        if words & {"early", "startup", "seed"}:
             return "Concept Development"
-        elif any(word in text_lower for word in ["growth", "scale", "expansion"]):
+        elif words & {"growth", "scale", "expansion"}:
             return "Growth"
         else:
             return "Business Setup"
@@ -137,32 +226,66 @@ def get_stage_display_name(stage: Optional[str]) -> Optional[str]:
     # Normalize stage names
     stage_lower = stage.lower()
     
-    # Map variations to standard names
-    stage_map = {
-        "idea": "Idea / Inspiration",
-        "inspiration": "Idea / Inspiration",
-        "idea / inspiration": "Idea / Inspiration",
-        "validation": "Validation",
-        "concept": "Concept Development",
-        "concept development": "Concept Development",
-        "mvp": "MVP / Testing",
-        "testing": "MVP / Testing",
-        "mvp / testing": "MVP / Testing",
-        "setup": "Business Setup",
-        "business setup": "Business Setup",
-        "launch": "Launch",
-        "growth": "Growth",
-        "scale": "Growth",
-    }
-    
     # Check exact match first
     if stage in STAGE_KEYWORDS:
         return stage
     
     # Check normalized match
-    for key, value in stage_map.items():
+    for key, value in STAGE_ALIASES.items():
         if key in stage_lower:
             return value
     
     return stage  # Return as-is if no match
 
+
+
+def content_hash(title: Optional[str], description: Optional[str]) -> str:
+    """Hash of the text a program is categorized from (stored as programs.content_hash)"""
+    text = f"{title or ''}\0{description or ''}"
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+# Fields categorize_program sets, in the order known_categories holds them
+CATEGORY_FIELDS = ("stage", "sector", "program_type")
+
+
+def categorize_program(
+    program: Any,
+    known_categories: Optional[Dict[str, Tuple[Optional[str], ...]]] = None,
+    classifier: Any = None,
+) -> bool:
+    """
+    Set `program.stage` from its title and description on write, unless the
+    text is unchanged since it was last categorized (its content_hash
+    matches). `known_categories` maps content hashes to the (stage, sector,
+    program_type) already decided, e.g. for the rows an import replaces; a
+    known stage is used instead of categorizing, along with the sector and
+    program type where the program has none. A hash without a stage there is
+    categorized as usual.
+
+    With a trained `classifier` (app.services.program_classifier) its
+    confident predictions come first, the keyword rules are the fallback for
+    the stage, and an empty sector or program type is filled in. The stage is
+    left as it is when nothing matches.
+
+    Returns True if the categorizer ran.
+    """
+    digest = content_hash(program.title, program.description)
+    if digest == program.content_hash:
+        return False
+    program.content_hash = digest
+    known = (known_categories or {}).get(digest)
+    if known and known[0]:
+        program.stage = known[0]
+        for field, value in zip(CATEGORY_FIELDS[1:], known[1:]):
+            if not getattr(program, field) and value:
+                setattr(program, field, value)
+        return False
+    predicted = classifier.predict_one(program.title, program.description) if classifier else {}
+    stage = predicted.get("stage") or categorize_program_stage(program.title, program.description)
+    if stage:
+        program.stage = get_stage_display_name(stage)
+    for field in ("sector", "program_type"):
+        if not getattr(program, field) and predicted.get(field):
+            setattr(program, field, predicted[field])
+    return True
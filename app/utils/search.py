@@ -0,0 +1,39 @@
+"""Full-text search helpers shared by the catalog list endpoints"""
+from typing import Literal, Sequence, Tuple
+
+from sqlalchemy import Float, cast, func, literal, or_
+
+# Text search configuration used by the generated search_vector columns
+SEARCH_CONFIG = "english"
+
+# "fulltext" uses the indexed tsvector columns; "ilike" keeps the old substring match
+SearchMode = Literal["fulltext", "ilike"]
+
+
+def fulltext_match(search_vector, term: str) -> Tuple:
+    """
+    Build the match condition and relevance score for a web-style search term.
+    
+    Returns (condition, rank). The rank is cast to double precision so it
+    round-trips exactly through a pagination cursor.
+    """
+    tsquery = func.websearch_to_tsquery(SEARCH_CONFIG, term)
+    condition = search_vector.op("@@")(tsquery)
+    rank = cast(func.ts_rank(search_vector, tsquery), Float)
+    return condition, rank
+
+
+def trigram_match(columns: Sequence, term: str) -> Tuple:
+    """
+    Build a typo-tolerant pg_trgm match over one or more text columns.
+    
+    Uses word similarity so a short term like "Windsr" matches the closest word
+    inside longer values as well as short ones. The `<%` operator is served by
+    the gin_trgm_ops indexes. Returns (condition, score) where score is the best
+    similarity across the columns.
+    """
+    term = literal(term)
+    condition = or_(*[term.op("<%")(column) for column in columns])
+    scores = [func.coalesce(func.word_similarity(term, column), 0) for column in columns]
+    score = scores[0] if len(scores) == 1 else func.greatest(*scores)
+    return condition, cast(score, Float)
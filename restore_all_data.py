@@ -5,6 +5,7 @@ Run: python restore_all_data.py
 """
 from app.database import SessionLocal
 from app.models import Event, Organization, Program, Pathway
+from app.services.program_search import refresh_program_search
 from datetime import date, timedelta
 
 db = SessionLocal()
@@ -1012,6 +1013,7 @@ try:
     for program in programs:
         db.add(program)
     
+    refresh_program_search(db)
     db.commit()
     print(f"✅ Restored {len(programs)} programs")
     
@@ -0,0 +1,347 @@
+"""
+Shared async fetch engine for the scrapers.
+
+Pages are fetched concurrently over one pooled HTTP client (httpx), with
+  - a global limit on requests in flight and a per-host limit,
+  - a per-host token bucket for politeness (requests per second, with a
+    burst) instead of a fixed sleep after every page,
+  - retries with exponential backoff and jitter on connection errors,
+    timeouts and 429/5xx answers, honouring Retry-After.
+
+With an HTTPCache (http_cache.py), cached URLs are revalidated with
+If-None-Match / If-Modified-Since and a 304 is answered from disk; results
+say whether the page is unchanged, so scrapers can skip parsing it.
+
+Sites behind Cloudflare are fetched through a requests-style session
+(cloudscraper) by passing backend=cloudscraper_backend(); its blocking calls
+run in worker threads under the same limits.
+
+Scrapers are synchronous scripts, so most call fetch_pages(), which runs the
+engine for one batch of URLs:
+
+    for result in fetch_pages(urls, per_host_concurrency=2, rate_per_host=1.0):
+        if result.ok:
+            parse(result.url, result.text)
+
+Checked against a local fixture server by scripts/check_fetch_engine.py.
+"""
+import asyncio
+import random
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9",
+}
+
+# Answers worth retrying; anything else is returned as it is
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Longest Retry-After (seconds) that is waited out rather than treated as a failure
+MAX_RETRY_AFTER = 120
+
+
+class FetchError(Exception):
+    """A page that could not be fetched after all retries"""
+
+
+class FetchResult:
+    """One fetched URL: the final response, or the error after the last attempt"""
+
+    def __init__(self, url: str, status: Optional[int] = None, headers: Optional[Dict[str, str]] = None,
+                 content: bytes = b"", encoding: Optional[str] = None, attempts: int = 0,
+                 elapsed: float = 0.0, error: Optional[str] = None, final_url: Optional[str] = None):
+        self.url = url
+        self.final_url = final_url or url  # After redirects
+        # Set with a cache: the body came from disk (a 304), the body is the
+        # same as last run's, and the stored body's hash
+        self.from_cache = False
+        self.unchanged = False
+        self.body_hash: Optional[str] = None
+        self.status = status
+        self.headers = headers or {}
+        self.content = content
+        self.encoding = encoding
+        self.attempts = attempts
+        self.elapsed = elapsed
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.status is not None and (200 <= self.status < 300 or self.from_cache)
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding or "utf-8", errors="replace")
+
+    def raise_for_status(self) -> None:
+        if not self.ok:
+            raise FetchError(f"{self.url}: {self.error or f'HTTP {self.status}'} after {self.attempts} attempt(s)")
+
+
+class TokenBucket:
+    """Allows `rate` requests per second on average, in bursts of up to `burst`"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self) -> float:
+        """Wait for a token; returns the seconds waited"""
+        if self.rate <= 0:
+            return 0.0
+        started = time.monotonic()
+        # Callers queue on the lock, so tokens go out in arrival order
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return now - started
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class HTTPXBackend:
+    """Async requests over one pooled httpx.AsyncClient"""
+
+    name = "httpx"
+
+    def __init__(self, client: Optional[httpx.AsyncClient] = None, **client_options: Any):
+        self.client = client
+        self.client_options = client_options
+        self.owns_client = client is None
+
+    async def open(self, engine: "FetchEngine") -> None:
+        if self.client is None:
+            limits = httpx.Limits(max_connections=engine.concurrency, max_keepalive_connections=engine.concurrency)
+            self.client = httpx.AsyncClient(
+                headers=engine.headers, timeout=engine.timeout, limits=limits, follow_redirects=True,
+                **self.client_options,
+            )
+
+    async def close(self) -> None:
+        if self.owns_client and self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    async def get(self, url: str, headers: Dict[str, str], timeout: float):
+        response = await self.client.get(url, headers=headers, timeout=timeout)
+        return response.status_code, dict(response.headers), response.content, response.encoding, str(response.url)
+
+
+class SessionBackend:
+    """
+    Blocking requests-style sessions (requests.Session, cloudscraper) run in
+    worker threads. Sessions aren't thread-safe, so each thread gets its own
+    from `session_factory`.
+    """
+
+    name = "session"
+
+    def __init__(self, session_factory: Callable[[], Any]):
+        self.session_factory = session_factory
+        self.sessions: List[Any] = []
+        self.idle: Optional[asyncio.Queue] = None
+
+    async def open(self, engine: "FetchEngine") -> None:
+        self.idle = asyncio.Queue()
+        for _ in range(engine.concurrency):
+            session = self.session_factory()
+            session.headers.update(engine.headers)
+            self.sessions.append(session)
+            self.idle.put_nowait(session)
+
+    async def close(self) -> None:
+        for session in self.sessions:
+            session.close()
+        self.sessions = []
+
+    async def get(self, url: str, headers: Dict[str, str], timeout: float):
+        session = await self.idle.get()
+        try:
+            response = await asyncio.to_thread(session.get, url, headers=headers, timeout=timeout)
+        except Exception as e:
+            # Surface transport failures as retryable, like httpx's
+            raise httpx.TransportError(f"{type(e).__name__}: {e}") from e
+        finally:
+            self.idle.put_nowait(session)
+        return response.status_code, dict(response.headers), response.content, response.encoding, response.url
+
+
+def cloudscraper_backend() -> SessionBackend:
+    """A backend that gets past Cloudflare's browser check (needs the cloudscraper package)"""
+    import cloudscraper
+
+    backend = SessionBackend(cloudscraper.create_scraper)
+    backend.name = "cloudscraper"
+    return backend
+
+
+class FetchEngine:
+    """
+    Concurrent, polite page fetcher; use as an async context manager.
+
+    concurrency: requests in flight overall (also the connection pool size)
+    per_host_concurrency: requests in flight per host
+    rate_per_host: requests started per second per host (0 = no limit)
+    burst: requests a host may get back to back before the rate applies
+    retries: extra attempts after a retryable failure
+    backoff: first retry delay in seconds, doubled per attempt up to max_backoff
+    cache: an http_cache.HTTPCache to revalidate against and store responses in
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 8,
+        per_host_concurrency: int = 2,
+        rate_per_host: float = 1.0,
+        burst: int = 1,
+        retries: int = 3,
+        backoff: float = 0.5,
+        max_backoff: float = 30.0,
+        timeout: float = 30.0,
+        headers: Optional[Dict[str, str]] = None,
+        backend: Any = None,
+        cache: Any = None,
+    ):
+        self.concurrency = concurrency
+        self.per_host_concurrency = per_host_concurrency
+        self.rate_per_host = rate_per_host
+        self.burst = burst
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.headers = {**DEFAULT_HEADERS, **(headers or {})}
+        self.backend = backend or HTTPXBackend()
+        self.cache = cache
+        self.stats = Counter()
+        self.status_counts = Counter()
+        self.rate_wait = 0.0
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    async def __aenter__(self) -> "FetchEngine":
+        self._slots = asyncio.Semaphore(self.concurrency)
+        await self.backend.open(self)
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.backend.close()
+
+    def _host(self, url: str):
+        host = urlsplit(url).netloc.lower()
+        if host not in self._host_slots:
+            self._host_slots[host] = asyncio.Semaphore(self.per_host_concurrency)
+            self._buckets[host] = TokenBucket(self.rate_per_host, self.burst)
+        return self._host_slots[host], self._buckets[host]
+
+    def _retry_delay(self, attempt: int, retry_after: Optional[str]) -> float:
+        if retry_after:
+            try:
+                return min(float(retry_after), MAX_RETRY_AFTER)
+            except ValueError:
+                pass
+        # Full jitter: uniform in [0, min(cap, base * 2^attempt)]
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    async def fetch(self, url: str, headers: Optional[Dict[str, str]] = None) -> FetchResult:
+        """Fetch one URL within the limits, retrying; errors are returned in the result, not raised"""
+        host_slots, bucket = self._host(url)
+        started = time.monotonic()
+        result = FetchResult(url)
+        entry = self.cache.lookup(url) if self.cache is not None else None
+        if entry is not None:
+            headers = {**(headers or {}), **entry.conditional_headers()}
+        for attempt in range(self.retries + 1):
+            retry_after = None
+            # Per-host slot first, so a busy host doesn't hold global slots while it waits
+            async with host_slots:
+                waited = await bucket.acquire()
+                self.rate_wait += waited
+                async with self._slots:
+                    self.stats["requests"] += 1
+                    try:
+                        status, response_headers, content, encoding, final_url = await self.backend.get(
+                            url, headers or {}, self.timeout
+                        )
+                    except (httpx.TransportError, httpx.TimeoutException) as e:
+                        result.error = f"{type(e).__name__}: {e}"
+                        status = None
+                    else:
+                        result = FetchResult(url, status, response_headers, content, encoding, final_url=final_url)
+                        self.status_counts[status] += 1
+                        retry_after = {k.lower(): v for k, v in response_headers.items()}.get("retry-after")
+            result.attempts = attempt + 1
+            if status is not None and status not in RETRY_STATUSES:
+                break
+            if attempt < self.retries:
+                self.stats["retries"] += 1
+                await asyncio.sleep(self._retry_delay(attempt, retry_after))
+        result.elapsed = time.monotonic() - started
+        self.stats["bytes"] += len(result.content)
+        if self.cache is not None:
+            self._use_cache(result, entry)
+        self.stats["succeeded" if result.ok else "failed"] += 1
+        return result
+
+    def _use_cache(self, result: FetchResult, entry: Any) -> None:
+        """Answer a 304 from the cache, or store a fresh 200 and note whether it changed"""
+        stats = self.cache.stats
+        if result.error is None and result.status == 304 and entry is not None:
+            result.content = self.cache.body(entry)
+            result.encoding = entry.encoding
+            result.from_cache = result.unchanged = True
+            result.body_hash = entry.body_hash
+            self.cache.revalidated(entry, result.headers)
+            stats["not_modified"] += 1
+            stats["bytes_saved"] += entry.size
+        elif result.ok:
+            stored = self.cache.store(result.url, result.headers, result.content, result.encoding)
+            result.body_hash = stored.body_hash
+            result.unchanged = entry is not None and entry.body_hash == stored.body_hash
+            stats["unchanged" if result.unchanged else "changed" if entry is not None else "new"] += 1
+
+    async def fetch_all(self, urls: Iterable[str], headers: Optional[Dict[str, str]] = None) -> List[FetchResult]:
+        """Fetch every URL concurrently; results are in the order of `urls`"""
+        return await asyncio.gather(*[self.fetch(url, headers) for url in urls])
+
+    def summary(self) -> str:
+        return (f"{self.stats['requests']} requests ({self.stats['retries']} retries), "
+                f"{self.stats['succeeded']} ok, {self.stats['failed']} failed, "
+                f"{self.stats['bytes'] / 1024:.0f} KiB downloaded, {self.rate_wait:.1f}s waiting on rate limits")
+
+
+def fetch_pages(urls: Iterable[str], verbose: bool = True, **options: Any) -> List[FetchResult]:
+    """Fetch `urls` with a FetchEngine built from `options`, from synchronous code"""
+    async def run():
+        async with FetchEngine(**options) as engine:
+            results = await engine.fetch_all(urls)
+        if verbose:
+            print(f"🌐 {engine.summary()}")
+        return results
+
+    return asyncio.run(run())
+
+
+def fetch_page(url: str, **options: Any) -> FetchResult:
+    """One page, raising FetchError if it can't be fetched"""
+    result = fetch_pages([url], verbose=False, **options)[0]
+    result.raise_for_status()
+    return result
+
+
+def fetch_html(url: str, **options: Any) -> str:
+    """One page's HTML, raising FetchError if it can't be fetched"""
+    return fetch_page(url, **options).text
@@ -0,0 +1,158 @@
+"""
+On-disk HTTP response cache shared by the scrapers.
+
+Layout under the cache directory:
+  bodies/ab/<sha256 of body>.gz   response bodies, gzip-compressed and stored
+                                  once per distinct content
+  urls/<sha256 of url>.json       per URL: the body hash plus the ETag and
+                                  Last-Modified validators
+  parsed/<sha256 of url>.<parser>.json
+                                  what a scraper extracted from that body
+
+FetchEngine (fetch_engine.py) takes a cache: requests for cached URLs send
+If-None-Match / If-Modified-Since, a 304 is answered from the stored body,
+and a 200 whose body hashes the same as the stored one also counts as
+unchanged. parse_once() then hands back the stored extraction for unchanged
+pages, so they aren't parsed again. stats and summary() report hits, bytes
+saved and pages reparsed for the run.
+
+The cache lives in SCRAPER_CACHE_DIR (default scrapers/.http_cache); delete
+the directory to start over.
+"""
+import gzip
+import hashlib
+import json
+import os
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, Optional
+
+SCRAPER_CACHE_DIR = os.getenv("SCRAPER_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".http_cache"))
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(data)
+    os.replace(temporary, path)
+
+
+class CacheEntry:
+    """What is stored for one URL"""
+
+    def __init__(self, url: str, body_hash: str, size: int, etag: Optional[str] = None,
+                 last_modified: Optional[str] = None, encoding: Optional[str] = None, fetched_at: float = 0.0):
+        self.url = url
+        self.body_hash = body_hash
+        self.size = size
+        self.etag = etag
+        self.last_modified = last_modified
+        self.encoding = encoding
+        self.fetched_at = fetched_at
+
+    def conditional_headers(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class HTTPCache:
+    """Content-addressed response store with per-URL validators and parse results"""
+
+    def __init__(self, directory: str = SCRAPER_CACHE_DIR):
+        self.directory = directory
+        self.stats = Counter()
+
+    def _url_path(self, url: str) -> str:
+        return os.path.join(self.directory, "urls", _sha256(url.encode("utf-8")) + ".json")
+
+    def _body_path(self, body_hash: str) -> str:
+        return os.path.join(self.directory, "bodies", body_hash[:2], body_hash + ".gz")
+
+    def _parsed_path(self, url: str, parser: str) -> str:
+        return os.path.join(self.directory, "parsed", f"{_sha256(url.encode('utf-8'))}.{parser}.json")
+
+    def lookup(self, url: str) -> Optional[CacheEntry]:
+        """The stored entry for `url`, if its body is still there"""
+        try:
+            with open(self._url_path(url), encoding="utf-8") as f:
+                entry = CacheEntry(**json.load(f))
+        except (OSError, ValueError, TypeError):
+            return None
+        return entry if os.path.exists(self._body_path(entry.body_hash)) else None
+
+    def body(self, entry: CacheEntry) -> bytes:
+        with gzip.open(self._body_path(entry.body_hash), "rb") as f:
+            return f.read()
+
+    def store(self, url: str, headers: Dict[str, str], content: bytes, encoding: Optional[str] = None) -> CacheEntry:
+        """Save a 200 response; the body is written only if no URL has had the same content"""
+        body_hash = _sha256(content)
+        body_path = self._body_path(body_hash)
+        if not os.path.exists(body_path):
+            _write_atomic(body_path, gzip.compress(content, compresslevel=6))
+            self.stats["bodies_written"] += 1
+        headers = {name.lower(): value for name, value in headers.items()}
+        entry = CacheEntry(url, body_hash, len(content), headers.get("etag"), headers.get("last-modified"),
+                           encoding, time.time())
+        self._save(entry)
+        return entry
+
+    def revalidated(self, entry: CacheEntry, headers: Dict[str, str]) -> None:
+        """Record a 304 for `entry`, taking any new validators it carried"""
+        headers = {name.lower(): value for name, value in headers.items()}
+        entry.etag = headers.get("etag", entry.etag)
+        entry.last_modified = headers.get("last-modified", entry.last_modified)
+        entry.fetched_at = time.time()
+        self._save(entry)
+
+    def _save(self, entry: CacheEntry) -> None:
+        _write_atomic(self._url_path(entry.url), json.dumps(vars(entry)).encode("utf-8"))
+
+    def parsed(self, url: str, parser: str, body_hash: str) -> Optional[Any]:
+        """What `parser` extracted from this exact body of `url`, if it was saved"""
+        try:
+            with open(self._parsed_path(url, parser), encoding="utf-8") as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return record["data"] if record.get("body_hash") == body_hash else None
+
+    def store_parsed(self, url: str, parser: str, body_hash: str, data: Any) -> None:
+        _write_atomic(self._parsed_path(url, parser),
+                      json.dumps({"body_hash": body_hash, "data": data}, ensure_ascii=False).encode("utf-8"))
+
+    def summary(self) -> str:
+        fetched = self.stats["not_modified"] + self.stats["unchanged"] + self.stats["changed"] + self.stats["new"]
+        return (f"{fetched} pages: {self.stats['not_modified']} not modified (304), "
+                f"{self.stats['unchanged']} re-downloaded unchanged, {self.stats['changed']} changed, "
+                f"{self.stats['new']} new; {self.stats['bytes_saved'] / 1024:.0f} KiB not downloaded; "
+                f"{self.stats['reparsed']} parsed, {self.stats['parse_skipped']} parses skipped")
+
+
+def parse_once(cache: Optional[HTTPCache], result: Any, parser: str, parse: Callable[[], Any]) -> Any:
+    """
+    parse() for a fetched page, or the saved result when the page is unchanged
+    and `parser` already extracted it. `parser` names the scraper and should
+    change when its extraction does, so old results aren't reused. parse()'s
+    result must be JSON-serializable.
+    """
+    if cache is None or not getattr(result, "body_hash", None):
+        return parse()
+    if result.unchanged:
+        data = cache.parsed(result.url, parser, result.body_hash)
+        if data is not None:
+            cache.stats["parse_skipped"] += 1
+            return data
+    data = parse()
+    cache.stats["reparsed"] += 1
+    cache.store_parsed(result.url, parser, result.body_hash, data)
+    return data
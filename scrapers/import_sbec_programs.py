@@ -2,13 +2,17 @@
 import json
 import os
 import sys
-from sqlalchemy import delete
+from sqlalchemy import delete, select
 
 # Ensure app modules are importable
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from app.database import SessionLocal
 from app.models import Program, Organization
+from app.services.cache import bump_catalog_version
+from app.services.program_classifier import get_program_classifier
+from app.services.program_search import refresh_program_search
+from app.utils.program_categorizer import categorize_program
 
 SBEC_NAME = "Small Business & Entrepreneurship Centre"
 SBEC_WEBSITE = "https://www.webusinesscentre.com/"
@@ -53,11 +57,23 @@ def import_programs():
     try:
         sbec_org = get_or_create_sbec_org(db)
 
+        # Categories of the programs being replaced, reused for unchanged text
+        known_categories = {
+            digest: (stage, sector, program_type)
+            for digest, stage, sector, program_type in db.execute(
+                select(Program.content_hash, Program.stage, Program.sector, Program.program_type)
+                .where(Program.organization_id == sbec_org.id, Program.content_hash.is_not(None),
+                       Program.stage.is_not(None))
+            )
+        }
+
         # Clear existing SBEC programs to avoid duplicates
         db.execute(delete(Program).where(Program.organization_id == sbec_org.id))
         db.commit()
 
         imported = 0
+        categorized = 0
+        classifier = get_program_classifier()
         for program in programs:
             description = program.get('program_description') or 'See program website for full details.'
             application_link = program.get('application_link') or program.get('program_page_url')
@@ -71,11 +87,17 @@ def import_programs():
                 is_active=True,
                 is_verified=False,
             )
+            categorized += categorize_program(new_program, known_categories, classifier)
             db.add(new_program)
             imported += 1
 
+        # Update the program_search read model in the same transaction
+        refresh_program_search(db, organization_ids=[sbec_org.id])
         db.commit()
-        print(f"✅ Imported {imported} SBEC programs")
+        # Invalidate cached catalog reads on running API servers
+        bump_catalog_version(db, "programs", "organizations")
+        print(f"✅ Imported {imported} SBEC programs ({categorized} categorized, "
+              f"{imported - categorized} with unchanged text)")
     except Exception as exc:
         db.rollback()
         print("❌ Error importing programs:", exc)
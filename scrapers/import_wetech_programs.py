@@ -13,6 +13,10 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from app.database import SessionLocal
 from app.models import Program, Organization
+from app.services.cache import bump_catalog_version
+from app.services.program_classifier import get_program_classifier
+from app.services.program_search import refresh_program_search
+from app.utils.program_categorizer import categorize_program
 
 def find_or_create_wetech_org(db):
     """Find or create WEtech Alliance organization"""
@@ -150,6 +154,7 @@ def import_programs():
         
         imported_count = 0
         skipped_count = 0
+        classifier = get_program_classifier()
         
         for scraped in scraped_programs:
             # Validate program
@@ -193,8 +198,7 @@ def import_programs():
                 description=scraped.get('program_full_description') or scraped.get('program_summary') or 'No description available',
                 organization_id=wetech_org.id,
                 program_type=program_type,
-                stage=None,  # Could be extracted from description
-                sector=None,  # Could be extracted from description
+                sector=None,  # Predicted by categorize_program when a classifier is trained
                 eligibility_criteria={
                     'eligibility': scraped.get('eligibility'),
                     'target_audience': scraped.get('target_audience')
@@ -209,11 +213,16 @@ def import_programs():
                 is_active=True
             )
             
+            categorize_program(program, classifier=classifier)
             db.add(program)
             imported_count += 1
             print(f"  ✓ Importing: {program.title[:60]}")
         
+        # Update the program_search read model in the same transaction
+        refresh_program_search(db, organization_ids=[wetech_org.id])
         db.commit()
+        # Invalidate cached catalog reads on running API servers
+        bump_catalog_version(db, "programs", "organizations")
         
         print(f"\n✅ Import complete!")
         print(f"   - Imported: {imported_count} programs")
@@ -2,14 +2,15 @@
 import os
 import csv
 import json
-import time
 import re
 from datetime import datetime
 from urllib.parse import urljoin
 
-import cloudscraper
 from bs4 import BeautifulSoup
 
+import fetch_engine
+from http_cache import HTTPCache, parse_once
+
 BASE_URL = "https://www.investwindsoressex.com"
 MAIN_URL = "https://www.investwindsoressex.com/how-we-help/incentives-and-foreign-trade-programs/foreign-trade-zone-programs/"
 
@@ -19,15 +20,17 @@ HEADERS = {
     "Accept-Language": "en-US,en;q=0.9",
     "Referer": "https://www.investwindsoressex.com/",
 }
+# Bump when the extract_* functions change, so cached extractions aren't reused
+PARSER = "invest-windsor-v1"
+CACHE = HTTPCache()
 
 
-def fetch_html(url: str) -> str:
-    """Fetch HTML with cloudscraper to bypass Cloudflare"""
+def fetch_page(url: str) -> fetch_engine.FetchResult:
+    """Fetch a page with cloudscraper to bypass Cloudflare (retried with backoff, revalidated against the cache)"""
     try:
-        scraper = cloudscraper.create_scraper()
-        response = scraper.get(url, headers=HEADERS, timeout=30)
-        response.raise_for_status()
-        return response.text
+        return fetch_engine.fetch_page(
+            url, headers=HEADERS, timeout=30, backend=fetch_engine.cloudscraper_backend(), cache=CACHE
+        )
     except Exception as e:
         print(f"Error fetching {url}: {e}")
         raise
@@ -198,10 +201,7 @@ def extract_programs_from_content(soup: BeautifulSoup) -> list:
     return programs
 
 
-def scrape_programs() -> list:
-    """Scrape all FTZ programs from the main page"""
-    print(f"Fetching: {MAIN_URL}")
-    html = fetch_html(MAIN_URL)
+def extract_programs(html: str) -> list:
     soup = BeautifulSoup(html, 'html.parser')
     
     # Try extracting programs
@@ -210,6 +210,15 @@ def scrape_programs() -> list:
     # If we didn't find programs, try alternative method
     if not programs:
         programs = extract_program_sections(soup)
+    return programs
+
+
+def scrape_programs() -> list:
+    """Scrape all FTZ programs from the main page"""
+    print(f"Fetching: {MAIN_URL}")
+    result = fetch_page(MAIN_URL)
+    programs = parse_once(CACHE, result, PARSER, lambda: extract_programs(result.text))
+    print(f"💾 {CACHE.summary()}")
     
     # Format programs for output
     formatted_programs = []
@@ -2,13 +2,14 @@
 import os
 import csv
 import json
-import time
 from datetime import datetime
 from urllib.parse import urljoin, urlparse, urlunparse
 
-import requests
 from bs4 import BeautifulSoup
 
+import fetch_engine
+from http_cache import HTTPCache, parse_once
+
 BASE_URL = "https://www.webusinesscentre.com"
 MAIN_PATH = "/how-we-can-help/programs-and-financial-support/"
 MAIN_URL = urljoin(BASE_URL, MAIN_PATH)
@@ -18,6 +19,11 @@ HEADERS = {
     "Accept-Language": "en-US,en;q=0.9",
     "Referer": "https://www.webusinesscentre.com/",
 }
+# Bump when parse_program changes, so cached extractions aren't reused
+PARSER = "sbec-v1"
+CACHE = HTTPCache()
+# Politeness towards webusinesscentre.com: 2 requests at a time, 1 started per second
+FETCH_OPTIONS = dict(headers=HEADERS, per_host_concurrency=2, rate_per_host=1.0, timeout=30, cache=CACHE)
 
 
 def normalize_url(url: str) -> str:
@@ -27,9 +33,7 @@ def normalize_url(url: str) -> str:
 
 
 def fetch_html(url: str) -> str:
-    response = requests.get(url, headers=HEADERS, timeout=30)
-    response.raise_for_status()
-    return response.text
+    return fetch_engine.fetch_html(url, **FETCH_OPTIONS)
 
 
 def extract_description(main: BeautifulSoup) -> str:
@@ -96,7 +100,10 @@ def program_type_from_title(title: str) -> str:
 
 
 def scrape_program(url: str) -> dict:
-    html = fetch_html(url)
+    return parse_program(url, fetch_html(url))
+
+
+def parse_program(url: str, html: str) -> dict:
     soup = BeautifulSoup(html, 'html.parser')
     main = (
         soup.find('main')
@@ -175,18 +182,19 @@ def run():
     print(f"Found {len(program_links)} program links")
 
     programs = []
-    for link in program_links:
+    for result in fetch_engine.fetch_pages(program_links, **FETCH_OPTIONS):
+        link = result.url
         try:
-            print(f"Scraping: {link}")
-            program = scrape_program(link)
-            programs.append(program)
-            time.sleep(1)
+            print(f"Scraping: {link}{' (unchanged)' if result.unchanged else ''}")
+            result.raise_for_status()
+            programs.append(parse_once(CACHE, result, PARSER, lambda: parse_program(link, result.text)))
         except Exception as exc:
             print(f"  ✗ Failed to scrape {link}: {exc}")
     if programs:
         save_results(programs)
     else:
         print("No programs scraped")
+    print(f"💾 {CACHE.summary()}")
 
 
 if __name__ == "__main__":
@@ -1,15 +1,22 @@
 """
 Scrape only the actual program pages from WEtech Alliance
 """
-import requests
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin
 import json
 import re
-import time
 from datetime import datetime
 import os
 
+from fetch_engine import fetch_pages
+from http_cache import HTTPCache, parse_once
+
+# Bump when extract_program_data changes, so cached extractions aren't reused
+PARSER = "wetech-v1"
+CACHE = HTTPCache()
+# Politeness towards wetech-alliance.com: 2 requests at a time, 1 started per second
+FETCH_OPTIONS = dict(per_host_concurrency=2, rate_per_host=1.0, timeout=15, cache=CACHE)
+
 class ProgramPageScraper:
     def __init__(self):
         self.base_url = "https://www.wetech-alliance.com"
@@ -25,11 +32,6 @@ class ProgramPageScraper:
             "https://www.wetech-alliance.com/wim/",
             "https://www.wetech-alliance.com/talks/",
         ]
-        
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-        })
     
     def extract_email(self, text):
         """Extract email addresses from text"""
@@ -297,14 +299,17 @@ class ProgramPageScraper:
         """Scrape all program pages"""
         print("Scraping WEtech Alliance program pages...\n")
         
-        for url in self.program_urls:
+        # Fetch all pages concurrently (within FETCH_OPTIONS' limits), then parse in order;
+        # pages unchanged since the last run reuse what was extracted then
+        for result in fetch_pages(self.program_urls, **FETCH_OPTIONS):
+            url = result.url
             try:
-                print(f"Scraping: {url}")
-                response = self.session.get(url, timeout=15)
-                response.raise_for_status()
+                print(f"Scraping: {url}{' (unchanged)' if result.unchanged else ''}")
+                result.raise_for_status()
                 
-                soup = BeautifulSoup(response.content, 'html.parser')
-                program = self.extract_program_data(url, soup)
+                program = parse_once(CACHE, result, PARSER, lambda: self.extract_program_data(
+                    url, BeautifulSoup(result.content, 'html.parser')
+                ))
                 
                 if program['program_title']:
                     self.programs.append(program)
@@ -312,10 +317,9 @@ class ProgramPageScraper:
                 else:
                     print(f"  ⚠️  No title found for {url}")
                 
-                time.sleep(2)  # Be polite
-                
             except Exception as e:
                 print(f"  ✗ Error scraping {url}: {e}")
+        print(f"\n💾 {CACHE.summary()}")
         
         # Save results
         script_dir = os.path.dirname(os.path.abspath(__file__))
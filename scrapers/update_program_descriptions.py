@@ -8,6 +8,8 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from app.database import SessionLocal
 from app.models import Program, Organization
+from app.services.cache import bump_catalog_version
+from app.services.program_search import refresh_program_search
 
 def update_descriptions():
     """Update program descriptions"""
@@ -45,7 +47,10 @@ def update_descriptions():
                     program.description = new_description
                     updated_count += 1
         
+        # Snippets and search vectors in the read model follow the descriptions
+        refresh_program_search(db, organization_ids=[wetech.id])
         db.commit()
+        bump_catalog_version(db, "programs")
         print(f"\n✅ Updated {updated_count} program descriptions")
         
     except Exception as e:
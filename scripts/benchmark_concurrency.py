@@ -0,0 +1,115 @@
+"""
+Measure API latency under concurrent load.
+
+Opens N concurrent clients (200 by default), each issuing a fixed number of GET
+requests round-robin over a set of catalog endpoints, and reports throughput and
+p50/p95/p99 latency per target. Every request carries a unique `_bench` query
+parameter so it misses the in-process catalog cache and reaches the database.
+
+To compare before/after, run the old and new code side by side and pass both:
+
+    git worktree add /tmp/api-before <old-commit>
+    (cd /tmp/api-before && uvicorn app.main:app --port 8001) &
+    uvicorn app.main:app --port 8000 &
+    python scripts/benchmark_concurrency.py --url http://localhost:8001 --url http://localhost:8000
+
+Usage:
+    python scripts/benchmark_concurrency.py [--url http://localhost:8000 ...]
+        [--clients 200] [--requests 20] [--path /api/programs/?limit=50 ...] [--cached]
+"""
+import argparse
+import asyncio
+import itertools
+import time
+
+import httpx
+
+DEFAULT_PATHS = [
+    "/api/programs/?limit=50",
+    "/api/programs/?search=funding&limit=20",
+    "/api/organizations/?limit=50",
+    "/api/organizations/?city=windsor&limit=20",
+    "/api/events/?limit=50",
+    "/api/pathways/",
+]
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return float("nan")
+    index = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+async def run_client(client, paths, requests_per_client, counter, cached, latencies, errors):
+    for _ in range(requests_per_client):
+        path = paths[next(counter) % len(paths)]
+        params = None if cached else {"_bench": next(counter)}
+        started = time.perf_counter()
+        try:
+            response = await client.get(path, params=params)
+            if response.status_code >= 400:
+                errors.append(response.status_code)
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+
+async def benchmark(base_url, paths, clients, requests_per_client, cached):
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        # Warm up connections, caches and the server's pool
+        await asyncio.gather(*[client.get(path) for path in paths])
+
+        latencies, errors = [], []
+        counter = itertools.count()
+        started = time.perf_counter()
+        await asyncio.gather(*[
+            run_client(client, paths, requests_per_client, counter, cached, latencies, errors)
+            for _ in range(clients)
+        ])
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "max": latencies[-1] if latencies else float("nan"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", action="append", help="Base URL of a running API (repeat to compare)")
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=20, help="Requests per client")
+    parser.add_argument("--path", action="append", help="Endpoint to hit (repeatable)")
+    parser.add_argument("--cached", action="store_true", help="Allow catalog cache hits")
+    args = parser.parse_args()
+
+    urls = args.url or ["http://localhost:8000"]
+    paths = args.path or DEFAULT_PATHS
+
+    print(f"{args.clients} concurrent clients x {args.requests} requests over {len(paths)} endpoints")
+    results = {}
+    for url in urls:
+        print(f"⏱️  Benchmarking {url}...")
+        results[url] = asyncio.run(
+            benchmark(url, paths, args.clients, args.requests, args.cached)
+        )
+
+    print()
+    print(f"{'target':<32} {'requests':>9} {'errors':>7} {'req/s':>8} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for url, r in results.items():
+        print(f"{url:<32} {r['requests']:>9} {r['errors']:>7} {r['rps']:>8.1f} "
+              f"{r['p50']:>8.1f} {r['p95']:>8.1f} {r['p99']:>8.1f} {r['max']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
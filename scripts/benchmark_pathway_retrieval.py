@@ -0,0 +1,133 @@
+"""
+Benchmark the local recommender and the pathway prompt it pre-filters.
+
+Builds synthetic catalogs of increasing size from the scraped program corpus in
+the repo (the scrapers/*.json and cleaned_programs_*.json files). For each it
+reports the one-off prompt compile and recommender build times, the size of
+the full-catalog prompt against the top-K prompt, and the per-query ranking
+time of the recommender (what `mode=local` costs, and what picks the AI
+candidates). No database or API key is needed.
+
+Usage:
+    python scripts/benchmark_pathway_retrieval.py [--sizes 100 1000 10000 50000]
+        [--top-k 25] [--queries 200]
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.services.gemini_service import build_prompt, compile_prompt
+from app.services.recommender import ProgramRecommender
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+
+STAGES = ["Idea", "Early Stage", "Growing Business", "Established Business", None]
+SECTORS = ["Technology", "Healthcare", "Manufacturing", "Agri-food", "Creative", None]
+
+# Answer options of the seeded pathways (scripts/seed_pathways.py)
+ANSWERS = [
+    {"idea": "Idea", "early": "Early Stage", "growth": "Growing Business",
+     "established": "Established Business"},
+    {"funding": "Funding", "mentorship": "Mentorship", "networking": "Networking",
+     "training": "Training/Education"},
+    {"tech": "Technology/Software", "health": "Healthcare/HealthTech",
+     "green": "GreenTech/Sustainability", "food": "Food & Beverage",
+     "manufacturing": "Manufacturing", "media": "Digital Media/Creative"},
+    {"founder": "Startup Founder/Entrepreneur", "student": "Student",
+     "professional": "Working Professional", "investor": "Investor", "mentor": "Mentor/Advisor"},
+]
+
+
+def load_corpus():
+    """(title, description) pairs from the scraped program files"""
+    paths = glob.glob(os.path.join(ROOT, "scrapers", "*_programs.json"))
+    paths += glob.glob(os.path.join(ROOT, "cleaned_programs_*.json"))
+    corpus = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for record in json.load(f):
+                title = record.get("program_title") or record.get("program_name")
+                description = (record.get("program_description")
+                               or record.get("program_full_description")
+                               or record.get("description") or "")
+                if title:
+                    corpus.append((title, description))
+    return corpus
+
+
+def synthetic_catalog(corpus, size, rng):
+    organizations = [
+        SimpleNamespace(id=i, organization_name=f"Organization {i}", sector_type=rng.choice(SECTORS),
+                        services_offered=None, city="Windsor", province_state="ON", address=None,
+                        website=f"https://org{i}.example.com", email_address=None, phone_number=None,
+                        contact_name=None, notes=None)
+        for i in range(1, max(2, size // 10) + 1)
+    ]
+    programs = []
+    for i in range(1, size + 1):
+        title, description = corpus[i % len(corpus)]
+        programs.append(SimpleNamespace(
+            id=i, title=f"{title} #{i}", description=description,
+            organization_id=rng.choice(organizations).id, program_type="Program",
+            stage=rng.choice(STAGES), sector=rng.choice(SECTORS), eligibility_criteria=None,
+            cost="Free", duration=None, application_deadline=None, start_date=None,
+            website=None, application_link=None, is_verified=bool(i % 2),
+        ))
+    pathways = [
+        SimpleNamespace(id=i, question=f"Question {i}", answer_options=options, recommended_resources=None)
+        for i, options in enumerate(ANSWERS, start=1)
+    ]
+    return pathways, organizations, programs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 50000])
+    parser.add_argument("--top-k", type=int, default=25)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    corpus = load_corpus()
+    print(f"📚 Corpus: {len(corpus)} scraped programs, top-K = {args.top_k}")
+    print()
+    print(f"{'programs':>9} {'compile ms':>11} {'index ms':>9} {'full prompt':>12} {'top-K prompt':>13} "
+          f"{'reduction':>10} {'rank ms/query':>14}")
+
+    for size in args.sizes:
+        pathways, organizations, programs = synthetic_catalog(corpus, size, rng)
+        started = time.perf_counter()
+        compiled = compile_prompt(pathways, organizations, [], programs)
+        compile_ms = (time.perf_counter() - started) * 1000
+        started = time.perf_counter()
+        recommender = ProgramRecommender(pathways, programs)
+        index_ms = (time.perf_counter() - started) * 1000
+
+        answer_sets = [
+            recommender.answers({str(pid): rng.choice(list(options)) for pid, options in enumerate(ANSWERS, start=1)})
+            for _ in range(args.queries)
+        ]
+        full_chars = len(build_prompt(answer_sets[0], compiled))
+
+        started = time.perf_counter()
+        rankings = [recommender.rank(answered, args.top_k) for answered in answer_sets]
+        rank_ms = (time.perf_counter() - started) * 1000 / len(answer_sets)
+
+        top_k_chars = sum(
+            len(build_prompt(answered, compiled, [program_id for program_id, _ in ranking]))
+            for answered, ranking in zip(answer_sets, rankings)
+        ) // len(answer_sets)
+
+        print(f"{size:>9} {compile_ms:>11.1f} {index_ms:>9.1f} {full_chars:>12,} {top_k_chars:>13,} "
+              f"{full_chars / top_k_chars:>9.1f}x {rank_ms:>14.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+Load-test POST /api/pathways/query (or /query/stream) with concurrent clients.
+
+Each client sends pathway queries drawn from a pool of `--distinct` answer
+sets, so repeated sets exercise the recommendation cache and concurrent ones
+the request coalescing. Reports throughput, latency percentiles, X-Cache
+counts, how many answers came from the model versus a fallback, and the
+change in the API's /metrics counters over the run.
+
+Run it against the local Gemini stand-in to spend no API quota:
+
+    python scripts/fake_model_server.py --latency 0.8 &
+    MODEL_CLIENT=http MODEL_SERVER_URL=http://127.0.0.1:8090 uvicorn app.main:app --port 8000 &
+    python scripts/benchmark_pathways_load.py --model-server http://127.0.0.1:8090
+
+Usage:
+    python scripts/benchmark_pathways_load.py [--url http://localhost:8000]
+        [--clients 50] [--requests 10] [--distinct 20] [--mode ai|local|hybrid]
+        [--stream] [--model-server http://127.0.0.1:8090]
+"""
+import argparse
+import asyncio
+import collections
+import itertools
+import json
+import random
+import time
+
+import httpx
+
+QUERY_PATH = "/api/pathways/query"
+STREAM_PATH = "/api/pathways/query/stream"
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return float("nan")
+    index = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def answer_sets(pathways, distinct, rng):
+    """`distinct` answer sets over the real pathways, tagged with this run so no earlier run's cache applies"""
+    run = str(time.time_ns())
+    sets = []
+    for i in range(distinct):
+        responses = {
+            str(p["id"]): rng.choice(list(p["answer_options"]))
+            for p in pathways if p.get("answer_options")
+        }
+        responses["_bench"] = f"{run}-{i}"
+        sets.append(responses)
+    return sets
+
+
+def source_of(recommendations):
+    sources = {r.get("source") for r in recommendations}
+    if "gemini_ai" in sources:
+        return "model"
+    if "local_recommender" in sources:
+        return "local"
+    return "fallback"
+
+
+async def query(client, payload, results):
+    started = time.perf_counter()
+    response = await client.post(QUERY_PATH, json=payload)
+    elapsed = (time.perf_counter() - started) * 1000
+    results["latencies"].append(elapsed)
+    results["status"][response.status_code] += 1
+    if response.status_code == 200:
+        results["cache"][response.headers.get("x-cache", "-")] += 1
+        results["source"][source_of(response.json()["recommendations"])] += 1
+
+
+async def query_stream(client, payload, results):
+    started = time.perf_counter()
+    first_chunk = None
+    source = "fallback"
+    async with client.stream("POST", STREAM_PATH, json=payload) as response:
+        results["status"][response.status_code] += 1
+        results["cache"][response.headers.get("x-cache", "-")] += 1
+        event = None
+        async for line in response.aiter_lines():
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+                if event == "chunk" and first_chunk is None:
+                    first_chunk = (time.perf_counter() - started) * 1000
+                    source = "model"
+                elif event == "recommendations" and source == "fallback":
+                    source = "local"
+                elif event == "error":
+                    source = "error"
+    results["latencies"].append((time.perf_counter() - started) * 1000)
+    if first_chunk is not None:
+        results["first_chunk"].append(first_chunk)
+    results["source"][source] += 1
+
+
+async def run_client(client, send, payloads, requests_per_client, counter, mode, results):
+    for _ in range(requests_per_client):
+        payload = {"responses": payloads[next(counter) % len(payloads)], "mode": mode}
+        try:
+            await send(client, payload, results)
+        except httpx.HTTPError as e:
+            results["status"][type(e).__name__] += 1
+
+
+async def get_json(url, path):
+    if not url:
+        return None
+    async with httpx.AsyncClient(base_url=url, timeout=10) as client:
+        try:
+            response = await client.get(path)
+            response.raise_for_status()
+            return response.json()
+        except httpx.HTTPError:
+            return None
+
+
+async def benchmark(args):
+    rng = random.Random(args.seed)
+    pathways = await get_json(args.url, "/api/pathways/") or []
+    payloads = answer_sets(pathways, args.distinct, rng)
+    # Shuffled so each distinct set is requested from several clients at around the same time
+    order = list(range(args.clients * args.requests))
+    rng.shuffle(order)
+    payloads = [payloads[i % len(payloads)] for i in order]
+
+    metrics_before = await get_json(args.url, "/metrics")
+    model_before = await get_json(args.model_server, "/stats")
+
+    results = {
+        "latencies": [],
+        "first_chunk": [],
+        "status": collections.Counter(),
+        "cache": collections.Counter(),
+        "source": collections.Counter(),
+    }
+    send = query_stream if args.stream else query
+    limits = httpx.Limits(max_connections=args.clients, max_keepalive_connections=args.clients)
+    counter = itertools.count()
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=args.timeout) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*[
+            run_client(client, send, payloads, args.requests, counter, args.mode, results)
+            for _ in range(args.clients)
+        ])
+        results["elapsed"] = time.perf_counter() - started
+
+    results["metrics"] = (metrics_before, await get_json(args.url, "/metrics"))
+    results["model"] = (model_before, await get_json(args.model_server, "/stats"))
+    return results
+
+
+def delta(before, after, keys):
+    """after - before for the numeric counters in `keys`"""
+    if not before or not after:
+        return None
+    return {key: after[key] - before.get(key, 0) for key in keys if isinstance(after.get(key), (int, float))}
+
+
+def report(args, results):
+    latencies = sorted(results["latencies"])
+    elapsed = results["elapsed"]
+    print()
+    print(f"requests {len(latencies)} in {elapsed:.1f}s = {len(latencies) / elapsed:.1f} req/s")
+    print(f"latency ms  p50 {percentile(latencies, 50):.1f}  p90 {percentile(latencies, 90):.1f}  "
+          f"p99 {percentile(latencies, 99):.1f}  max {latencies[-1] if latencies else float('nan'):.1f}")
+    if results["first_chunk"]:
+        first = sorted(results["first_chunk"])
+        print(f"first chunk ms  p50 {percentile(first, 50):.1f}  p90 {percentile(first, 90):.1f}  "
+              f"p99 {percentile(first, 99):.1f}")
+    print(f"status      {dict(results['status'])}")
+    print(f"X-Cache     {dict(results['cache'])}")
+    print(f"answered by {dict(results['source'])}")
+
+    before, after = results["metrics"]
+    cache = delta(before and before["recommendation_cache"], after and after["recommendation_cache"],
+                  ["hits", "misses", "coalesced", "evictions", "expirations"])
+    if cache is not None:
+        lookups = cache["hits"] + cache["misses"]
+        hit_rate = cache["hits"] / lookups if lookups else 0.0
+        print(f"recommendation cache  {json.dumps(cache)}  hit rate {hit_rate:.1%}")
+    gemini = delta(before and before["gemini"], after and after["gemini"],
+                   ["calls", "succeeded", "failed", "timed_out", "slow", "rejected_busy", "rejected_open"])
+    if gemini is not None:
+        print(f"model calls           {json.dumps(gemini)}  breaker {after['gemini']['breaker']['state']}")
+    model = delta(*results["model"], ["requests", "completed", "errors", "rate_limited", "disconnected"])
+    if model is not None:
+        print(f"model server          {json.dumps(model)}  max in flight {results['model'][1]['max_in_flight']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000", help="Base URL of a running API")
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=10, help="Requests per client")
+    parser.add_argument("--distinct", type=int, default=20, help="Distinct answer sets (the rest are repeats)")
+    parser.add_argument("--mode", choices=["ai", "local", "hybrid"], default="ai")
+    parser.add_argument("--stream", action="store_true", help="Use the server-sent events endpoint")
+    parser.add_argument("--model-server", help="Base URL of scripts/fake_model_server.py, to report its counters")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"⏱️  {args.clients} concurrent clients x {args.requests} {args.mode} queries "
+          f"over {args.distinct} answer sets{' (streaming)' if args.stream else ''} against {args.url}")
+    report(args, asyncio.run(benchmark(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Micro-benchmark of categorize_program_stage against the per-keyword version.
+
+Runs both over the scraped program corpus in the repo (the scrapers/*.json and
+cleaned_programs_*.json files), plus each program's first sentence (which
+reaches the fallback rules more often), checks they agree on every text and
+reports the time per call. The reference below is the previous
+implementation: one re.findall per keyword, then substring checks.
+
+Usage:
+    python scripts/benchmark_stage_categorizer.py [--repeat 200]
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.utils.program_categorizer import STAGE_KEYWORDS, categorize_program_stage
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+
+
+def load_corpus():
+    """(title, description) pairs from the scraped program files"""
+    paths = glob.glob(os.path.join(ROOT, "scrapers", "*_programs.json"))
+    paths += glob.glob(os.path.join(ROOT, "cleaned_programs_*.json"))
+    corpus = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for record in json.load(f):
+                title = record.get("program_title") or record.get("program_name")
+                description = (record.get("program_description")
+                               or record.get("program_full_description")
+                               or record.get("description") or "")
+                if title:
+                    corpus.append((title, description))
+    return corpus
+
+
+def reference_categorize_program_stage(title, description):
+    if not description:
+        return None
+    text = f"{title} {description}".lower()
+    stage_scores = {}
+    for stage, keywords in STAGE_KEYWORDS.items():
+        score = 0
+        for keyword in keywords:
+            score += len(re.findall(r'\b' + re.escape(keyword.lower()) + r'\b', text))
+        if score > 0:
+            stage_scores[stage] = score
+    if stage_scores:
+        return max(stage_scores, key=stage_scores.get)
+
+    if any(word in text for word in ["accelerator", "incubator", "startup"]):
+        if any(word in text for word in ["early", "idea", "concept"]):
+            return "Idea / Inspiration"
+        elif any(word in text for word in ["validate", "validation", "research"]):
+            return "Validation"
+        return "Concept Development"
+    if "mentorship" in text or "mentor" in text:
+        if any(word in text for word in ["early", "idea", "starting"]):
+            return "Idea / Inspiration"
+        elif any(word in text for word in ["growth", "scale", "expand"]):
+            return "Growth"
+        return "Concept Development"
+    if any(word in text for word in ["workshop", "training", "seminar"]):
+        if any(word in text for word in ["idea", "brainstorm", "explore"]):
+            return "Idea / Inspiration"
+        elif any(word in text for word in ["validate", "research", "market"]):
+            return "Validation"
+        elif any(word in text for word in ["launch", "go to market"]):
+            return "Launch"
+        elif any(word in text for word in ["growth", "scale"]):
+            return "Growth"
+        return "Concept Development"
+    if any(word in text for word in ["fund", "grant", "financing", "loan"]):
+        if any(word in text for word in ["early", "startup", "seed"]):
+            return "Concept Development"
+        elif any(word in text for word in ["growth", "scale", "expansion"]):
+            return "Growth"
+        return "Business Setup"
+    return None
+
+
+def time_per_call(fn, texts, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for title, description in texts:
+            fn(title, description)
+    return (time.perf_counter() - started) * 1e6 / (repeat * len(texts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200, help="Passes over the corpus per timing")
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    texts = corpus + [(title, description.split(".")[0]) for title, description in corpus]
+    mismatches = [
+        (title, description) for title, description in texts
+        if categorize_program_stage(title, description) != reference_categorize_program_stage(title, description)
+    ]
+    average = sum(len(title) + len(description) for title, description in texts) / len(texts)
+    print(f"📚 {len(texts)} texts ({len(corpus)} scraped programs, full and first sentence), "
+          f"{average:.0f} chars on average")
+
+    reference_us = time_per_call(reference_categorize_program_stage, texts, args.repeat)
+    compiled_us = time_per_call(categorize_program_stage, texts, args.repeat)
+    print(f"{'per-keyword findall':<22} {reference_us:>9.1f} us/call")
+    print(f"{'single-pass matcher':<22} {compiled_us:>9.1f} us/call  ({reference_us / compiled_us:.1f}x faster)")
+
+    if mismatches:
+        print(f"❌ {len(mismatches)} texts categorized differently, e.g. {mismatches[0]!r}")
+        sys.exit(1)
+    print("✅ identical stages for every text")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Benchmark substring and fuzzy organization filters with and without pg_trgm indexes.
+
+Builds a synthetic organizations-like temp table (100k rows by default), runs the
+filters used by GET /api/organizations under EXPLAIN ANALYZE, then adds the GIN
+trigram indexes from migration 006 and runs them again.
+
+Usage:
+    python scripts/benchmark_trigram_indexes.py [--rows 100000] [--repeat 5]
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import text
+
+from app.database import engine
+
+TABLE = "trgm_bench_organizations"
+
+CITIES = ["Windsor", "Tecumseh", "LaSalle", "Amherstburg", "Kingsville", "Leamington",
+          "Essex", "Lakeshore", "Chatham", "Toronto", "London", "Sarnia"]
+SECTORS = ["Technology", "Manufacturing", "Healthcare", "Agri-food", "Social Enterprise",
+           "Automotive", "Education", "Finance", "Tourism", "Logistics"]
+SERVICES = ["mentorship for early stage founders", "export and trade advisory",
+            "accelerator program for scaling companies", "grant and funding navigation",
+            "incubator space and workshops", "market research and validation support"]
+
+# (label, WHERE clause, ORDER BY clause) - mirrors the router's ilike and fuzzy filters
+QUERIES = [
+    ("city ilike", "city ILIKE '%windsor%'", "id"),
+    ("sector_type ilike", "sector_type ILIKE '%manufactur%'", "id"),
+    ("search ilike (4 columns)",
+     "organization_name ILIKE '%acme 42%' OR address ILIKE '%acme 42%' "
+     "OR city ILIKE '%acme 42%' OR services_offered ILIKE '%acme 42%'", "id"),
+    ("city fuzzy 'Windsr'", "'Windsr' <% city", "word_similarity('Windsr', city) DESC, id"),
+    ("sector fuzzy 'Manufactring'", "'Manufactring' <% sector_type",
+     "word_similarity('Manufactring', sector_type) DESC, id"),
+    ("search fuzzy 'acceleratr'",
+     "'acceleratr' <% organization_name OR 'acceleratr' <% services_offered",
+     "greatest(word_similarity('acceleratr', organization_name), "
+     "word_similarity('acceleratr', services_offered)) DESC, id"),
+]
+
+INDEXED_COLUMNS = ["organization_name", "address", "city", "services_offered", "sector_type"]
+
+
+def _sql_array(values):
+    return "ARRAY[" + ", ".join("'" + v.replace("'", "''") + "'" for v in values) + "]"
+
+
+def create_table(conn, rows):
+    conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    conn.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+    conn.execute(text(f"""
+        CREATE TEMP TABLE {TABLE} (
+            id serial PRIMARY KEY,
+            organization_name text,
+            address text,
+            city varchar(100),
+            services_offered text,
+            sector_type varchar(200)
+        )
+    """))
+    conn.execute(text(f"""
+        INSERT INTO {TABLE} (organization_name, address, city, services_offered, sector_type)
+        SELECT
+            'Acme ' || g || ' ' || substr(md5(g::text), 1, 8),
+            (g % 900 + 1) || ' ' || (ARRAY['Ouellette Ave', 'Wyandotte St', 'Tecumseh Rd', 'Howard Ave'])[g % 4 + 1],
+            c.cities[g % array_length(c.cities, 1) + 1],
+            c.services[g % array_length(c.services, 1) + 1] || ' ' || md5(g::text),
+            c.sectors[g % array_length(c.sectors, 1) + 1]
+        FROM generate_series(1, :rows) AS g,
+             (SELECT {_sql_array(CITIES)} AS cities,
+                     {_sql_array(SECTORS)} AS sectors,
+                     {_sql_array(SERVICES)} AS services) AS c
+    """), {"rows": rows})
+    conn.execute(text(f"ANALYZE {TABLE}"))
+
+
+def create_indexes(conn):
+    for column in INDEXED_COLUMNS:
+        conn.execute(text(
+            f"CREATE INDEX {TABLE}_{column}_trgm ON {TABLE} USING gin ({column} gin_trgm_ops)"
+        ))
+    conn.execute(text(f"ANALYZE {TABLE}"))
+
+
+def _scan_nodes(plan):
+    """Collect the scan node types of an EXPLAIN plan tree"""
+    nodes = []
+    if "Scan" in plan["Node Type"]:
+        nodes.append(plan["Node Type"])
+    for child in plan.get("Plans", []):
+        nodes.extend(_scan_nodes(child))
+    return nodes
+
+
+def run_queries(conn, repeat):
+    results = {}
+    for label, where, order_by in QUERIES:
+        sql = f"SELECT * FROM {TABLE} WHERE {where} ORDER BY {order_by} LIMIT 50"
+        timings = []
+        plan = None
+        for _ in range(repeat):
+            raw = conn.execute(text(f"EXPLAIN (ANALYZE, FORMAT JSON) {sql}")).scalar()
+            explained = raw if isinstance(raw, list) else json.loads(raw)
+            plan = explained[0]["Plan"]
+            timings.append(explained[0]["Execution Time"])
+        timings.sort()
+        results[label] = {
+            "median_ms": timings[len(timings) // 2],
+            "scans": ", ".join(sorted(set(_scan_nodes(plan)))),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with engine.connect() as conn:
+        print(f"Building {args.rows:,} synthetic organizations...")
+        create_table(conn, args.rows)
+        before = run_queries(conn, args.repeat)
+        print("Creating GIN trigram indexes...")
+        create_indexes(conn)
+        after = run_queries(conn, args.repeat)
+        conn.rollback()
+
+    print()
+    print(f"{'query':<28} {'unindexed ms':>13} {'indexed ms':>11} {'speedup':>8}  plan (unindexed -> indexed)")
+    for label, _, _ in QUERIES:
+        b, a = before[label], after[label]
+        speedup = b["median_ms"] / a["median_ms"] if a["median_ms"] else float("inf")
+        print(f"{label:<28} {b['median_ms']:>13.2f} {a['median_ms']:>11.2f} {speedup:>7.1f}x  "
+              f"{b['scans']} -> {a['scans']}")
+
+
+if __name__ == "__main__":
+    main()
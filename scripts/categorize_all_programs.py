@@ -1,64 +1,249 @@
-"""Categorize all existing programs into business stages"""
+"""
+Categorize all existing programs into business stages.
+
+Programs are streamed in id order in chunks (yield_per on a read-only
+session), categorized across a process pool (by the trained classifier when
+there is one, with the keyword rules as the fallback) and the changes written
+back with one UPDATE ... FROM (VALUES ...) per chunk, which also refreshes
+those programs' program_search rows. Programs whose title and description
+are unchanged since they were last categorized (programs.content_hash) are
+skipped unless --force is given. Each chunk commits on its own and the
+last committed id is saved to a checkpoint file, so an interrupted run picks
+up where it stopped with --resume. The checkpoint is removed once the run
+completes. --dry-run categorizes and reports without writing anything.
+
+Usage:
+    python scripts/categorize_all_programs.py [--chunk-size 1000] [--workers 4]
+        [--resume] [--dry-run] [--force] [--checkpoint categorize_programs.checkpoint.json]
+"""
+import argparse
+import collections
+import json
 import os
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
+from sqlalchemy import Integer, String, case, column, func, select, update, values
+
 from app.database import SessionLocal
 from app.models import Program
-from app.utils.program_categorizer import categorize_program_stage, get_stage_display_name
+from app.services.cache import bump_catalog_version
+from app.services.program_classifier import get_program_classifier
+from app.services.program_search import refresh_program_search
+from app.utils.program_categorizer import categorize_program_stage, content_hash, get_stage_display_name
+
+DEFAULT_CHECKPOINT = "categorize_programs.checkpoint.json"
+
+
+def categorize_chunk(rows, force=False):
+    """
+    (id, stage, sector, content hash) for the rows whose text changed since
+    they were last categorized (all rows with `force`), the ids whose stage or
+    sector changes, and counts of updated, unchanged, unmatched and skipped
+    rows. Runs in the worker processes.
+    """
+    changes = []
+    restaged = []
+    counts = collections.Counter()
+    pending = []
+    for row in rows:
+        digest = content_hash(row[1], row[2])
+        if digest == row[5] and not force:
+            counts["skipped"] += 1
+        else:
+            pending.append((row, digest))
+    if not pending:
+        return changes, restaged, counts
+
+    # Classifier predictions for the whole chunk at once (None when unsure or untrained)
+    classifier = get_program_classifier()
+    predicted = classifier.predict([(row[1], row[2]) for row, _ in pending]) if classifier else {}
+    no_prediction = [None] * len(pending)
+    predicted_stages = predicted.get("stage", no_prediction)
+    predicted_sectors = predicted.get("sector", no_prediction)
+
+    for i, (row, digest) in enumerate(pending):
+        program_id, title, description, current_stage, current_sector, current_hash = row
+        new_stage = predicted_stages[i] or categorize_program_stage(title, description)
+        new_sector = current_sector or predicted_sectors[i]
+        if not new_stage:
+            counts["no_match"] += 1
+            new_stage = current_stage
+        else:
+            new_stage = get_stage_display_name(new_stage)
+            if new_stage != current_stage:
+                counts["updated"] += 1
+                counts[f"→ {new_stage}"] += 1
+            else:
+                counts["unchanged"] += 1
+        if new_sector != current_sector:
+            counts["sector_filled"] += 1
+        changed = new_stage != current_stage or new_sector != current_sector
+        if changed:
+            restaged.append(program_id)
+        if changed or digest != current_hash:
+            changes.append((program_id, new_stage, new_sector, digest))
+    return changes, restaged, counts
+
+
+def write_changes(db, changes, restaged):
+    """
+    Set the stages, sectors and content hashes in one UPDATE ... FROM (VALUES ...)
+    and refresh program_search for the programs whose stage or sector changed
+    """
+    if not changes:
+        return
+    new_stages = values(
+        column("id", Integer), column("stage", String), column("sector", String), column("content_hash", String),
+        name="new_stages",
+    ).data(changes)
+    db.execute(
+        update(Program)
+        .where(Program.id == new_stages.c.id)
+        .values(
+            stage=new_stages.c.stage,
+            sector=new_stages.c.sector,
+            content_hash=new_stages.c.content_hash,
+            # Rows that only gain a hash keep their Last-Modified
+            updated_at=case(
+                (
+                    Program.stage.is_distinct_from(new_stages.c.stage)
+                    | Program.sector.is_distinct_from(new_stages.c.sector),
+                    func.now(),
+                ),
+                else_=Program.updated_at,
+            ),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    refresh_program_search(db, program_ids=restaged)
+
+
+def load_checkpoint(path):
+    with open(path, encoding="utf-8") as f:
+        checkpoint = json.load(f)
+    return checkpoint["last_id"], collections.Counter(checkpoint["counts"])
+
+
+def save_checkpoint(path, last_id, counts):
+    # Written aside and renamed, so an interrupted write never leaves a truncated file
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"last_id": last_id, "counts": counts}, f)
+    os.replace(path + ".tmp", path)
 
 
-def categorize_all_programs():
+def chunks(reader, after_id, chunk_size):
+    """Lists of (id, title, description, stage, sector, content hash) rows with id > after_id, in id order"""
+    result = reader.execute(
+        select(Program.id, Program.title, Program.description, Program.stage, Program.sector, Program.content_hash)
+        .where(Program.id > after_id)
+        .order_by(Program.id)
+        .execution_options(yield_per=chunk_size)
+    )
+    for partition in result.partitions():
+        yield [tuple(row) for row in partition]
+
+
+def categorized(executor, row_chunks, workers, force):
+    """(rows, changes, restaged, counts) per chunk, in order, with up to 2 chunks per worker in flight"""
+    if executor is None:
+        for rows in row_chunks:
+            yield (rows, *categorize_chunk(rows, force))
+        return
+    pending = collections.deque()
+    for rows in row_chunks:
+        pending.append((rows, executor.submit(categorize_chunk, rows, force)))
+        if len(pending) >= workers * 2:
+            rows, future = pending.popleft()
+            yield (rows, *future.result())
+    while pending:
+        rows, future = pending.popleft()
+        yield (rows, *future.result())
+
+
+def categorize_all_programs(chunk_size=1000, workers=None, resume=False, dry_run=False, force=False,
+                            checkpoint=DEFAULT_CHECKPOINT):
     """Update all programs with appropriate business stages"""
+    workers = workers or os.cpu_count() or 1
+    after_id, counts = 0, collections.Counter()
+    if resume and os.path.exists(checkpoint):
+        after_id, counts = load_checkpoint(checkpoint)
+        print(f"↩️  Resuming after program {after_id} ({counts['updated']} already updated)")
+    elif resume:
+        print(f"⚠️  No checkpoint at {checkpoint}, starting from the beginning")
+
+    started = time.perf_counter()
+    # Programs are read on their own connection so the writer can commit per chunk mid-stream
+    reader = SessionLocal()
     db = SessionLocal()
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    committed = False
     try:
-        programs = db.query(Program).all()
-        print(f"Found {len(programs)} programs to categorize")
-        
-        updated = 0
-        unchanged = 0
-        no_match = 0
-        
-        for program in programs:
-            # Get current stage
-            current_stage = program.stage
-            
-            # Categorize based on title and description
-            new_stage = categorize_program_stage(program.title, program.description)
-            
-            if new_stage:
-                # Normalize the stage name
-                normalized_stage = get_stage_display_name(new_stage)
-                
-                # Update if different
-                if normalized_stage != current_stage:
-                    program.stage = normalized_stage
-                    updated += 1
-                    print(f"✓ Updated '{program.title}': {current_stage or 'None'} → {normalized_stage}")
-                else:
-                    unchanged += 1
-            else:
-                no_match += 1
-                print(f"⚠ No match for '{program.title}'")
-        
-        db.commit()
-        
-        print(f"\n✅ Categorization complete:")
-        print(f"   - Updated: {updated}")
-        print(f"   - Unchanged: {unchanged}")
-        print(f"   - No match: {no_match}")
-        
+        total = reader.scalar(select(func.count()).select_from(Program).where(Program.id > after_id))
+        print(f"Found {total} programs to categorize ({workers} workers, chunks of {chunk_size})"
+              f"{' — dry run, nothing is written' if dry_run else ''}")
+
+        seen = 0
+        row_chunks = chunks(reader, after_id, chunk_size)
+        for rows, changes, restaged, chunk_counts in categorized(executor, row_chunks, workers, force):
+            counts.update(chunk_counts)
+            if not dry_run:
+                write_changes(db, changes, restaged)
+                db.commit()
+                committed = committed or bool(restaged)
+                save_checkpoint(checkpoint, rows[-1][0], counts)
+            seen += len(rows)
+            rate = seen / max(time.perf_counter() - started, 1e-9)
+            print(f"   {seen}/{total} programs ({rate:.0f}/s) — updated {counts['updated']}, "
+                  f"unchanged {counts['unchanged']}, no match {counts['no_match']}, skipped {counts['skipped']}")
+
+        if committed:
+            bump_catalog_version(db, "programs")
+        if not dry_run and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+
+        print(f"\n✅ Categorization {'dry run ' if dry_run else ''}complete in {time.perf_counter() - started:.1f}s:")
+        print(f"   - {'Would update' if dry_run else 'Updated'}: {counts['updated']}")
+        print(f"   - Unchanged: {counts['unchanged']}")
+        print(f"   - No match: {counts['no_match']}")
+        print(f"   - Sector filled in: {counts['sector_filled']}")
+        print(f"   - Skipped (text unchanged since last categorized): {counts['skipped']}")
+        for key in sorted(key for key in counts if key.startswith("→")):
+            print(f"     {key}: {counts[key]}")
+
     except Exception as e:
         db.rollback()
+        # Chunks committed before the failure are live; cached reads of them must go
+        if committed:
+            bump_catalog_version(db, "programs")
         print(f"❌ Error: {e}")
+        if not dry_run:
+            print(f"   Committed chunks are kept; rerun with --resume to continue from {checkpoint}")
         import traceback
         traceback.print_exc()
         raise
     finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+        reader.close()
         db.close()
 
 
-if __name__ == "__main__":
-    categorize_all_programs()
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Programs read, categorized and committed together")
+    parser.add_argument("--workers", type=int, default=None, help="Categorizer processes (default: CPU count, 1 = inline)")
+    parser.add_argument("--resume", action="store_true", help="Continue after the last committed chunk")
+    parser.add_argument("--dry-run", action="store_true", help="Report the stage changes without writing them")
+    parser.add_argument("--force", action="store_true", help="Recategorize programs whose text is unchanged too")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT, help="Checkpoint file path")
+    args = parser.parse_args()
 
+    categorize_all_programs(args.chunk_size, args.workers, args.resume, args.dry_run, args.force, args.checkpoint)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+Check the scraper fetch engine (scrapers/fetch_engine.py) against local
+fixture servers.
+
+Two HTTP servers on 127.0.0.1 (two hosts, as far as the engine's per-host
+limits go) serve pages with a configurable delay and record how many requests
+each had in flight, plus endpoints that fail a set number of times (503,
+429 with Retry-After, dropped connections), always fail (500) or don't exist
+(404). The checks:
+  - the global and per-host concurrency limits hold, and are reached,
+  - the per-host token bucket spaces requests at the configured rate,
+  - retryable failures are retried with backoff (Retry-After honoured),
+    404s are not retried and persistent 500s give up after the retries,
+  - a requests-style session backend (the way cloudscraper plugs in) runs
+    under the same limits,
+  - concurrent fetching beats the old serial loop.
+No network access is needed.
+
+Usage:
+    python scripts/check_fetch_engine.py [--pages 40] [--delay 0.1]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import requests
+
+from checks import Checks
+from scrapers.fetch_engine import FetchEngine, SessionBackend
+
+
+class FixtureState:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = Counter()
+        self.max_in_flight = Counter()
+        self.total_in_flight = 0
+        self.max_total_in_flight = 0
+        self.hits = Counter()
+        self.started = defaultdict(list)
+
+    def enter(self, port, path):
+        with self.lock:
+            self.in_flight[port] += 1
+            self.total_in_flight += 1
+            self.max_in_flight[port] = max(self.max_in_flight[port], self.in_flight[port])
+            self.max_total_in_flight = max(self.max_total_in_flight, self.total_in_flight)
+            self.hits[path] += 1
+            self.started[port].append(time.monotonic())
+            return self.hits[path]
+
+    def leave(self, port):
+        with self.lock:
+            self.in_flight[port] -= 1
+            self.total_in_flight -= 1
+
+    def reset(self):
+        with self.lock:
+            self.max_in_flight.clear()
+            self.max_total_in_flight = 0
+            self.started.clear()
+
+
+def handler_for(state):
+    class FixtureHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def send(self, status, body=b"", headers=None):
+            self.send_response(status)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            port = self.server.server_address[1]
+            url = urlsplit(self.path)
+            query = parse_qs(url.query)
+            hit = state.enter(port, url.path)
+            try:
+                time.sleep(float(query.get("delay", ["0"])[0]))
+                failures = int(query.get("failures", ["0"])[0])
+                kind = url.path.split("/")[1]
+                if kind == "page":
+                    self.send(200, f"<html><h1>Page {url.path}</h1></html>".encode())
+                elif kind == "flaky":
+                    self.send(503 if hit <= failures else 200, b"flaky")
+                elif kind == "limited":
+                    if hit <= failures:
+                        self.send(429, b"slow down", {"Retry-After": "1"})
+                    else:
+                        self.send(200, b"ok")
+                elif kind == "drop":
+                    if hit <= failures:
+                        self.close_connection = True
+                        self.connection.shutdown(2)
+                    else:
+                        self.send(200, b"ok")
+                elif kind == "broken":
+                    self.send(500, b"broken")
+                else:
+                    self.send(404, b"not found")
+            finally:
+                state.leave(port)
+
+    return FixtureHandler
+
+
+def start_servers(state, count=2):
+    servers = []
+    for _ in range(count):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler_for(state))
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+    return servers
+
+
+async def fetch(urls, **options):
+    async with FetchEngine(**options) as engine:
+        started = time.perf_counter()
+        results = await engine.fetch_all(urls)
+        return results, time.perf_counter() - started, engine
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=40, help="Pages per concurrency check")
+    parser.add_argument("--delay", type=float, default=0.1, help="Seconds each fixture page takes")
+    args = parser.parse_args()
+
+    state = FixtureState()
+    servers = start_servers(state)
+    bases = [f"http://127.0.0.1:{server.server_address[1]}" for server in servers]
+    ports = [server.server_address[1] for server in servers]
+    check = Checks()
+
+    # Concurrency limits
+    urls = [f"{bases[i % 2]}/page/{i}?delay={args.delay}" for i in range(args.pages)]
+    results, elapsed, engine = asyncio.run(fetch(urls, concurrency=6, per_host_concurrency=4, rate_per_host=0))
+    check(all(r.ok for r in results) and [r.url for r in results] == urls,
+          f"{args.pages} pages fetched, results in request order ({elapsed:.2f}s)")
+    check(state.max_total_in_flight == 6, f"global limit 6 held and reached (max {state.max_total_in_flight})")
+    check(max(state.max_in_flight[p] for p in ports) <= 4,
+          f"per-host limit 4 held (max {dict(state.max_in_flight)})")
+
+    state.reset()
+    urls = [f"{bases[0]}/page/solo-{i}?delay={args.delay}" for i in range(12)]
+    asyncio.run(fetch(urls, concurrency=8, per_host_concurrency=2, rate_per_host=0))
+    check(state.max_in_flight[ports[0]] == 2, f"one host gets at most 2 at once (max {state.max_in_flight[ports[0]]})")
+
+    # Politeness rate
+    state.reset()
+    rate, burst, count = 20.0, 2, 12
+    urls = [f"{bases[0]}/page/rate-{i}" for i in range(count)]
+    _, elapsed, engine = asyncio.run(fetch(urls, concurrency=8, per_host_concurrency=8, rate_per_host=rate, burst=burst))
+    starts = state.started[ports[0]]
+    expected = (count - burst) / rate
+    check(elapsed >= expected * 0.95,
+          f"{count} requests at {rate:.0f}/s with burst {burst} took {elapsed:.2f}s (at least {expected:.2f}s)")
+    span = starts[-1] - starts[burst - 1]
+    check(span >= (count - burst) / rate * 0.9,
+          f"server saw them spread over {span:.2f}s after the burst, {engine.rate_wait:.1f}s waited in total")
+
+    # Retries
+    options = dict(concurrency=4, per_host_concurrency=4, rate_per_host=0, retries=3, backoff=0.05)
+    urls = [f"{bases[1]}/flaky/a?failures=2", f"{bases[1]}/limited/a?failures=1", f"{bases[1]}/drop/a?failures=1",
+            f"{bases[1]}/missing", f"{bases[1]}/broken"]
+    (flaky, limited, dropped, missing, broken), _, engine = asyncio.run(fetch(urls, **options))
+    check(flaky.ok and flaky.attempts == 3, f"503 twice then 200: ok after {flaky.attempts} attempts")
+    check(limited.ok and limited.attempts == 2 and limited.elapsed >= 1.0,
+          f"429 with Retry-After: 1: ok after {limited.attempts} attempts, {limited.elapsed:.2f}s")
+    check(dropped.ok and dropped.attempts == 2, f"dropped connection: ok after {dropped.attempts} attempts")
+    check(missing.status == 404 and missing.attempts == 1, f"404 not retried ({missing.attempts} attempt)")
+    check(not broken.ok and broken.status == 500 and broken.attempts == 4,
+          f"persistent 500 gives up after {broken.attempts} attempts")
+    print(f"   {engine.summary()}")
+
+    # Session backend (how cloudscraper plugs in)
+    state.reset()
+    urls = [f"{bases[i % 2]}/page/session-{i}?delay={args.delay}" for i in range(16)]
+    results, elapsed, _ = asyncio.run(fetch(
+        urls, concurrency=4, per_host_concurrency=2, rate_per_host=0, backend=SessionBackend(requests.Session)
+    ))
+    check(all(r.ok and "Page" in r.text for r in results),
+          f"session backend fetched {len(urls)} pages in {elapsed:.2f}s")
+    check(max(state.max_in_flight[p] for p in ports) <= 2 and state.max_total_in_flight <= 4,
+          f"session backend held the limits (max per host {max(state.max_in_flight[p] for p in ports)}, "
+          f"total {state.max_total_in_flight})")
+
+    # Against the old serial loop (without its sleep)
+    urls = [f"{bases[i % 2]}/page/serial-{i}?delay={args.delay}" for i in range(16)]
+    session = requests.Session()
+    started = time.perf_counter()
+    for url in urls:
+        session.get(url, timeout=15).raise_for_status()
+    serial = time.perf_counter() - started
+    _, concurrent, _ = asyncio.run(fetch(urls, concurrency=8, per_host_concurrency=4, rate_per_host=0))
+    check(concurrent < serial, f"{len(urls)} pages: serial {serial:.2f}s, engine {concurrent:.2f}s "
+                               f"({serial / concurrent:.1f}x)")
+
+    for server in servers:
+        server.shutdown()
+    check.finish("fetch engine checks passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Check the scrapers' on-disk HTTP cache (scrapers/http_cache.py) with the
+fetch engine, against a local fixture server.
+
+The server has pages with an ETag, with only Last-Modified, with no
+validators at all, one whose content changes between runs, and two URLs
+serving identical content. The same URLs are fetched and parsed twice into a
+temporary cache directory, the way a scraper runs on consecutive days. The
+checks:
+  - the first run downloads and parses everything,
+  - the second run gets 304s for pages with validators, answered from the
+    cache, and counts their sizes as bytes not downloaded,
+  - unchanged pages (304, or re-downloaded with the same body) aren't
+    parsed again, while the changed page is,
+  - identical bodies are stored once, gzip-compressed.
+No network access is needed.
+
+Usage:
+    python scripts/check_http_cache.py [--size 20000]
+"""
+import argparse
+import asyncio
+import gzip
+import os
+import sys
+import tempfile
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from checks import Checks
+from scrapers.fetch_engine import FetchEngine
+from scrapers.http_cache import HTTPCache, parse_once
+
+LAST_MODIFIED = "Mon, 05 Oct 2026 08:00:00 GMT"
+
+
+def handler_for(pages, requests):
+    class FixtureHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            body = pages.get(self.path)
+            if body is None:
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            etag = f'"{hash(body) & 0xffffffff:x}"'
+            headers = {}
+            if self.path.startswith("/etag") or self.path.startswith("/changing") or self.path.startswith("/copy"):
+                headers["ETag"] = etag
+            if self.path.startswith("/modified"):
+                headers["Last-Modified"] = LAST_MODIFIED
+            not_modified = (
+                ("ETag" in headers and self.headers.get("If-None-Match") == etag)
+                or ("Last-Modified" in headers and self.headers.get("If-Modified-Since") == LAST_MODIFIED)
+            )
+            requests.append((self.path, 304 if not_modified else 200))
+            self.send_response(304 if not_modified else 200)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            if not_modified:
+                self.end_headers()
+                return
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return FixtureHandler
+
+
+def page(name, size, version=1):
+    text = f"<html><h1>{name}</h1><p>version {version}</p>" + "<p>Funding for local startups.</p>" * (size // 32)
+    return (text + "</html>").encode()
+
+
+async def fetch(urls, cache):
+    async with FetchEngine(concurrency=4, per_host_concurrency=4, rate_per_host=0, cache=cache) as engine:
+        return await engine.fetch_all(urls)
+
+
+def scrape(urls, cache, parser_calls):
+    """Fetch and 'parse' every URL, as a scraper would"""
+    def parse(result):
+        parser_calls[result.url] += 1
+        return {"url": result.url, "title": result.text.split("<h1>")[1].split("</h1>")[0]}
+
+    results = asyncio.run(fetch(urls, cache))
+    return results, [parse_once(cache, result, "check-v1", lambda: parse(result)) for result in results]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=20000, help="Approximate bytes per fixture page")
+    args = parser.parse_args()
+
+    pages = {
+        "/etag": page("etag", args.size),
+        "/modified": page("modified", args.size),
+        "/plain": page("plain", args.size),
+        "/changing": page("changing", args.size),
+        "/copy-a": page("copy", args.size),
+        "/copy-b": page("copy", args.size),
+    }
+    requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler_for(pages, requests))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    urls = [base + path for path in pages]
+    check = Checks()
+
+    with tempfile.TemporaryDirectory() as directory:
+        # First run: an empty cache
+        cache = HTTPCache(directory)
+        parser_calls = Counter()
+        results, parsed = scrape(urls, cache, parser_calls)
+        check(all(r.ok and not r.unchanged for r in results) and cache.stats["new"] == len(urls),
+              f"first run: {cache.stats['new']} new pages downloaded")
+        check(sum(parser_calls.values()) == len(urls) and parsed[0]["title"] == "etag",
+              f"first run: {sum(parser_calls.values())} pages parsed")
+        bodies = [os.path.join(root, name) for root, _, names in os.walk(os.path.join(directory, "bodies"))
+                  for name in names]
+        stored = sum(os.path.getsize(path) for path in bodies)
+        check(len(bodies) == len(urls) - 1 and cache.stats["bodies_written"] == len(urls) - 1,
+              f"{len(urls)} pages stored as {len(bodies)} bodies (identical content once)")
+        check(all(gzip.open(path).read(2) == b"<h" for path in bodies)
+              and stored < sum(len(body) for body in pages.values()) / 4,
+              f"bodies gzip-compressed: {stored:,} bytes on disk for "
+              f"{sum(len(body) for body in pages.values()):,} downloaded")
+        print(f"   💾 {cache.summary()}")
+
+        # Second run: a fresh process against the same directory, one page changed
+        pages["/changing"] = page("changing", args.size, version=2)
+        del requests[:]
+        cache = HTTPCache(directory)
+        parser_calls = Counter()
+        results, parsed = scrape(urls, cache, parser_calls)
+        by_path = {r.url[len(base):]: r for r in results}
+        not_modified = [path for path, status in requests if status == 304]
+        check(sorted(not_modified) == ["/copy-a", "/copy-b", "/etag", "/modified"]
+              and cache.stats["not_modified"] == 4,
+              f"second run: 304 for {', '.join(sorted(not_modified))} (ETag and Last-Modified sent)")
+        saved = sum(len(pages[path]) for path in not_modified)
+        check(cache.stats["bytes_saved"] == saved, f"{cache.stats['bytes_saved']:,} bytes not downloaded")
+        check(all(by_path[path].ok and by_path[path].from_cache and by_path[path].content == pages[path]
+                  for path in not_modified),
+              "304s answered with the cached body")
+        check(by_path["/plain"].unchanged and not by_path["/plain"].from_cache and parser_calls[base + "/plain"] == 0,
+              "page without validators: re-downloaded, same body, not reparsed")
+        changed = base + "/changing"
+        check(not by_path["/changing"].unchanged and parser_calls[changed] == 1 and cache.stats["changed"] == 1,
+              "changed page reparsed")
+        check(cache.stats["reparsed"] == 1 and cache.stats["parse_skipped"] == len(urls) - 1
+              and [p["title"] for p in parsed] == ["etag", "modified", "plain", "changing", "copy", "copy"],
+              f"{cache.stats['parse_skipped']} parses skipped, stored extractions returned in order")
+        print(f"   💾 {cache.summary()}")
+
+        # A third run revalidates the changed page against its new ETag
+        del requests[:]
+        cache = HTTPCache(directory)
+        scrape(urls, cache, Counter())
+        check(dict(requests)["/changing"] == 304 and cache.stats["reparsed"] == 0,
+              "third run: the changed page's new ETag revalidates, nothing reparsed")
+
+    server.shutdown()
+    check.finish("HTTP cache checks passed")
+
+
+if __name__ == "__main__":
+    main()
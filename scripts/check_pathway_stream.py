@@ -0,0 +1,145 @@
+"""
+Exercise POST /api/pathways/query/stream against a local fake model.
+
+Starts the API in-process on a free port with Gemini replaced by a fake model
+that emits chunks after controlled delays, then checks that:
+  - the first SSE bytes arrive well before the model's first chunk,
+  - chunks arrive as the model produces them (not all at the end),
+  - a client disconnect stops generation instead of draining the model.
+
+Needs a configured database (DATABASE_URL) with at least one active program,
+but no Gemini API key.
+
+Usage:
+    python scripts/check_pathway_stream.py [--chunks 8] [--delay 0.25] [--first-delay 1.0]
+"""
+import argparse
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import httpx
+import uvicorn
+
+from app.main import app
+from app.services import gemini_service
+
+STREAM_PATH = "/api/pathways/query/stream"
+
+
+class FakeStreamingModel:
+    """Stands in for genai.GenerativeModel, emitting chunks after fixed delays"""
+
+    def __init__(self, chunks: int, delay: float, first_delay: float):
+        self.chunks = chunks
+        self.delay = delay
+        self.first_delay = first_delay
+        self.emitted = 0
+        self.closed = threading.Event()
+
+    def generate_content(self, prompt, stream=False):
+        if not stream:
+            return SimpleNamespace(text="".join(f"part {i} " for i in range(self.chunks)))
+        return self._stream()
+
+    def _stream(self):
+        try:
+            for i in range(self.chunks):
+                time.sleep(self.first_delay if i == 0 else self.delay)
+                self.emitted += 1
+                yield SimpleNamespace(text=f"part {i} ")
+        finally:
+            self.closed.set()
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def read_events(response):
+    """Yield (seconds since request, event, data) for each SSE event"""
+    started = time.perf_counter()
+    event = None
+    for line in response.iter_lines():
+        if line.startswith("event: "):
+            event = line[len("event: "):]
+        elif line.startswith("data: "):
+            yield time.perf_counter() - started, event, json.loads(line[len("data: "):])
+
+
+def check_streaming(client, model, responses):
+    arrivals = []
+    with client.stream("POST", STREAM_PATH, json={"responses": responses}) as response:
+        response.raise_for_status()
+        for elapsed, event, data in read_events(response):
+            arrivals.append((elapsed, event))
+            print(f"   {elapsed * 1000:8.1f} ms  {event:<6} {json.dumps(data)[:60]}")
+    first_byte = arrivals[0][0]
+    chunk_times = [t for t, event in arrivals if event == "chunk"]
+    expected = model.first_delay + model.delay * (model.chunks - 1)
+    print(f"⏱️  first event after {first_byte * 1000:.1f} ms (model's first chunk at {model.first_delay * 1000:.0f} ms)")
+    print(f"⏱️  {len(chunk_times)} chunks spread over {chunk_times[0] * 1000:.0f}-{chunk_times[-1] * 1000:.0f} ms "
+          f"(model finishes at {expected * 1000:.0f} ms)")
+    return first_byte < model.first_delay / 2 and chunk_times[-1] - chunk_times[0] >= expected - model.first_delay - 0.1
+
+
+def check_disconnect(client, model, responses, keep_chunks=2):
+    with client.stream("POST", STREAM_PATH, json={"responses": responses}) as response:
+        received = 0
+        for _, event, _ in read_events(response):
+            if event == "chunk":
+                received += 1
+                if received == keep_chunks:
+                    break
+    stopped = model.closed.wait(timeout=model.delay * 4 + 1)
+    print(f"🔌 disconnected after {keep_chunks} chunks; model emitted {model.emitted}/{model.chunks} "
+          f"and was {'closed' if stopped else 'NOT closed'}")
+    return stopped and model.emitted < model.chunks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=8)
+    parser.add_argument("--delay", type=float, default=0.25, help="Seconds between chunks")
+    parser.add_argument("--first-delay", type=float, default=1.0, help="Seconds before the first chunk")
+    args = parser.parse_args()
+
+    gemini_service.GEMINI_API_KEY = gemini_service.GEMINI_API_KEY or "fake-key"
+    server = start_server(free_port())
+    base_url = f"http://127.0.0.1:{server.config.port}"
+    # Unique answers per run so neither check is served from the recommendation cache
+    run = str(time.time_ns())
+    results = {}
+    try:
+        with httpx.Client(base_url=base_url, timeout=30) as client:
+            for name, check in [("streaming", check_streaming), ("disconnect", check_disconnect)]:
+                model = FakeStreamingModel(args.chunks, args.delay, args.first_delay)
+                gemini_service.create_model = lambda: model
+                print(f"📡 Checking {name}...")
+                results[name] = check(client, model, {"_check": f"{run}-{name}"})
+    finally:
+        server.should_exit = True
+
+    for name, ok in results.items():
+        print(f"{'✅' if ok else '❌'} {name}")
+    sys.exit(0 if all(results.values()) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Count the SQL statements GET /api/programs/ and GET /api/programs/{id} run.
+
+Creates a throwaway organization with --small and then --large programs
+(directly in the database, with their program_search rows), and requests
+the organization's listing and one program's detail in-process with the
+response cache cleared, so each request builds its response. Statements
+are counted with a before_cursor_execute listener on the API's engine.
+
+Besides the validators (the catalog_versions poll and the list ETag's table
+fingerprint), the listing and the detail must each load their programs and
+organizations in exactly one SELECT, whatever the number of programs. The
+rows are deleted afterwards.
+
+Needs a configured database (DATABASE_URL) migrated to the latest revision.
+
+Usage:
+    python scripts/check_program_queries.py [--small 3] [--large 40]
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import httpx
+from sqlalchemy import event
+
+from app.database import SessionLocal, async_engine
+from app.main import app
+from app.models import Organization, Program
+from app.services.cache import catalog_cache
+from app.services.program_search import refresh_program_search
+from checks import Checks
+
+# Statements the caching and ETag layers run in front of the data query
+VALIDATOR_MARKERS = ("catalog_versions", "SELECT (SELECT count(*)")
+
+
+def create_programs(org_id, count):
+    db = SessionLocal()
+    try:
+        programs = [
+            Program(title=f"check_program_queries {i}", description="Statement count fixture",
+                    organization_id=org_id, program_type="workshop")
+            for i in range(count)
+        ]
+        db.add_all(programs)
+        db.flush()
+        refresh_program_search(db, [p.id for p in programs])
+        db.commit()
+        return [p.id for p in programs]
+    finally:
+        db.close()
+
+
+def create_organization():
+    db = SessionLocal()
+    try:
+        org = Organization(organization_name="check_program_queries organization")
+        db.add(org)
+        db.commit()
+        return org.id
+    finally:
+        db.close()
+
+
+def delete_rows(org_id):
+    db = SessionLocal()
+    try:
+        db.query(Program).filter(Program.organization_id == org_id).delete()
+        db.query(Organization).filter(Organization.id == org_id).delete()
+        db.commit()
+    finally:
+        db.close()
+
+
+async def count_selects(path, statements):
+    """(data SELECTs, validator SELECTs, response) for one uncached GET"""
+    catalog_cache.clear()
+    del statements[:]
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://check") as client:
+        response = await client.get(path)
+    response.raise_for_status()
+    selects = [s for s in statements if s.lstrip().upper().startswith("SELECT")]
+    validators = [s for s in selects if any(marker in s for marker in VALIDATOR_MARKERS)]
+    return len(selects) - len(validators), len(validators), response
+
+
+async def run_checks(org_id, sizes, statements, check):
+    """
+    Every request in one event loop: the API's async engine pools connections
+    bound to the loop that opened them
+    """
+    try:
+        program_ids = []
+        for count in sizes:
+            program_ids += create_programs(org_id, count - len(program_ids))
+
+            data, validators, response = await count_selects(
+                f"/api/programs/?organization_id={org_id}", statements
+            )
+            listed = response.json()
+            check(data == 1 and len(listed) == count
+                  and all(p["organization_name"] == "check_program_queries organization" for p in listed),
+                  f"list of {count} programs: {data} SELECT (plus {validators} validator)")
+
+            data, validators, response = await count_selects(f"/api/programs/{program_ids[-1]}", statements)
+            check(data == 1 and response.json()["organization_name"] == "check_program_queries organization",
+                  f"detail with {count} programs in the table: {data} SELECT (plus {validators} validator)")
+    finally:
+        await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--small", type=int, default=3, help="Programs in the first round")
+    parser.add_argument("--large", type=int, default=40, help="Programs in the second round")
+    args = parser.parse_args()
+
+    statements = []
+
+    @event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    check = Checks()
+
+    org_id = create_organization()
+    try:
+        asyncio.run(run_checks(org_id, (args.small, args.large), statements, check))
+    finally:
+        delete_rows(org_id)
+
+    check.finish("program query checks passed")
+
+
+if __name__ == "__main__":
+    main()
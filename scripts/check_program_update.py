@@ -0,0 +1,129 @@
+"""
+Check that PUT /api/programs/{id} keeps a program's categories unless the
+update changes its text.
+
+Creates a throwaway organization and program directly in the database, with
+a curated stage, sector and program type the keyword rules wouldn't give and
+content_hash NULL (as on rows written before it existed), then calls the API
+in-process:
+  - a PUT of only is_active leaves stage, sector, program_type and
+    content_hash as they were,
+  - a PUT that sets the stage along with new text keeps that stage and
+    records the new text's hash,
+  - a PUT of a new description recategorizes, recording its hash.
+The rows are deleted afterwards.
+
+Needs a configured database (DATABASE_URL) migrated to the latest revision.
+
+Usage:
+    python scripts/check_program_update.py
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import httpx
+
+from app.database import SessionLocal, async_engine
+from app.main import app
+from app.models import Organization, Program
+from app.utils.program_categorizer import content_hash
+from checks import Checks
+
+CURATED = {"stage": "Curated Stage", "sector": "Curated Sector", "program_type": "curated type"}
+
+
+def create_program():
+    db = SessionLocal()
+    try:
+        org = Organization(organization_name="check_program_update organization")
+        db.add(org)
+        db.flush()
+        program = Program(
+            title="Seed funding for idea-stage founders",
+            description="Pre-revenue startups validating an idea get mentorship and a first customer.",
+            organization_id=org.id,
+            content_hash=None,
+            **CURATED,
+        )
+        db.add(program)
+        db.commit()
+        return org.id, program.id
+    finally:
+        db.close()
+
+
+def load_program(program_id):
+    db = SessionLocal()
+    try:
+        return db.get(Program, program_id)
+    finally:
+        db.close()
+
+
+def delete_rows(org_id, program_id):
+    db = SessionLocal()
+    try:
+        db.query(Program).filter(Program.id == program_id).delete()
+        db.query(Organization).filter(Organization.id == org_id).delete()
+        db.commit()
+    finally:
+        db.close()
+
+
+async def put(program_id, body):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://check") as client:
+        response = await client.put(f"/api/programs/{program_id}", json=body)
+        response.raise_for_status()
+        return response.json()
+
+
+async def run_checks(program_id, check):
+    """
+    Every request in one event loop: the API's async engine pools connections
+    bound to the loop that opened them
+    """
+    try:
+        response = await put(program_id, {"is_active": False})
+        program = load_program(program_id)
+        check(not program.is_active and all(getattr(program, f) == v for f, v in CURATED.items())
+              and program.content_hash is None and response["stage"] == CURATED["stage"],
+              f"is_active-only PUT kept the curated categories ({program.stage}, {program.sector}, "
+              f"{program.program_type})")
+
+        title = "Scale-up program for growth-stage companies"
+        await put(program_id, {"title": title, "stage": "Chosen Stage"})
+        program = load_program(program_id)
+        check(program.stage == "Chosen Stage" and program.content_hash == content_hash(title, program.description),
+              "PUT setting the stage with new text kept that stage and recorded the text's hash")
+
+        description = "Companies past $1M in revenue expand into new markets with export support."
+        await put(program_id, {"description": description})
+        program = load_program(program_id)
+        check(program.content_hash == content_hash(title, description),
+              f"PUT of a new description recategorized (stage now {program.stage})")
+    finally:
+        await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.parse_args()
+
+    check = Checks()
+
+    org_id, program_id = create_program()
+    try:
+        asyncio.run(run_checks(program_id, check))
+    finally:
+        delete_rows(org_id, program_id)
+
+    check.finish("program update checks passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Compare the compact prompt format against the verbose one and check budgets.
+
+Builds synthetic catalogs from the scraped program corpus (as
+benchmark_pathway_retrieval.py does) and, for each size, checks that:
+  - the compact prompt is smaller than the verbose one, for the full catalog
+    and for the recommender's top-K candidates,
+  - a prompt compiled under each token budget fits it (or is down to a
+    single program), keeping a prefix of the ranked candidates.
+No database or API key is needed.
+
+Usage:
+    python scripts/check_prompt_budget.py [--sizes 100 1000 10000] [--top-k 25]
+        [--budgets 2000 4000 8000 32000]
+"""
+import argparse
+import datetime
+import os
+import random
+import re
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.services import gemini_service
+from app.services.metrics import ai_metrics, estimate_tokens
+from app.services.recommender import ProgramRecommender
+from benchmark_pathway_retrieval import ANSWERS, load_corpus, synthetic_catalog
+from checks import Checks
+
+# Program rows of the compact format, or blocks of the verbose one
+PROGRAM_ID = re.compile(r"^(?:Program ID: )?(\d+)(?: \| |\n)", re.MULTILINE)
+
+
+def synthetic_events(count, rng):
+    return [
+        SimpleNamespace(id=i, title=f"Event {i}", description="Networking and pitch night for local founders.",
+                        category=rng.choice(["Networking", "Workshop", "Pitch"]), audience="Founders",
+                        location="Windsor", start_date=datetime.date(2025, 1, 1 + i % 28), end_date=None,
+                        link=f"https://events.example.com/{i}")
+        for i in range(1, count + 1)
+    ]
+
+
+def build(answered, compiled, program_ids, prompt_format, budget):
+    gemini_service.PROMPT_FORMAT = prompt_format
+    gemini_service.PROMPT_TOKEN_BUDGET = budget
+    return gemini_service.build_prompt(answered, compiled, program_ids)
+
+
+def reduction_counts():
+    return dict(ai_metrics.snapshot()["counters"].get("prompt_reductions", {}))
+
+
+def programs_section(prompt):
+    return prompt.split("=== PROGRAMS ===", 1)[1].split("=== EVENTS ===", 1)[0].split("=== INSTRUCTIONS ===", 1)[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--top-k", type=int, default=25)
+    parser.add_argument("--budgets", type=int, nargs="+", default=[2000, 4000, 8000, 32000])
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    corpus = load_corpus()
+    check = Checks(quiet=True)
+    print(f"{'programs':>9} {'prompt':>7} {'verbose tokens':>15} {'compact tokens':>15} {'ratio':>6}")
+    fitted = []
+    for size in args.sizes:
+        pathways, organizations, programs = synthetic_catalog(corpus, size, rng)
+        compiled = gemini_service.compile_prompt(
+            pathways, organizations, synthetic_events(20, rng), programs, compact=True
+        )
+        recommender = ProgramRecommender(pathways, programs)
+        answered = recommender.answers(
+            {str(pid): rng.choice(list(options)) for pid, options in enumerate(ANSWERS, start=1)}
+        )
+        ranked = [program_id for program_id, _ in recommender.rank(answered, args.top_k)]
+
+        for label, program_ids in [("full", None), (f"top-{args.top_k}", ranked)]:
+            verbose = estimate_tokens(len(build(answered, compiled, program_ids, "verbose", 0)))
+            compact = estimate_tokens(len(build(answered, compiled, program_ids, "compact", 0)))
+            print(f"{size:>9} {label:>7} {verbose:>15,} {compact:>15,} {verbose / compact:>5.1f}x")
+            check(compact < verbose, f"{size} programs, {label}: compact prompt is not smaller")
+
+        for budget in args.budgets:
+            before = reduction_counts()
+            prompt = build(answered, compiled, ranked, "verbose", budget)
+            tokens = estimate_tokens(len(prompt))
+            kept = [int(pid) for pid in PROGRAM_ID.findall(programs_section(prompt))]
+            after = reduction_counts()
+            reductions = [name for name in after if after[name] > before.get(name, 0)]
+            fitted.append((size, budget, tokens, len(kept), reductions))
+            check(tokens <= budget or len(kept) <= 1, f"{size} programs, budget {budget}: {tokens} tokens")
+            check(not reductions or kept == ranked[:len(kept)],
+                  f"{size} programs, budget {budget}: kept programs aren't the top ranked")
+
+    print()
+    print(f"{'programs':>9} {'budget':>7} {'tokens':>7} {'programs kept':>14}  reductions")
+    for size, budget, tokens, kept, reductions in fitted:
+        print(f"{size:>9} {budget:>7,} {tokens:>7,} {kept:>14}  {', '.join(reductions) or '-'}")
+
+    check.finish("compact prompts are smaller and every budget was met")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""
+Pass/fail bookkeeping shared by the scripts/check_*.py scripts.
+
+    check = Checks()
+    check(elapsed < limit, f"took {elapsed:.2f}s")
+    ...
+    check.finish("fetch engine checks passed")
+
+Each check prints ✅ or ❌ with its message as it runs (with quiet=True only
+the failures are printed, by finish()). finish() exits non-zero if any
+check failed.
+"""
+import sys
+
+
+class Checks:
+    def __init__(self, quiet: bool = False):
+        self.quiet = quiet
+        self.failures = []
+
+    def __call__(self, condition, message: str) -> bool:
+        if not self.quiet:
+            print(f"{'✅' if condition else '❌'} {message}")
+        if not condition:
+            self.failures.append(message)
+        return bool(condition)
+
+    def finish(self, passed: str) -> None:
+        """Print the outcome and exit, with status 1 if any check failed"""
+        print()
+        if self.quiet:
+            for failure in self.failures:
+                print(f"❌ {failure}")
+        if self.failures:
+            print(f"❌ {len(self.failures)} check(s) failed")
+            sys.exit(1)
+        print(f"✅ {passed}")
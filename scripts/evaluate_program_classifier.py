@@ -0,0 +1,157 @@
+"""
+Cross-validate the program classifier and measure its batch throughput.
+
+Programs are split into --folds folds; each fold is predicted by a classifier
+trained on the others. For stage, sector and program_type the report gives
+the accuracy of the most common label (the baseline), of the classifier's top
+prediction, and of its predictions at CLASSIFIER_MIN_CONFIDENCE together with
+the share of programs they cover. For stage it also gives the keyword rules
+alone and the classifier with the rules as the fallback, which is what
+categorize_program uses. Accuracy counts only programs labelled for that field.
+
+Throughput is the time to vectorize and predict every trained field for
+--throughput-programs programs in one batch, against the keyword rules.
+
+Labels come from the database. With --corpus the scraped program files in
+the repo are used instead (program_type as scraped, stage from the keyword
+rules), which needs no database but is only a smoke test.
+
+Usage:
+    python scripts/evaluate_program_classifier.py [--folds 5] [--corpus]
+        [--throughput-programs 10000] [--seed 42]
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import sys
+import time
+from collections import Counter
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.services.program_classifier import CLASSIFIER_FIELDS, CLASSIFIER_MIN_CONFIDENCE, ProgramClassifier
+from app.utils.program_categorizer import categorize_program_stage, get_stage_display_name
+from train_program_classifier import label_counts, load_labelled_programs
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+
+
+def load_corpus_programs():
+    """Scraped programs with their scraped program_type and the keyword rules' stage"""
+    programs = []
+    paths = glob.glob(os.path.join(ROOT, "scrapers", "*_programs.json"))
+    paths += glob.glob(os.path.join(ROOT, "cleaned_programs_*.json"))
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for record in json.load(f):
+                title = record.get("program_title") or record.get("program_name")
+                description = (record.get("program_description") or record.get("program_full_description")
+                               or record.get("description") or "")
+                if title:
+                    programs.append(SimpleNamespace(
+                        title=title, description=description, sector=None,
+                        program_type=record.get("program_type"),
+                        stage=categorize_program_stage(title, description),
+                    ))
+    return programs
+
+
+def cross_validate(programs, folds, rng):
+    """Per field, (gold, top prediction, confident prediction, rules) for every labelled program"""
+    order = list(range(len(programs)))
+    rng.shuffle(order)
+    results = {field: [] for field in CLASSIFIER_FIELDS}
+    for fold in range(folds):
+        test = [programs[i] for i in order[fold::folds]]
+        train = [programs[i] for position, i in enumerate(order) if position % folds != fold]
+        classifier = ProgramClassifier.train(train)
+        rows = classifier.vectorize([(p.title, p.description) for p in test])
+        for field, normalize in CLASSIFIER_FIELDS.items():
+            model = classifier.models.get(field)
+            top, confidence = model.predict(rows) if model else ([None] * len(test), [0.0] * len(test))
+            for p, predicted, probability in zip(test, top, confidence):
+                gold = normalize(getattr(p, field))
+                if not gold:
+                    continue
+                rules = get_stage_display_name(categorize_program_stage(p.title, p.description)) if field == "stage" else None
+                confident = predicted if probability >= CLASSIFIER_MIN_CONFIDENCE else None
+                results[field].append((gold, predicted, confident, rules))
+    return results
+
+
+def accuracy(pairs):
+    pairs = list(pairs)
+    return sum(gold == predicted for gold, predicted in pairs) / len(pairs) if pairs else float("nan")
+
+
+def report_accuracy(results):
+    print(f"{'field':<13} {'labelled':>9} {'labels':>7} {'baseline':>9} {'top':>7} "
+          f"{'confident':>10} {'coverage':>9} {'rules':>7} {'+rules':>7}")
+    for field, rows in results.items():
+        if not rows:
+            print(f"{field:<13} {0:>9} {'-':>7}")
+            continue
+        majority = Counter(gold for gold, *_ in rows).most_common(1)[0][0]
+        confident = [(gold, c) for gold, _, c, _ in rows if c]
+        line = (f"{field:<13} {len(rows):>9} {len({gold for gold, *_ in rows}):>7} "
+                f"{accuracy((gold, majority) for gold, *_ in rows):>9.1%} "
+                f"{accuracy((gold, top) for gold, top, _, _ in rows):>7.1%} "
+                f"{accuracy(confident):>10.1%} {len(confident) / len(rows):>9.1%}")
+        if field == "stage":
+            line += (f" {accuracy((gold, rules) for gold, _, _, rules in rows):>7.1%}"
+                     f" {accuracy((gold, c or rules) for gold, _, c, rules in rows):>7.1%}")
+        print(line)
+
+
+def report_throughput(programs, count, rng):
+    classifier = ProgramClassifier.train(programs)
+    texts = [(p.title, p.description) for p in rng.choices(programs, k=count)]
+
+    started = time.perf_counter()
+    rows = classifier.vectorize(texts)
+    vectorized = time.perf_counter() - started
+    predictions = {field: model.predict(rows)[0] for field, model in classifier.models.items()}
+    predicted = time.perf_counter() - started
+    assert all(len(labels) == count for labels in predictions.values())
+
+    started = time.perf_counter()
+    for title, description in texts:
+        categorize_program_stage(title, description)
+    rules = time.perf_counter() - started
+
+    print(f"{'classifier':<22} {count / predicted:>10,.0f} programs/s  "
+          f"({vectorized / predicted:.0%} of it vectorizing, {len(classifier.models)} fields)")
+    print(f"{'keyword rules (stage)':<22} {count / rules:>10,.0f} programs/s")
+    return count / predicted
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--corpus", action="store_true", help="Use the scraped program files instead of the database")
+    parser.add_argument("--throughput-programs", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    programs = load_corpus_programs() if args.corpus else load_labelled_programs()
+    counts = label_counts(programs)
+    print(f"📚 {len(programs)} programs ({'scraped corpus' if args.corpus else 'database'}), "
+          + ", ".join(f"{field} labelled on {sum(c.values())}" for field, c in counts.items()))
+    if len(programs) < args.folds:
+        print(f"❌ Need at least {args.folds} programs to cross-validate")
+        sys.exit(1)
+
+    print()
+    report_accuracy(cross_validate(programs, args.folds, rng))
+    print()
+    rate = report_throughput(programs, args.throughput_programs, rng)
+    print()
+    print(f"✅ Evaluated {args.folds}-fold, {rate:,.0f} programs/s in batch")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Local stand-in for Gemini, for load-testing pathway queries without API quota.
+
+Serves the protocol of HTTPModelClient (app/services/gemini_service.py):
+POST /generate with {"prompt": ..., "stream": bool} answers {"text": ...}, or
+streams newline-delimited {"text": ...} pieces. The answer recommends the
+first programs in the prompt, so it reads like a real one. Latency, token
+rate, error rate and an upstream rate limit (HTTP 429) are configurable;
+GET /stats reports what the server saw.
+
+Point the API at it with:
+
+    python scripts/fake_model_server.py --port 8090 --latency 0.8 --error-rate 0.02 &
+    MODEL_CLIENT=http MODEL_SERVER_URL=http://127.0.0.1:8090 uvicorn app.main:app
+
+Usage:
+    python scripts/fake_model_server.py [--port 8090] [--latency 0.8] [--jitter 0.2]
+        [--tokens 150] [--token-delay 0.005] [--chunk-tokens 10]
+        [--error-rate 0.0] [--rate-limit 0] [--max-concurrency 0]
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+
+import uvicorn
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+PROGRAM_TITLE = re.compile(r"^Title: (.+)$", re.MULTILINE)
+
+FILLER = (
+    "This program matches the stage and needs described in your answers and is offered "
+    "by an organization in the Windsor-Essex innovation ecosystem."
+).split()
+
+
+class GenerateRequest(BaseModel):
+    prompt: str
+    stream: bool = False
+
+
+class TokenBucket:
+    """Allows `rate` requests per second on average, in bursts of up to `rate`"""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+
+    def take(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+def answer_tokens(prompt: str, count: int):
+    """`count` words recommending the first programs listed in the prompt"""
+    tokens = []
+    for title in PROGRAM_TITLE.findall(prompt)[:3]:
+        tokens += ["##", title.strip(), "\n"] + FILLER + ["\n\n"]
+    while len(tokens) < count:
+        tokens += FILLER
+    return tokens[:count]
+
+
+def create_app(args) -> FastAPI:
+    app = FastAPI(title="Fake model server")
+    bucket = TokenBucket(args.rate_limit) if args.rate_limit > 0 else None
+    stats = {
+        "requests": 0,
+        "streamed": 0,
+        "completed": 0,
+        "errors": 0,
+        "rate_limited": 0,
+        "disconnected": 0,
+        "in_flight": 0,
+        "max_in_flight": 0,
+    }
+
+    def admit():
+        stats["requests"] += 1
+        if bucket is not None and not bucket.take():
+            stats["rate_limited"] += 1
+            raise HTTPException(status_code=429, detail="Resource has been exhausted (rate limit)")
+        if args.max_concurrency and stats["in_flight"] >= args.max_concurrency:
+            stats["rate_limited"] += 1
+            raise HTTPException(status_code=429, detail="Too many concurrent requests")
+        if random.random() < args.error_rate:
+            stats["errors"] += 1
+            raise HTTPException(status_code=500, detail="Internal error")
+        stats["in_flight"] += 1
+        stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+
+    def first_token_delay() -> float:
+        return max(0.0, args.latency + random.uniform(-args.jitter, args.jitter))
+
+    @app.post("/generate")
+    async def generate(request: GenerateRequest):
+        admit()
+        tokens = answer_tokens(request.prompt, args.tokens)
+        if not request.stream:
+            try:
+                await asyncio.sleep(first_token_delay() + args.token_delay * len(tokens))
+                stats["completed"] += 1
+                return {"text": " ".join(tokens)}
+            finally:
+                stats["in_flight"] -= 1
+
+        async def pieces():
+            try:
+                await asyncio.sleep(first_token_delay())
+                for i in range(0, len(tokens), args.chunk_tokens):
+                    chunk = tokens[i:i + args.chunk_tokens]
+                    if i:
+                        await asyncio.sleep(args.token_delay * len(chunk))
+                    yield json.dumps({"text": " ".join(chunk) + " "}) + "\n"
+                stats["completed"] += 1
+            except asyncio.CancelledError:
+                stats["disconnected"] += 1
+                raise
+            finally:
+                stats["in_flight"] -= 1
+
+        stats["streamed"] += 1
+        return StreamingResponse(pieces(), media_type="application/x-ndjson")
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency", type=float, default=0.8, help="Seconds before the first token")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Random +/- seconds on the latency")
+    parser.add_argument("--tokens", type=int, default=150, help="Words per answer")
+    parser.add_argument("--token-delay", type=float, default=0.005, help="Seconds per word after the first")
+    parser.add_argument("--chunk-tokens", type=int, default=10, help="Words per streamed piece")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests failing with HTTP 500")
+    parser.add_argument("--rate-limit", type=float, default=0, help="Requests per second before HTTP 429 (0 = none)")
+    parser.add_argument("--max-concurrency", type=int, default=0, help="In-flight requests before HTTP 429 (0 = none)")
+    args = parser.parse_args()
+
+    print(f"🤖 Fake model on http://{args.host}:{args.port} "
+          f"(latency {args.latency}s ±{args.jitter}s, {args.tokens} tokens, "
+          f"error rate {args.error_rate:.0%}, rate limit {args.rate_limit or 'none'})")
+    uvicorn.run(create_app(args), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""Rebuild the program_search read model from programs and organizations"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import delete, select
+
+from app.database import SessionLocal
+from app.models import Program, ProgramSearch
+from app.services.cache import bump_catalog_version
+from app.services.program_search import refresh_program_search
+
+def rebuild_program_search():
+    """Upsert every program and drop rows whose program no longer exists"""
+    db = SessionLocal()
+    try:
+        refreshed = refresh_program_search(db)
+        removed = db.execute(
+            delete(ProgramSearch).where(ProgramSearch.program_id.not_in(select(Program.id)))
+        ).rowcount
+        db.commit()
+        bump_catalog_version(db, "programs")
+        print(f"✅ Refreshed {refreshed} program_search rows, removed {removed or 0} stale rows")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error rebuilding program_search: {e}")
+        import traceback
+        traceback.print_exc()
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    rebuild_program_search()
@@ -6,6 +6,7 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from app.database import SessionLocal
 from app.models import Pathway
+from app.services.cache import bump_catalog_version
 
 def seed_pathways():
     """Seed 5 pathway questions"""
@@ -76,6 +77,7 @@ def seed_pathways():
             db.add(pathway)
         
         db.commit()
+        bump_catalog_version(db, "pathways")
         print(f"✅ Seeded {len(pathways)} pathways")
     except Exception as e:
         db.rollback()
@@ -0,0 +1,76 @@
+"""
+Train the program classifier (app/services/program_classifier.py) on the
+already-labelled programs in the database and save it.
+
+Each field (stage, sector, program_type) is learned from the programs that
+have a value for it. The API, the importers and categorize_all_programs.py
+load the saved model from CLASSIFIER_MODEL_FILE (checked on each use, so a
+retrained model is picked up without a restart). Run
+scripts/evaluate_program_classifier.py first to see how well it does.
+
+Usage:
+    python scripts/train_program_classifier.py [--output models/program_classifier.npz]
+        [--epochs 150] [--learning-rate 10]
+"""
+import argparse
+import os
+import sys
+import time
+from collections import Counter
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import select
+
+from app.services.program_classifier import CLASSIFIER_FIELDS, CLASSIFIER_MODEL_FILE, ProgramClassifier
+
+
+def load_labelled_programs():
+    """(title, description, stage, sector, program_type) of every program, as attribute objects"""
+    from app.database import SessionLocal
+    from app.models import Program
+
+    db = SessionLocal()
+    try:
+        rows = db.execute(
+            select(Program.title, Program.description, *[getattr(Program, field) for field in CLASSIFIER_FIELDS])
+        ).all()
+    finally:
+        db.close()
+    return [SimpleNamespace(title=row[0], description=row[1], **dict(zip(CLASSIFIER_FIELDS, row[2:]))) for row in rows]
+
+
+def label_counts(programs):
+    return {
+        field: Counter(label for label in (normalize(getattr(p, field)) for p in programs) if label)
+        for field, normalize in CLASSIFIER_FIELDS.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default=CLASSIFIER_MODEL_FILE, help="Where to save the model")
+    parser.add_argument("--epochs", type=int, default=150)
+    parser.add_argument("--learning-rate", type=float, default=10.0)
+    args = parser.parse_args()
+
+    programs = load_labelled_programs()
+    print(f"📚 {len(programs)} programs")
+    for field, counts in label_counts(programs).items():
+        print(f"   {field}: {sum(counts.values())} labelled, {len(counts)} labels")
+
+    started = time.perf_counter()
+    classifier = ProgramClassifier.train(programs, epochs=args.epochs, learning_rate=args.learning_rate)
+    elapsed = time.perf_counter() - started
+    if not classifier.models:
+        print("❌ No field has at least two labels with enough programs; nothing to train")
+        sys.exit(1)
+
+    classifier.save(args.output)
+    print(f"✅ Trained {', '.join(classifier.models)} on {len(classifier.vectorizer.vocabulary):,} terms "
+          f"in {elapsed:.1f}s, saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
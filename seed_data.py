@@ -4,6 +4,7 @@ Run this after migrations: python seed_data.py
 """
 from app.database import SessionLocal, engine, Base
 from app.models import Event, Organization, Pathway, SearchLog, Program
+from app.services.program_search import refresh_program_search
 from datetime import date, datetime, timedelta
 import random
 
@@ -1030,6 +1031,7 @@ try:
         for program in programs:
             db.add(program)
         
+        refresh_program_search(db)
         db.commit()
     
     total_items = len(events) + len(organizations) + len(pathways) + (len(programs) if org_list else 0)